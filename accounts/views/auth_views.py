@@ -6,6 +6,7 @@ from django.contrib.auth import login, logout
 from django.contrib.auth.views import LoginView
 from django.contrib import messages
 from accounts.forms import SignUpForm
+from shop.services.cart_service import CartService
 import logging
 
 logger = logging.getLogger(__name__)
@@ -30,6 +31,8 @@ class CustomLoginView(LoginView):
     
     def form_valid(self, form):
         logger.info(f"ログイン成功: ユーザー={form.get_user()}")
+        # ログインでセッションキーが変わる前にゲストカートをマージする
+        CartService.merge_guest_cart_to_user(self.request, form.get_user())
         return super().form_valid(form)
     
     def form_invalid(self, form):
@@ -44,6 +47,7 @@ def signup(request):
         form = SignUpForm(request.POST)
         if form.is_valid():
             user = form.save()
+            CartService.merge_guest_cart_to_user(request, user)
             login(request, user)
             messages.success(request, 'アカウントを作成しました。')
             return redirect('shop:product_list')
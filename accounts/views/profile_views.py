@@ -8,4 +8,6 @@ from django.contrib.auth.decorators import login_required
 @login_required
 def profile(request):
     """プロフィール表示ビュー"""
-    return render(request, 'accounts/profile.html')
+    # 最近の注文は表示する5件だけを1回のクエリで取得する
+    recent_orders = list(request.user.orders.order_by('-created_at', '-id')[:5])
+    return render(request, 'accounts/profile.html', {'recent_orders': recent_orders})
@@ -0,0 +1,57 @@
+"""
+ロギング用のハンドラとフォーマッタ
+"""
+import json
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+
+class BackgroundStreamHandler(QueueHandler):
+    """
+    ログをキューに積み、バックグラウンドスレッドでストリームに書き込むハンドラ
+    リクエスト処理スレッドは標準出力への書き込みやメッセージの整形で待たされない
+    """
+    
+    def __init__(self, stream=None):
+        super().__init__(queue.SimpleQueue())
+        self.target = logging.StreamHandler(stream)
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+        self.listener.start()
+    
+    def setFormatter(self, fmt):
+        # 整形はバックグラウンド側で行う
+        self.target.setFormatter(fmt)
+    
+    def prepare(self, record):
+        # 同一プロセス内のキューなので、メッセージの整形をせずそのまま渡す
+        return record
+    
+    def close(self):
+        # プロセス終了時（logging.shutdown）に呼ばれ、キューに残ったログを書き出してから停止する
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+            self.target.close()
+        super().close()
+
+
+class JsonFormatter(logging.Formatter):
+    """ログレコードを1行のJSONとして出力するフォーマッタ"""
+    
+    # extra で渡された項目のうち出力するもの
+    fields = ('method', 'path', 'status', 'duration_ms', 'user_id', 'query_count')
+    
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in self.fields:
+            if hasattr(record, field):
+                data[field] = getattr(record, field)
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
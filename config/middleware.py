@@ -1,46 +1,233 @@
+import contextvars
+import functools
 import logging
+import random
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from django.conf import settings
+from django.db import connections
 
 logger = logging.getLogger(__name__)
 
 
-class RequestResponseLoggingMiddleware:
-    """リクエストとレスポンスをログに記録するミドルウェア"""
+class QueryCounter:
+    """リクエスト中に発行されたSQLの件数と実行時間を数える"""
+    
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+    
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+    
+    @contextmanager
+    def track(self):
+        """全てのデータベース接続のSQL実行を計測する"""
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(self))
+            yield self
+
+
+class StructuredRequestLoggingMiddleware:
+    """
+    1リクエストにつき1件の構造化ログを出力するミドルウェア
+    メソッド・パス・ステータス・処理時間・ユーザーID・クエリ数を記録する
+    REQUEST_LOG_SAMPLE_RATE の割合だけ出力し、サーバーエラーと遅いリクエストは常に出力する
+    PerformanceInstrumentationMiddleware の直後に置くと、そのクエリ数の計測を共有する（SQLの実行を二重に包まない）
+    """
     
     def __init__(self, get_response):
         self.get_response = get_response
-
+    
     def __call__(self, request):
-        # リクエストのログ
-        logger.info(f"=== リクエスト ===")
-        logger.info(f"メソッド: {request.method}")
-        logger.info(f"パス: {request.path}")
-        logger.info(f"ユーザー: {request.user}")
-        logger.info(f"認証済み: {request.user.is_authenticated}")
+        if not logger.isEnabledFor(logging.INFO):
+            return self.get_response(request)
         
-        if request.method == 'POST':
-            logger.info(f"POSTデータ: {dict(request.POST)}")
-            # パスワードは表示しない
-            post_data = dict(request.POST)
-            if 'password' in post_data:
-                post_data['password'] = ['***隠されています***']
-            if 'password1' in post_data:
-                post_data['password1'] = ['***隠されています***']
-            if 'password2' in post_data:
-                post_data['password2'] = ['***隠されています***']
-            logger.info(f"POSTデータ(安全): {post_data}")
+        started = time.perf_counter()
+        metrics = _current_metrics.get()
+        if metrics is not None:
+            queries = metrics.queries
+            queries_before = queries.count
+            response = self.get_response(request)
+            query_count = queries.count - queries_before
+        else:
+            with QueryCounter().track() as queries:
+                response = self.get_response(request)
+            query_count = queries.count
+        duration_ms = (time.perf_counter() - started) * 1000
         
-        logger.info(f"GETパラメータ: {dict(request.GET)}")
-        logger.info(f"セッション: {dict(request.session) if hasattr(request, 'session') else 'なし'}")
+        if self._should_log(response.status_code, duration_ms):
+            # ユーザーはビューで参照された場合のみ記録する（ログのためにセッションを読み込まない）
+            user = getattr(request, '_cached_user', None)
+            user_id = user.pk if user is not None else None
+            logger.info(
+                '%s %s %s %.1fms user=%s queries=%d',
+                request.method, request.path, response.status_code, duration_ms, user_id, query_count,
+                extra={
+                    'method': request.method,
+                    'path': request.path,
+                    'status': response.status_code,
+                    'duration_ms': round(duration_ms, 1),
+                    'user_id': user_id,
+                    'query_count': query_count,
+                },
+            )
+        return response
+    
+    def _should_log(self, status_code, duration_ms):
+        """サンプリング対象かどうか"""
+        if status_code >= 500 or duration_ms >= settings.REQUEST_LOG_SLOW_MS:
+            return True
+        sample_rate = settings.REQUEST_LOG_SAMPLE_RATE
+        return sample_rate >= 1 or random.random() < sample_rate
 
-        # レスポンスを取得
-        response = self.get_response(request)
 
-        # レスポンスのログ
-        logger.info(f"=== レスポンス ===")
-        logger.info(f"ステータスコード: {response.status_code}")
-        logger.info(f"リダイレクト: {response.get('Location', 'なし')}")
-        logger.info(f"ユーザー(レスポンス後): {request.user}")
-        logger.info(f"認証済み(レスポンス後): {request.user.is_authenticated}")
-        logger.info(f"=" * 50)
+class QueryBudgetExceeded(AssertionError):
+    """ビューのクエリ数が QUERY_BUDGETS の上限を超えた場合の例外"""
+    pass
+
+
+class RequestMetrics:
+    """1リクエスト分の計測値"""
+    
+    def __init__(self):
+        # 計測中のクエリ数（内側のミドルウェアと共有する）
+        self.queries = QueryCounter()
+        self.query_count = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.total_ms = 0.0
+
+
+class PerformanceStats:
+    """URL名ごとの計測値をプロセス内で集計する"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+    
+    def record(self, view_name, metrics):
+        with self._lock:
+            stats = self._stats.setdefault(view_name, {
+                'requests': 0,
+                'queries': 0,
+                'max_queries': 0,
+                'db_ms': 0.0,
+                'template_ms': 0.0,
+                'total_ms': 0.0,
+                'max_total_ms': 0.0,
+            })
+            stats['requests'] += 1
+            stats['queries'] += metrics.query_count
+            stats['max_queries'] = max(stats['max_queries'], metrics.query_count)
+            stats['db_ms'] += metrics.db_ms
+            stats['template_ms'] += metrics.template_ms
+            stats['total_ms'] += metrics.total_ms
+            stats['max_total_ms'] = max(stats['max_total_ms'], metrics.total_ms)
+    
+    def snapshot(self):
+        """URL名ごとの平均・最大値を返す"""
+        with self._lock:
+            result = {}
+            for view_name, stats in self._stats.items():
+                requests = stats['requests']
+                result[view_name] = {
+                    'requests': requests,
+                    'avg_queries': round(stats['queries'] / requests, 2),
+                    'max_queries': stats['max_queries'],
+                    'avg_db_ms': round(stats['db_ms'] / requests, 2),
+                    'avg_template_ms': round(stats['template_ms'] / requests, 2),
+                    'avg_total_ms': round(stats['total_ms'] / requests, 2),
+                    'max_total_ms': round(stats['max_total_ms'], 2),
+                }
+            return result
+    
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
 
+
+performance_stats = PerformanceStats()
+
+# 実行中のリクエストの計測値（テンプレートの描画時間の加算先）
+_current_metrics = contextvars.ContextVar('current_metrics', default=None)
+
+
+def _install_template_timer():
+    """テンプレートの描画時間を計測するため、Djangoテンプレートバックエンドの render を包む"""
+    from django.template.backends.django import Template
+    
+    if getattr(Template.render, 'measures_render_time', False):
+        return
+    original_render = Template.render
+    
+    @functools.wraps(original_render)
+    def render(self, *args, **kwargs):
+        metrics = _current_metrics.get()
+        if metrics is None:
+            return original_render(self, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return original_render(self, *args, **kwargs)
+        finally:
+            metrics.template_ms += (time.perf_counter() - started) * 1000
+    
+    render.measures_render_time = True
+    Template.render = render
+
+
+class PerformanceInstrumentationMiddleware:
+    """
+    リクエストごとのクエリ数・DB時間・テンプレート描画時間・全体時間を計測するミドルウェア
+    計測値は Server-Timing ヘッダー（PERFORMANCE_SERVER_TIMING）と集計エンドポイントで確認できる
+    QUERY_BUDGETS に URL名ごとのクエリ数上限を設定すると、超過時に警告する
+    （QUERY_BUDGET_ENFORCE が True の場合は QueryBudgetExceeded を送出する）
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        _install_template_timer()
+    
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            with metrics.queries.track():
+                response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        metrics.total_ms = (time.perf_counter() - started) * 1000
+        metrics.query_count = metrics.queries.count
+        metrics.db_ms = metrics.queries.duration * 1000
+        
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else None
+        if view_name:
+            performance_stats.record(view_name, metrics)
+            self._check_budget(view_name, metrics)
+        
+        if settings.PERFORMANCE_SERVER_TIMING:
+            response['Server-Timing'] = (
+                f'db;dur={metrics.db_ms:.1f};desc="{metrics.query_count} queries", '
+                f'tpl;dur={metrics.template_ms:.1f}, '
+                f'total;dur={metrics.total_ms:.1f}'
+            )
         return response
+    
+    def _check_budget(self, view_name, metrics):
+        """クエリ数の上限を確認"""
+        budget = settings.QUERY_BUDGETS.get(view_name)
+        if budget is None or metrics.query_count <= budget:
+            return
+        message = f'{view_name} のクエリ数が上限を超えました: {metrics.query_count} > {budget}'
+        if settings.QUERY_BUDGET_ENFORCE:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
@@ -0,0 +1,37 @@
+"""
+Session Store - 書き込みをまとめる cached_db セッション
+SESSION_ENGINE = 'config.session_store' で使用する
+"""
+import copy
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBSessionStore
+
+
+class SessionStore(CachedDBSessionStore):
+    """
+    cached_db セッション（読み込みはキャッシュ、キャッシュにない場合のみデータベース）
+    読み込んだ時点から内容が変わっていない場合は保存を省略する
+    （同じ値の再代入、追加して削除した場合、ログイン時の cycle_key 直後の保存等）
+    SESSION_SAVE_EVERY_REQUEST が True の場合は有効期限の延長のため毎回保存する
+    """
+    
+    # 最後に読み込んだ、または保存した内容
+    _stored_data = None
+    
+    def load(self):
+        data = super().load()
+        if self.session_key is not None:
+            self._stored_data = copy.deepcopy(data)
+        return data
+    
+    def save(self, must_create=False):
+        if not must_create and self._is_unchanged():
+            return
+        super().save(must_create=must_create)
+        self._stored_data = copy.deepcopy(self._session)
+    
+    def _is_unchanged(self):
+        """保存済みの内容から変わっていないか"""
+        if settings.SESSION_SAVE_EVERY_REQUEST or self.session_key is None or self._stored_data is None:
+            return False
+        return getattr(self, '_session_cache', None) == self._stored_data
@@ -32,6 +32,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.middleware.PerformanceInstrumentationMiddleware',  # クエリ数・処理時間の計測
+    'config.middleware.StructuredRequestLoggingMiddleware',  # リクエストログ（1リクエスト1行。上の計測を共有する）
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -39,11 +41,13 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'config.middleware.RequestResponseLoggingMiddleware',  # カスタムロギングミドルウェア
 ]
 
 ROOT_URLCONF = 'config.urls'
 
+# QUERY_BUDGETS の超過をテストの失敗にするテストランナー
+TEST_RUNNER = 'config.test_runner.TestRunner'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -73,6 +77,84 @@ DATABASES = {
 }
 
 
+# Cache
+# 本番環境では複数プロセスで共有できるキャッシュ（Redis/Memcached等）に変更すること
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ec-site',
+    },
+    # セッション用（default のクリアでセッションが消えないよう分けている）
+    # 複数プロセスで動かす場合は、プロセス間で古いセッションを読まないよう必ず共有キャッシュにすること
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ec-site-sessions',
+    },
+}
+
+# セッション（cached_db: 読み込みはキャッシュから、書き込みはデータベースとキャッシュの両方に行う）
+# config.session_store は内容が変わっていない場合の保存を省略する
+SESSION_ENGINE = 'config.session_store'
+SESSION_CACHE_ALIAS = 'sessions'
+
+# ナビバーのカート商品数カウンタの保持期間（秒）
+CART_ITEM_COUNT_CACHE_TIMEOUT = 60 * 60
+
+# 商品一覧のキャッシュ保持期間（秒）
+# 商品・カテゴリの保存時には即座に無効化されるが、注文による在庫数の変化は
+# 保持期間が過ぎるまで一覧の在庫表示に反映されない
+PRODUCT_LIST_CACHE_TIMEOUT = 60 * 5
+
+# リクエストログの出力割合（0.0〜1.0）。サーバーエラーと遅いリクエストは常に出力する
+REQUEST_LOG_SAMPLE_RATE = 1.0
+
+# この時間（ミリ秒）以上かかったリクエストは遅いリクエストとして常にログに出力する
+REQUEST_LOG_SLOW_MS = 1000
+
+# パフォーマンス計測値を Server-Timing ヘッダーで返すかどうか
+PERFORMANCE_SERVER_TIMING = DEBUG
+
+# URL名ごとのクエリ数の上限（超過すると警告、QUERY_BUDGET_ENFORCE が True なら例外）
+# テストスイートとベンチマーク（tests/benchmarks）で計測した最大のクエリ数（セッションの読み書きを含む）
+# shop:add_to_cart はセッションとカートを初めて作成するゲストの場合、shop:checkout は注文確定の場合
+QUERY_BUDGETS = {
+    'shop:product_list': 5,
+    'shop:product_list_by_category': 4,
+    'shop:product_detail': 3,
+    'shop:cart': 7,
+    'shop:add_to_cart': 12,
+    'shop:checkout': 12,
+    'shop:order_history': 5,
+    'shop:order_detail': 5,
+    'shop:order_complete': 5,
+    'accounts:profile': 4,
+}
+# テストの実行中は config.test_runner.TestRunner が True にする
+QUERY_BUDGET_ENFORCE = False
+
+# 商品検索のバックエンド（None の場合はデータベースに応じて自動選択）
+SHOP_SEARCH_BACKEND = None
+
+# 注文履歴の1ページあたりの件数
+ORDER_HISTORY_PAGE_SIZE = 20
+
+# この件数を超える一覧（商品一覧・管理画面）は正確な件数を数えず、推定件数またはキャッシュした件数を使う
+PAGINATOR_ESTIMATE_THRESHOLD = 10000
+
+# 管理画面の一覧で推定・キャッシュした件数の保持期間（秒）
+ADMIN_COUNT_CACHE_TIMEOUT = 60
+
+# ゲストカートの保持日数（purge_guest_carts コマンドのデフォルト）
+GUEST_CART_RETENTION_DAYS = 30
+
+# ゲストカートの保存先
+# 'db': カート・カート商品の行として保存する
+# 'session': セッションに {商品ID: 数量} だけを保存し、ログイン時にユーザーのカートとして保存する
+#            データベースに書き込まないセッション（signed_cookies・cache）と組み合わせること
+#            （SESSION_ENGINE がデータベースのセッションの場合はシステムチェック shop.E001 でエラーになる）
+CART_GUEST_STORAGE = 'db'
+
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -130,12 +212,20 @@ LOGGING = {
             'format': '[{levelname}] {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'config.log_handlers.JsonFormatter',
+        },
     },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
             'formatter': 'verbose',
         },
+        # リクエストログはバックグラウンドスレッドで書き込む
+        'request_log': {
+            'class': 'config.log_handlers.BackgroundStreamHandler',
+            'formatter': 'json',
+        },
     },
     'loggers': {
         'django': {
@@ -148,7 +238,7 @@ LOGGING = {
             'propagate': False,
         },
         'config.middleware': {
-            'handlers': ['console'],
+            'handlers': ['request_log'],
             'level': 'INFO',
             'propagate': False,
         },
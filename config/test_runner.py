@@ -0,0 +1,22 @@
+"""
+Test Runner - テスト実行の設定
+TEST_RUNNER = 'config.test_runner.TestRunner' で使用する
+"""
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    テストの実行中は QUERY_BUDGETS の超過を QueryBudgetExceeded にする
+    （本番では警告ログのみ。テストで上限を超えた変更を検出する）
+    """
+    
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._query_budget_enforce = settings.QUERY_BUDGET_ENFORCE
+        settings.QUERY_BUDGET_ENFORCE = True
+    
+    def teardown_test_environment(self, **kwargs):
+        settings.QUERY_BUDGET_ENFORCE = self._query_budget_enforce
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,14 @@
+"""
+プロジェクト共通のビュー
+"""
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from config.middleware import performance_stats
+
+
+@staff_member_required
+def performance_stats_view(request):
+    """URL名ごとのパフォーマンス計測値（プロセス内の集計）"""
+    if request.method == 'POST' and request.POST.get('reset'):
+        performance_stats.reset()
+    return JsonResponse(performance_stats.snapshot())
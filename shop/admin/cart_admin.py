@@ -1,7 +1,11 @@
 """
 Cart Admin - カート管理画面
 """
+from decimal import Decimal
 from django.contrib import admin
+from django.db.models import DecimalField, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from shop.admin.mixins import EstimatedCountMixin
 from shop.models import Cart, CartItem
 
 
@@ -10,18 +14,48 @@ class CartItemInline(admin.TabularInline):
     model = CartItem
     extra = 0
     readonly_fields = ['product', 'quantity', 'created_at']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product')
 
 
 @admin.register(Cart)
-class CartAdmin(admin.ModelAdmin):
+class CartAdmin(EstimatedCountMixin, admin.ModelAdmin):
     """カート管理"""
-    list_display = ['id', 'user', 'session_key', 'total_items', 'created_at']
+    list_display = ['id', 'user', 'session_key', 'total_items', 'total_price', 'created_at']
     list_filter = ['created_at']
-    search_fields = ['user__username', 'session_key']
+    list_select_related = ['user']
+    # 一意インデックスのある列を完全一致で検索する（部分一致は全件走査になる）
+    search_fields = ['user__username__exact', 'session_key__exact']
+    search_help_text = 'ユーザー名またはセッションキーで検索（完全一致）'
     readonly_fields = ['created_at', 'updated_at']
     inlines = [CartItemInline]
     
+    def get_queryset(self, request):
+        """商品数・合計金額を相関サブクエリで集計する（行ごとの集計クエリを発行しない）"""
+        items = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+        return super().get_queryset(request).annotate(
+            item_quantity=Coalesce(
+                Subquery(items.annotate(total=Sum('quantity')).values('total'), output_field=IntegerField()),
+                Value(0),
+            ),
+            item_total=Coalesce(
+                Subquery(
+                    items.annotate(total=Sum(F('quantity') * F('product__price'))).values('total'),
+                    output_field=DecimalField(max_digits=12, decimal_places=0),
+                ),
+                Value(Decimal('0')),
+            ),
+        )
+    
     def total_items(self, obj):
         """カート内商品数"""
-        return obj.total_items
+        return obj.item_quantity
     total_items.short_description = '商品数'
+    total_items.admin_order_field = 'item_quantity'
+    
+    def total_price(self, obj):
+        """カート内商品の合計金額"""
+        return f"¥{obj.item_total:,}"
+    total_price.short_description = '合計金額'
+    total_price.admin_order_field = 'item_total'
@@ -0,0 +1,59 @@
+"""
+Admin Mixins - 管理画面の共通処理
+"""
+import hashlib
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from shop.utils.paginator import EstimatedCountPaginator
+
+
+class EstimatedCountMixin:
+    """
+    一覧画面の件数に推定値を使うミックスイン
+    PAGINATOR_ESTIMATE_THRESHOLD 件を超える一覧では COUNT(*) で全件を数えず、
+    推定件数（または ADMIN_COUNT_CACHE_TIMEOUT 秒キャッシュした件数）を表示する
+    """
+    
+    paginator = EstimatedCountPaginator
+    # 絞り込みなしの全件数を数えない
+    show_full_result_count = False
+    
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        return self.paginator(
+            queryset, per_page, orphans, allow_empty_first_page,
+            cache_key=self.count_cache_key(queryset),
+            cache_timeout=settings.ADMIN_COUNT_CACHE_TIMEOUT,
+            cache_exact=False,
+        )
+    
+    def count_cache_key(self, queryset):
+        """絞り込み・検索条件ごとの件数のキャッシュキー"""
+        try:
+            sql = str(queryset.order_by().query)
+        except EmptyResultSet:
+            return None
+        digest = hashlib.md5(sql.encode()).hexdigest()
+        return f'shop:admin_count:{queryset.model._meta.label_lower}:{digest}'
+
+
+class ChangedFieldsSaveMixin:
+    """
+    変更されたフィールドだけを UPDATE するミックスイン
+    一覧画面の list_editable や変更画面の保存で、全カラムを書き換えないようにする
+    """
+    
+    def save_model(self, request, obj, form, change):
+        if not change:
+            super().save_model(request, obj, form, change)
+            return
+        # 多対多フィールドは save_related で保存されるため対象外
+        concrete_fields = obj._meta.concrete_fields
+        update_fields = [field.name for field in concrete_fields if field.name in form.changed_data]
+        if not update_fields:
+            return
+        # auto_now のフィールドは update_fields に含めた場合のみ更新される
+        update_fields += [
+            field.name for field in concrete_fields
+            if getattr(field, 'auto_now', False) and field.name not in update_fields
+        ]
+        obj.save(update_fields=update_fields)
@@ -1,15 +1,21 @@
 """
 Order Admin - 注文管理画面
 """
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from shop.admin.mixins import ChangedFieldsSaveMixin, EstimatedCountMixin
 from shop.models import Order, OrderItem
+from shop.services.order_service import OrderService
+from shop.utils.streaming import streaming_response
 
 
 class OrderItemInline(admin.TabularInline):
     """注文商品インライン"""
     model = OrderItem
     extra = 0
-    readonly_fields = ['product', 'quantity', 'price', 'subtotal']
+    fields = ['product_name', 'quantity', 'price', 'subtotal']
+    readonly_fields = ['product_name', 'quantity', 'price', 'subtotal']
     
     def subtotal(self, obj):
         """小計"""
@@ -18,14 +24,23 @@ class OrderItemInline(admin.TabularInline):
 
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
-    """注文管理"""
-    list_display = ['id', 'user', 'status', 'total_amount_formatted', 'created_at']
+class OrderAdmin(ChangedFieldsSaveMixin, EstimatedCountMixin, admin.ModelAdmin):
+    """
+    注文管理
+    ステータスは遷移の検証と在庫の戻しを行うアクション（OrderService）でのみ変更する
+    """
+    list_display = ['id', 'user', 'status', 'item_count', 'total_amount_formatted', 'created_at']
     list_filter = ['status', 'created_at']
-    list_editable = ['status']
-    search_fields = ['user__username', 'shipping_name', 'shipping_phone']
+    list_select_related = ['user']
+    # インデックスのある列だけを完全一致で検索する（数字のみの検索語は注文番号としても検索）
+    search_fields = ['user__username__exact']
+    search_help_text = '注文番号またはユーザー名で検索（完全一致）'
     readonly_fields = ['created_at', 'updated_at', 'total_amount']
     inlines = [OrderItemInline]
+    actions = [
+        'mark_processing', 'mark_shipped', 'mark_delivered', 'cancel_orders',
+        'export_lines_as_csv', 'export_lines_as_jsonl',
+    ]
     
     fieldsets = (
         ('注文情報', {
@@ -40,8 +55,84 @@ class OrderAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_readonly_fields(self, request, obj=None):
+        """作成済みの注文のステータスは変更画面で編集できない"""
+        readonly_fields = super().get_readonly_fields(request, obj)
+        if obj is not None:
+            readonly_fields = [*readonly_fields, 'status']
+        return readonly_fields
+    
+    def get_queryset(self, request):
+        """商品点数を相関サブクエリで集計する（件数取得時の GROUP BY を避ける）"""
+        items = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+        return super().get_queryset(request).annotate(
+            item_count=Coalesce(
+                Subquery(items.annotate(count=Count('id')).values('count'), output_field=IntegerField()),
+                Value(0),
+            ),
+        )
+    
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip().lstrip('#')
+        if term.isdigit():
+            return queryset.filter(pk=int(term)), False
+        return super().get_search_results(request, queryset, search_term)
+    
+    def item_count(self, obj):
+        """商品点数"""
+        return obj.item_count
+    item_count.short_description = '商品点数'
+    item_count.admin_order_field = 'item_count'
+    
     def total_amount_formatted(self, obj):
         """合計金額（フォーマット済み）"""
         return f"¥{obj.total_amount:,}"
     total_amount_formatted.short_description = '合計金額'
     total_amount_formatted.admin_order_field = 'total_amount'
+    
+    def _bulk_update_status(self, request, queryset, new_status):
+        """選択した注文のステータスを一括変更し、結果を表示する"""
+        try:
+            result = OrderService.bulk_update_status(queryset, new_status)
+        except ValueError as e:
+            self.message_user(request, str(e), messages.ERROR)
+            return
+        label = dict(Order.STATUS_CHOICES)[new_status]
+        self.message_user(request, f'{result.updated}件の注文を「{label}」に変更しました。', messages.SUCCESS)
+        if result.skipped:
+            self.message_user(
+                request, f'{result.skipped}件の注文は現在のステータスから「{label}」に変更できないため、対象外にしました。',
+                messages.WARNING
+            )
+    
+    def mark_processing(self, request, queryset):
+        """選択した注文を処理中にする"""
+        self._bulk_update_status(request, queryset, 'processing')
+    mark_processing.short_description = '選択した注文を「処理中」にする'
+    
+    def mark_shipped(self, request, queryset):
+        """選択した注文を発送済みにする"""
+        self._bulk_update_status(request, queryset, 'shipped')
+    mark_shipped.short_description = '選択した注文を「発送済み」にする'
+    
+    def mark_delivered(self, request, queryset):
+        """選択した注文を配達完了にする"""
+        self._bulk_update_status(request, queryset, 'delivered')
+    mark_delivered.short_description = '選択した注文を「配達完了」にする'
+    
+    def cancel_orders(self, request, queryset):
+        """選択した注文をキャンセルし、在庫を戻す"""
+        self._bulk_update_status(request, queryset, 'cancelled')
+    cancel_orders.short_description = '選択した注文をキャンセルする（在庫を戻す）'
+    
+    def export_lines_as_csv(self, request, queryset):
+        """選択した注文の注文商品をCSVでダウンロード"""
+        records, fieldnames = OrderService.export_records(queryset, lines=True)
+        return streaming_response(records, 'csv', fieldnames, 'order_lines.csv')
+    export_lines_as_csv.short_description = '選択した注文をCSVでエクスポート（注文商品単位）'
+    
+    def export_lines_as_jsonl(self, request, queryset):
+        """選択した注文の注文商品をJSONLでダウンロード"""
+        records, fieldnames = OrderService.export_records(queryset, lines=True)
+        return streaming_response(records, 'jsonl', fieldnames, 'order_lines.jsonl')
+    export_lines_as_jsonl.short_description = '選択した注文をJSONLでエクスポート（注文商品単位）'
@@ -2,7 +2,11 @@
 Product Admin - 商品管理画面
 """
 from django.contrib import admin
+from shop.admin.mixins import ChangedFieldsSaveMixin, EstimatedCountMixin
 from shop.models import Category, Product
+from shop.search import get_search_backend
+from shop.services.product_service import ProductService
+from shop.utils.streaming import streaming_response
 
 
 @admin.register(Category)
@@ -14,14 +18,18 @@ class CategoryAdmin(admin.ModelAdmin):
 
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(ChangedFieldsSaveMixin, EstimatedCountMixin, admin.ModelAdmin):
     """商品管理"""
     list_display = ['name', 'category', 'price', 'stock', 'is_active', 'created_at']
     list_filter = ['is_active', 'category', 'created_at']
     list_editable = ['price', 'stock', 'is_active']
+    list_select_related = ['category']
     prepopulated_fields = {'slug': ('name',)}
+    # 検索は商品検索と同じ全文検索索引を使う（get_search_results を参照）
     search_fields = ['name', 'description']
+    search_help_text = '商品名・説明で検索'
     readonly_fields = ['created_at', 'updated_at']
+    actions = ['export_as_csv', 'export_as_jsonl']
     
     fieldsets = (
         ('基本情報', {
@@ -38,3 +46,23 @@ class ProductAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    
+    def get_search_results(self, request, queryset, search_term):
+        """全文検索索引で検索する（並び順は一覧画面の設定に従う）"""
+        if not search_term.strip():
+            return queryset, False
+        return get_search_backend().search(queryset, search_term), False
+    
+    def export_as_csv(self, request, queryset):
+        """選択した商品をCSVでダウンロード（import_products で再インポート可能）"""
+        return streaming_response(
+            ProductService.export_records(queryset), 'csv', ProductService.FIELDS, 'products.csv'
+        )
+    export_as_csv.short_description = '選択した商品をCSVでエクスポート'
+    
+    def export_as_jsonl(self, request, queryset):
+        """選択した商品をJSONLでダウンロード（import_products で再インポート可能）"""
+        return streaming_response(
+            ProductService.export_records(queryset), 'jsonl', ProductService.FIELDS, 'products.jsonl'
+        )
+    export_as_jsonl.short_description = '選択した商品をJSONLでエクスポート'
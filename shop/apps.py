@@ -5,3 +5,6 @@ class ShopConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'shop'
     verbose_name = 'ショップ'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
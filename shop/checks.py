@@ -0,0 +1,26 @@
+"""
+System Checks - ショップの設定チェック
+"""
+from importlib import import_module
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DBSessionStore
+from django.core.checks import Error, Tags, register
+
+
+@register(Tags.compatibility)
+def check_cart_guest_storage(app_configs, **kwargs):
+    """
+    CART_GUEST_STORAGE = 'session' はデータベースに書き込まないセッションと組み合わせる
+    データベースのセッション（db・cached_db等）ではカートの操作ごとに django_session に書き込まれるため
+    """
+    if settings.CART_GUEST_STORAGE != 'session':
+        return []
+    store_class = import_module(settings.SESSION_ENGINE).SessionStore
+    if issubclass(store_class, DBSessionStore):
+        return [Error(
+            f"CART_GUEST_STORAGE = 'session' にはデータベースに書き込むセッション（{settings.SESSION_ENGINE}）は使えません。",
+            hint="SESSION_ENGINE を 'django.contrib.sessions.backends.signed_cookies' または "
+                 "'django.contrib.sessions.backends.cache' にしてください。",
+            id='shop.E001',
+        )]
+    return []
@@ -2,7 +2,11 @@
 Shop Forms Package
 """
 from .order_form import OrderForm
+from .order_export_form import OrderExportForm
+from .cart_operation_form import CartOperationForm
 
 __all__ = [
     'OrderForm',
+    'OrderExportForm',
+    'CartOperationForm',
 ]
@@ -0,0 +1,41 @@
+"""
+Cart Operation Form - カートAPIの操作フォーム
+"""
+from django import forms
+
+
+class CartOperationForm(forms.Form):
+    """
+    カートAPIの1件分の操作
+    add: 商品を追加（product_id, quantity 省略時は1）
+    update: カート商品の数量を変更（item_id, quantity 0の場合は削除）
+    remove: カート商品を削除（item_id）
+    """
+    
+    OPERATIONS = [
+        ('add', '追加'),
+        ('update', '数量変更'),
+        ('remove', '削除'),
+    ]
+    
+    op = forms.ChoiceField(label='操作', choices=OPERATIONS)
+    product_id = forms.IntegerField(label='商品ID', required=False)
+    item_id = forms.IntegerField(label='カート商品ID', required=False)
+    quantity = forms.IntegerField(label='数量', required=False, min_value=0)
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        op = cleaned_data.get('op')
+        if op == 'add':
+            if cleaned_data.get('product_id') is None:
+                self.add_error('product_id', 'この項目は必須です。')
+            if cleaned_data.get('quantity') is None:
+                cleaned_data['quantity'] = 1
+            elif cleaned_data['quantity'] < 1:
+                self.add_error('quantity', '数量は1以上を指定してください。')
+        elif op in ('update', 'remove'):
+            if cleaned_data.get('item_id') is None:
+                self.add_error('item_id', 'この項目は必須です。')
+            if op == 'update' and cleaned_data.get('quantity') is None and 'quantity' not in self.errors:
+                self.add_error('quantity', 'この項目は必須です。')
+        return cleaned_data
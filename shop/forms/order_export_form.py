@@ -0,0 +1,26 @@
+"""
+Order Export Form - 注文エクスポートの条件フォーム
+"""
+from django import forms
+from shop.models import Order
+from shop.utils.streaming import FORMATS
+
+
+class OrderExportForm(forms.Form):
+    """注文エクスポートの条件（期間・ステータス・形式）"""
+    
+    date_from = forms.DateField(label='開始日', required=False)
+    date_to = forms.DateField(label='終了日', required=False)
+    status = forms.MultipleChoiceField(label='ステータス', choices=Order.STATUS_CHOICES, required=False)
+    format = forms.ChoiceField(label='形式', choices=[(fmt, fmt) for fmt in FORMATS], required=False)
+    lines = forms.BooleanField(label='注文商品単位', required=False)
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get('date_from')
+        date_to = cleaned_data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise forms.ValidationError('開始日は終了日以前の日付を指定してください。')
+        if not cleaned_data.get('format'):
+            cleaned_data['format'] = 'csv'
+        return cleaned_data
@@ -0,0 +1,27 @@
+"""
+注文商品に商品情報（商品名・スラッグ・画像）を記録するコマンド
+商品情報の記録機能を追加する前に作成された注文商品を対象とする
+
+使用例:
+    python manage.py backfill_order_item_snapshots
+    python manage.py backfill_order_item_snapshots --batch-size 5000
+"""
+from django.core.management.base import BaseCommand, CommandError
+from shop.services.order_service import OrderService
+
+
+class Command(BaseCommand):
+    help = '商品情報が未記録の注文商品に、現在の商品名・スラッグ・画像を記録します'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='1回のUPDATE文で更新する注文商品数（デフォルト: 1000）',
+        )
+    
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size には1以上を指定してください')
+        
+        updated = OrderService.backfill_item_snapshots(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'注文商品 {updated}件 に商品情報を記録しました'))
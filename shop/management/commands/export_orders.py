@@ -0,0 +1,67 @@
+"""
+注文をCSV/JSONLに書き出すコマンド（会計向け）
+注文を少しずつ読み込みながら書き出すため、件数が多くてもメモリを消費しない
+
+使用例:
+    python manage.py export_orders --from 2025-10-01 --to 2025-10-31 --lines --output 2025-10.csv
+    python manage.py export_orders --status delivered --status shipped --format jsonl > orders.jsonl
+"""
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from shop.models import Order
+from shop.services.order_service import OrderService
+from shop.utils.streaming import FORMATS, detect_format, iter_lines
+
+
+def parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f'日付は YYYY-MM-DD 形式で指定してください: {value}')
+
+
+class Command(BaseCommand):
+    help = '注文をCSV/JSONLに書き出します'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', type=parse_date, help='開始日（YYYY-MM-DD、この日を含む）')
+        parser.add_argument('--to', dest='date_to', type=parse_date, help='終了日（YYYY-MM-DD、この日を含む）')
+        parser.add_argument(
+            '--status', action='append', choices=[value for value, label in Order.STATUS_CHOICES],
+            help='ステータスで絞り込み（複数指定可）',
+        )
+        parser.add_argument('--lines', action='store_true', help='注文商品単位で出力')
+        parser.add_argument('--output', help='出力ファイル（省略時は標準出力）')
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='出力形式（省略時は出力ファイルの拡張子から判定、判定できなければcsv）',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='データベースから一度に取得する行数（デフォルト: 2000）',
+        )
+    
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size には1以上を指定してください')
+        if options['date_from'] and options['date_to'] and options['date_from'] > options['date_to']:
+            raise CommandError('--from には --to 以前の日付を指定してください')
+        
+        output = options['output']
+        fmt = options['format'] or detect_format(output or '')
+        orders = OrderService.filter_orders_for_export(
+            date_from=options['date_from'],
+            date_to=options['date_to'],
+            statuses=options['status'],
+        )
+        records, fieldnames = OrderService.export_records(
+            orders, lines=options['lines'], chunk_size=options['chunk_size']
+        )
+        lines = iter_lines(records, fmt, fieldnames)
+        
+        if output:
+            with open(output, 'w', encoding='utf-8-sig' if fmt == 'csv' else 'utf-8', newline='') as stream:
+                stream.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
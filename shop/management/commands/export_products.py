@@ -0,0 +1,39 @@
+"""
+商品をCSV/JSONLに書き出すコマンド
+import_products と同じ列で出力するため、そのまま再インポートできる
+
+使用例:
+    python manage.py export_products --output products.csv
+    python manage.py export_products --format jsonl --category electronics > electronics.jsonl
+"""
+from django.core.management.base import BaseCommand
+from shop.models import Product
+from shop.services.product_service import ProductService
+from shop.utils.streaming import FORMATS, detect_format, iter_lines
+
+
+class Command(BaseCommand):
+    help = '商品をCSV/JSONLに書き出します'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='出力ファイル（省略時は標準出力）')
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='出力形式（省略時は出力ファイルの拡張子から判定、判定できなければcsv）',
+        )
+        parser.add_argument('--category', help='カテゴリのスラッグで絞り込み')
+    
+    def handle(self, *args, **options):
+        output = options['output']
+        fmt = options['format'] or detect_format(output or '')
+        queryset = Product.objects.all()
+        if options['category']:
+            queryset = queryset.filter(category__slug=options['category'])
+        lines = iter_lines(ProductService.export_records(queryset), fmt, ProductService.FIELDS)
+        
+        if output:
+            with open(output, 'w', encoding='utf-8-sig' if fmt == 'csv' else 'utf-8', newline='') as stream:
+                stream.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,69 @@
+"""
+商品をCSV/JSONLから一括登録・更新するコマンド
+スラッグが一致する商品は上書きし、ファイルは先頭から逐次読み込む
+
+列: slug, name, category（カテゴリのスラッグ）, description, price, stock, is_active
+
+使用例:
+    python manage.py import_products products.csv
+    python manage.py import_products feed.jsonl --batch-size 5000
+    cat feed.jsonl | python manage.py import_products - --format jsonl
+"""
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from shop.services.product_service import ProductService
+from shop.utils.streaming import FORMATS, detect_format, iter_records
+
+
+class Command(BaseCommand):
+    help = '商品をCSV/JSONLから一括登録・更新します（スラッグで照合）'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='入力ファイル（- で標準入力）')
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='入力形式（省略時は拡張子から判定、判定できなければcsv）',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='1トランザクションで書き込む行数（デフォルト: 1000）',
+        )
+    
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size には1以上を指定してください')
+        path = options['path']
+        fmt = options['format'] or detect_format(path)
+        
+        try:
+            if path == '-':
+                report = self.import_stream(sys.stdin, fmt, options)
+            else:
+                with open(path, encoding='utf-8-sig', newline='') as stream:
+                    report = self.import_stream(stream, fmt, options)
+        except OSError as e:
+            raise CommandError(f'ファイルを開けません: {e}')
+        except ValueError as e:
+            raise CommandError(f'ファイルを読み込めません: {e}')
+        
+        for error in report['errors']:
+            self.stderr.write(error)
+        if report['skipped'] > len(report['errors']):
+            self.stderr.write(f"ほか {report['skipped'] - len(report['errors'])}件のエラー")
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"インポート完了: {report['rows']}行 (新規 {report['created']}件 / 更新 {report['updated']}件 / "
+            f"スキップ {report['skipped']}件, {report['batches']}バッチ, {report['elapsed']:.2f}秒, "
+            f"{report['rows_per_second']:.0f}行/秒)"
+        ))
+    
+    def import_stream(self, stream, fmt, options):
+        def progress(report):
+            if options['verbosity'] >= 2:
+                self.stdout.write(f"{report['rows']}行 処理済み")
+        
+        return ProductService.import_products(
+            iter_records(stream, fmt),
+            batch_size=options['batch_size'],
+            progress=progress,
+        )
@@ -0,0 +1,52 @@
+"""
+放置されたゲストカートを削除するコマンド
+
+使用例:
+    python manage.py purge_guest_carts --days 30
+    python manage.py purge_guest_carts --dry-run
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from shop.services.cart_service import CartService
+
+
+class Command(BaseCommand):
+    help = '一定期間更新されていないゲストカートを削除します'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.GUEST_CART_RETENTION_DAYS,
+            help=f'この日数以上更新されていないカートを削除（デフォルト: {settings.GUEST_CART_RETENTION_DAYS}）',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='1トランザクションで削除するカート数（デフォルト: 1000）',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='削除せずに対象件数のみ表示',
+        )
+    
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days には1以上を指定してください')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size には1以上を指定してください')
+        
+        report = CartService.purge_stale_guest_carts(
+            older_than=timedelta(days=options['days']),
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+        
+        if options['dry_run']:
+            self.stdout.write(
+                f"[dry-run] 削除対象: カート {report['carts']}件 / カート商品 {report['items']}件"
+            )
+            return
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"削除完了: カート {report['carts']}件 / カート商品 {report['items']}件 "
+            f"({report['batches']}バッチ, {report['elapsed']:.2f}秒, {report['carts_per_second']:.0f}件/秒)"
+        ))
@@ -0,0 +1,20 @@
+"""
+商品検索の索引を作り直すコマンド
+bulk_create や update() など、シグナルを経由しない一括更新の後に実行する
+
+使用例:
+    python manage.py rebuild_search_index
+"""
+from django.core.management.base import BaseCommand
+from shop.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = '商品検索の索引を作り直します'
+    
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        count = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'{type(backend).__name__}: 商品 {count}件 を索引に登録しました'
+        ))
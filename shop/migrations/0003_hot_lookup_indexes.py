@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:50
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_duplicate_carts(apps, schema_editor):
+    """
+    一意制約を追加する前に、同じユーザー・セッションの重複カートを1つにまとめる
+    最後に更新されたカートを残し、他のカートの商品数量を加算する
+    """
+    Cart = apps.get_model('shop', 'Cart')
+    CartItem = apps.get_model('shop', 'CartItem')
+
+    for field in ('user', 'session_key'):
+        duplicates = (
+            Cart.objects.filter(**{f'{field}__isnull': False})
+            .values(field)
+            .annotate(cart_count=Count('id'))
+            .filter(cart_count__gt=1)
+            .values_list(field, flat=True)
+        )
+        for owner in list(duplicates):
+            carts = list(Cart.objects.filter(**{field: owner}).order_by('-updated_at', '-id'))
+            keep, others = carts[0], carts[1:]
+            kept_items = {item.product_id: item for item in CartItem.objects.filter(cart=keep)}
+            for item in CartItem.objects.filter(cart__in=others):
+                if item.product_id in kept_items:
+                    kept = kept_items[item.product_id]
+                    kept.quantity += item.quantity
+                    kept.save(update_fields=['quantity'])
+                else:
+                    kept_items[item.product_id] = CartItem.objects.create(
+                        cart=keep, product_id=item.product_id, quantity=item.quantity
+                    )
+            Cart.objects.filter(id__in=[cart.id for cart in others]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0002_product_keyset_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', '-created_at'], name='shop_order_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', '-created_at'], name='shop_order_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_active', 'category', '-created_at', '-id'], name='shop_product_category_idx'),
+        ),
+        migrations.RunPython(merge_duplicate_carts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cart',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('user',), name='shop_cart_unique_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='cart',
+            constraint=models.UniqueConstraint(condition=models.Q(('session_key__isnull', False)), fields=('session_key',), name='shop_cart_unique_session_key'),
+        ),
+    ]
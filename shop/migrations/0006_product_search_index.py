@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:20
+
+from django.db import migrations
+from django.db.utils import OperationalError
+
+
+def create_search_index(apps, schema_editor):
+    """
+    SQLiteの場合、商品検索用のFTS5索引テーブルを作成し既存の商品を登録する
+    FTS5（trigram）に対応していないSQLiteでは作成せず、LIKE検索を使う
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE shop_product_fts USING fts5(name, description, tokenize='trigram')"
+        )
+    except OperationalError:
+        return
+    # 関連度（rank）は商品名の一致を説明の一致より重く評価する
+    schema_editor.execute(
+        "INSERT INTO shop_product_fts(shop_product_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')"
+    )
+    schema_editor.execute(
+        'INSERT INTO shop_product_fts(rowid, name, description) SELECT id, name, description FROM shop_product'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS shop_product_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0005_orderitem_product_snapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
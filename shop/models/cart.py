@@ -1,7 +1,10 @@
 """
 Cart Models - カート関連
 """
+from decimal import Decimal
 from django.db import models
+from django.db.models import F, Prefetch, Sum, Value, prefetch_related_objects
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from .product import Product
 
@@ -16,19 +19,80 @@ class Cart(models.Model):
     class Meta:
         verbose_name = 'カート'
         verbose_name_plural = 'カート'
+        constraints = [
+            # ユーザー・セッションごとにカートは1つ（get_or_create をインデックスで解決し、同時作成を防ぐ）
+            models.UniqueConstraint(
+                fields=['user'], condition=models.Q(user__isnull=False), name='shop_cart_unique_user'
+            ),
+            models.UniqueConstraint(
+                fields=['session_key'], condition=models.Q(session_key__isnull=False),
+                name='shop_cart_unique_session_key'
+            ),
+        ]
+        indexes = [
+            # 放置されたゲストカートの削除用
+            models.Index(
+                fields=['updated_at'], condition=models.Q(user__isnull=True), name='shop_cart_guest_updated_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"Cart {self.id}"
 
+    def _get_totals(self):
+        """
+        合計数量・合計金額をまとめて計算し、インスタンスにキャッシュする
+        items がプリフェッチ済みならそれを使い、未取得なら1回の集計クエリで求める
+        """
+        totals = getattr(self, '_totals_cache', None)
+        if totals is None:
+            prefetched = getattr(self, '_prefetched_objects_cache', {}).get('items')
+            if prefetched is not None:
+                totals = {
+                    'total_items': sum(item.quantity for item in prefetched),
+                    'total_price': sum((item.subtotal for item in prefetched), Decimal('0')),
+                }
+            else:
+                totals = self.items.aggregate(
+                    total_items=Coalesce(Sum('quantity'), Value(0)),
+                    total_price=Coalesce(
+                        Sum(
+                            F('quantity') * F('product__price'),
+                            output_field=models.DecimalField(max_digits=12, decimal_places=0),
+                        ),
+                        Value(Decimal('0')),
+                        output_field=models.DecimalField(max_digits=12, decimal_places=0),
+                    ),
+                )
+            self._totals_cache = totals
+        return totals
+
+    def prefetch_items(self):
+        """商品情報付きでカート商品を一括取得する（テンプレートでの N+1 を防ぐ）"""
+        if 'items' not in getattr(self, '_prefetched_objects_cache', {}):
+            prefetch_related_objects(
+                [self], Prefetch('items', queryset=CartItem.objects.select_related('product'))
+            )
+        return self
+
+    def invalidate_totals(self):
+        """合計値のキャッシュとプリフェッチ済みの商品一覧を破棄する"""
+        self._totals_cache = None
+        getattr(self, '_prefetched_objects_cache', {}).pop('items', None)
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.invalidate_totals()
+
     @property
     def total_price(self):
         """カート内商品の合計金額"""
-        return sum(item.subtotal for item in self.items.all())
+        return self._get_totals()['total_price']
 
     @property
     def total_items(self):
         """カート内商品の合計数量"""
-        return sum(item.quantity for item in self.items.all())
+        return self._get_totals()['total_items']
 
 
 class CartItem(models.Model):
@@ -47,6 +111,20 @@ class CartItem(models.Model):
     def __str__(self):
         return f"{self.product.name} x {self.quantity}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._invalidate_cart_totals()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self._invalidate_cart_totals()
+        return result
+
+    def _invalidate_cart_totals(self):
+        """取得済みのカートがあれば合計値のキャッシュを破棄する"""
+        if CartItem.cart.is_cached(self):
+            self.cart.invalidate_totals()
+
     @property
     def subtotal(self):
         """小計"""
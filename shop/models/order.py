@@ -33,6 +33,14 @@ class Order(models.Model):
         verbose_name = '注文'
         verbose_name_plural = '注文'
         ordering = ['-created_at']
+        indexes = [
+            # 注文履歴（ユーザーごとに新しい順）
+            models.Index(fields=['user', '-created_at'], name='shop_order_user_created_idx'),
+            # 管理画面のステータス絞り込み
+            models.Index(fields=['status', '-created_at'], name='shop_order_status_idx'),
+            # 期間指定のエクスポート
+            models.Index(fields=['created_at'], name='shop_order_created_idx'),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} - {self.user.username}"
@@ -41,7 +49,12 @@ class Order(models.Model):
 class OrderItem(models.Model):
     """注文商品モデル"""
     order = models.ForeignKey(Order, on_delete=models.CASCADE, verbose_name='注文', related_name='items')
-    product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name='商品')
+    # 商品が削除されても注文履歴は残す
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True, verbose_name='商品')
+    # 注文時点の商品情報（履歴の表示に商品テーブルを参照しない）
+    product_name = models.CharField('商品名', max_length=200, blank=True)
+    product_slug = models.SlugField('スラッグ', blank=True, db_index=False)
+    product_image = models.ImageField('商品画像', upload_to='products/', blank=True)
     quantity = models.IntegerField('数量')
     price = models.DecimalField('単価', max_digits=10, decimal_places=0)
 
@@ -50,7 +63,18 @@ class OrderItem(models.Model):
         verbose_name_plural = '注文商品'
 
     def __str__(self):
-        return f"{self.product.name} x {self.quantity}"
+        return f"{self.product_name} x {self.quantity}"
+
+    def save(self, *args, **kwargs):
+        if self.product_id and not self.product_name:
+            self.snapshot_product(self.product)
+        super().save(*args, **kwargs)
+
+    def snapshot_product(self, product):
+        """商品名・スラッグ・画像を注文商品に記録する"""
+        self.product_name = product.name
+        self.product_slug = product.slug
+        self.product_image = product.image.name or ''
 
     @property
     def subtotal(self):
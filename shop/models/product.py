@@ -22,6 +22,12 @@ class Product(models.Model):
         verbose_name = '商品'
         verbose_name_plural = '商品'
         ordering = ['-created_at']
+        indexes = [
+            # 商品一覧のキーセットページング用（is_active で絞り込み、(created_at, id) の降順）
+            models.Index(fields=['is_active', '-created_at', '-id'], name='shop_product_keyset_idx'),
+            # カテゴリ別の商品一覧用
+            models.Index(fields=['is_active', 'category', '-created_at', '-id'], name='shop_product_category_idx'),
+        ]
 
     def __str__(self):
         return self.name
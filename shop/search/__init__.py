@@ -0,0 +1,12 @@
+"""
+Shop Search Package
+商品検索（バックエンドは SHOP_SEARCH_BACKEND で切り替え）
+"""
+from .backends import BaseSearchBackend, SimpleSearchBackend, SQLiteFTSBackend, get_search_backend
+
+__all__ = [
+    'BaseSearchBackend',
+    'SimpleSearchBackend',
+    'SQLiteFTSBackend',
+    'get_search_backend',
+]
@@ -0,0 +1,137 @@
+"""
+Search Backends - 商品検索のバックエンド
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils.module_loading import import_string
+from shop.models import Product
+
+# 1回の検索で扱う語の最大数
+MAX_TERMS = 10
+
+
+def split_terms(query):
+    """検索語を空白（全角空白を含む）で分割する"""
+    return query.split()[:MAX_TERMS]
+
+
+class BaseSearchBackend:
+    """
+    検索バックエンドの基底クラス
+    search() は渡されたクエリセット（販売中・カテゴリ等で絞り込み済み）を検索語で絞り込み、関連度順に並べて返す
+    """
+    
+    def search(self, queryset, query):
+        raise NotImplementedError
+    
+    def index_products(self, products):
+        """商品を索引に登録（更新）する"""
+        pass
+    
+    def remove_products(self, product_ids):
+        """商品を索引から削除する"""
+        pass
+    
+    def rebuild(self):
+        """索引を作り直し、登録した商品数を返す"""
+        return 0
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """
+    LIKE検索によるバックエンド（索引なし）
+    全文検索に対応していないデータベースや、全文検索の索引が使えない短い検索語で使用する
+    """
+    
+    def search(self, queryset, query):
+        terms = split_terms(query)
+        if not terms:
+            return queryset.none()
+        for term in terms:
+            queryset = queryset.filter(Q(name__icontains=term) | Q(description__icontains=term))
+        # 商品名に一致するものを優先する
+        name_match = Case(When(name__icontains=terms[0], then=Value(0)), default=Value(1), output_field=IntegerField())
+        return queryset.annotate(search_rank=name_match).order_by('search_rank', '-created_at', '-id')
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """
+    SQLite FTS5 の転置索引によるバックエンド
+    日本語は単語の区切りがないため trigram トークナイザーを使い、3文字未満の語を含む検索はLIKE検索で行う
+    索引テーブルはマイグレーション（0006_product_search_index）で作成する
+    """
+    
+    TABLE = 'shop_product_fts'
+    MIN_TERM_LENGTH = 3
+    CHUNK_SIZE = 500
+    
+    _available = None
+    
+    @classmethod
+    def is_available(cls):
+        """索引テーブルが存在するか（プロセス内でキャッシュ）"""
+        if cls._available is None:
+            cls._available = cls.TABLE in connection.introspection.table_names()
+        return cls._available
+    
+    @staticmethod
+    def match_expression(terms):
+        """検索語をFTS5のMATCH式（各語をフレーズとしてAND検索）に変換する"""
+        return ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+    
+    def search(self, queryset, query):
+        terms = split_terms(query)
+        if not terms:
+            return queryset.none()
+        if any(len(term) < self.MIN_TERM_LENGTH for term in terms):
+            return SimpleSearchBackend().search(queryset, query)
+        
+        # 索引テーブル（仮想テーブル）との結合はORMで表現できないため extra() を使う
+        # rank はマイグレーションで設定した重み付きの bm25（値が小さいほど関連度が高い）
+        # 同じ関連度の商品は SimpleSearchBackend と同じく新しい順に並べ、ページングの結果を安定させる
+        return queryset.extra(
+            tables=[self.TABLE],
+            where=[f'{self.TABLE}.rowid = {Product._meta.db_table}.id', f'{self.TABLE} MATCH %s'],
+            params=[self.match_expression(terms)],
+            select={'search_rank': f'{self.TABLE}.rank'},
+            order_by=['search_rank', '-created_at', '-id'],
+        )
+    
+    def index_products(self, products):
+        products = list(products)
+        self.remove_products([product.pk for product in products])
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {self.TABLE}(rowid, name, description) VALUES (%s, %s, %s)',
+                [(product.pk, product.name, product.description) for product in products]
+            )
+    
+    def remove_products(self, product_ids):
+        product_ids = list(product_ids)
+        with connection.cursor() as cursor:
+            for start in range(0, len(product_ids), self.CHUNK_SIZE):
+                chunk = product_ids[start:start + self.CHUNK_SIZE]
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(f'DELETE FROM {self.TABLE} WHERE rowid IN ({placeholders})', chunk)
+    
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.TABLE}')
+            cursor.execute(
+                f'INSERT INTO {self.TABLE}(rowid, name, description) '
+                f'SELECT id, name, description FROM {Product._meta.db_table}'
+            )
+            return cursor.rowcount
+
+
+def get_search_backend():
+    """
+    設定に応じた検索バックエンドを返す
+    SHOP_SEARCH_BACKEND が未設定の場合、SQLiteで索引テーブルがあれば SQLiteFTSBackend を使う
+    """
+    if settings.SHOP_SEARCH_BACKEND:
+        return import_string(settings.SHOP_SEARCH_BACKEND)()
+    if connection.vendor == 'sqlite' and SQLiteFTSBackend.is_available():
+        return SQLiteFTSBackend()
+    return SimpleSearchBackend()
@@ -2,10 +2,19 @@
 Services Package
 ビジネスロジック層
 """
-from .cart_service import CartService
-from .order_service import OrderService
+from .cart_service import CartService, CartOperationError
+from .order_service import OrderService, BulkStatusResult
+from .product_service import ProductService
+from .session_cart import SessionCart
+from .stock_service import StockService, InsufficientStockError
 
 __all__ = [
     'CartService',
+    'CartOperationError',
     'OrderService',
+    'BulkStatusResult',
+    'ProductService',
+    'SessionCart',
+    'StockService',
+    'InsufficientStockError',
 ]
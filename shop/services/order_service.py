@@ -1,45 +1,94 @@
 """
 Order Service - 注文関連のビジネスロジック
 """
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+from decimal import Decimal
 from django.db import transaction
-from shop.models import Order, OrderItem
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from shop.models import Order, OrderItem, Product
+from .cart_service import CartService
+from .stock_service import StockService
+
+
+# 一括ステータス変更の結果（変更した件数・遷移できずに対象外とした件数）
+BulkStatusResult = namedtuple('BulkStatusResult', ['updated', 'skipped'])
 
 
 class OrderService:
     """注文管理サービス"""
     
+    # キャンセルできるステータス
+    CANCELLABLE_STATUSES = ['pending', 'processing', 'shipped']
+    
+    # 一括変更で許可するステータス遷移（変更後 -> 変更前）
+    # キャンセルは在庫を戻すため bulk_cancel で行う
+    STATUS_TRANSITIONS = {
+        'processing': ['pending'],
+        'shipped': ['pending', 'processing'],
+        'delivered': ['shipped'],
+    }
+    
+    # 注文エクスポートの列（注文単位）
+    ORDER_EXPORT_FIELDS = [
+        'order_id', 'created_at', 'status', 'username', 'total_amount',
+        'shipping_name', 'shipping_postal_code', 'shipping_address', 'shipping_phone',
+    ]
+    
+    # 注文エクスポートの列（注文商品単位）
+    LINE_EXPORT_FIELDS = [
+        'order_id', 'created_at', 'status', 'username',
+        'product_slug', 'product_name', 'quantity', 'price', 'subtotal',
+    ]
+    
     @staticmethod
     @transaction.atomic
     def create_order_from_cart(user, cart, shipping_data):
         """
         カートから注文を作成
         在庫を減らし、カートをクリアする
+        在庫が足りない場合はInsufficientStockErrorを送出し、注文は作成しない
         """
+        # カート商品を商品情報付きで一括取得（合計金額もここから計算）
+        items = list(cart.prefetch_items().items.all())
+        
+        # 在庫を引き当てる
+        quantities = {}
+        for item in items:
+            quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+        StockService.reserve(quantities)
+        
+        total_amount = sum((item.subtotal for item in items), Decimal('0'))
+        
         # 注文を作成
         order = Order.objects.create(
             user=user,
-            total_amount=cart.total_price,
+            total_amount=total_amount,
             shipping_name=shipping_data['shipping_name'],
             shipping_postal_code=shipping_data['shipping_postal_code'],
             shipping_address=shipping_data['shipping_address'],
             shipping_phone=shipping_data['shipping_phone'],
         )
         
-        # 注文商品を作成
-        for item in cart.items.all():
-            OrderItem.objects.create(
+        # 注文商品を一括作成（bulk_createはsave()を呼ばないため商品情報をここで記録する）
+        order_items = []
+        for item in items:
+            order_item = OrderItem(
                 order=order,
                 product=item.product,
                 quantity=item.quantity,
                 price=item.product.price,
             )
-            
-            # 在庫を減らす
-            item.product.stock -= item.quantity
-            item.product.save()
+            order_item.snapshot_product(item.product)
+            order_items.append(order_item)
+        OrderItem.objects.bulk_create(order_items)
         
         # カートをクリア
         cart.items.all().delete()
+        cart.invalidate_totals()
+        transaction.on_commit(lambda: CartService.set_item_count(cart, 0))
         
         return order
     
@@ -49,20 +98,84 @@ class OrderService:
         """
         注文をキャンセルし、在庫を戻す
         """
-        if order.status in ['delivered', 'cancelled']:
+        if order.status not in OrderService.CANCELLABLE_STATUSES:
+            raise ValueError('配達済みまたはキャンセル済みの注文はキャンセルできません')
+        
+        # ステータスを条件付きで更新（同時にキャンセルされた場合の二重返品を防ぐ）
+        now = timezone.now()
+        updated = Order.objects.filter(
+            pk=order.pk, status__in=OrderService.CANCELLABLE_STATUSES
+        ).update(status='cancelled', updated_at=now)
+        if not updated:
             raise ValueError('配達済みまたはキャンセル済みの注文はキャンセルできません')
         
         # 在庫を戻す
-        for item in order.items.all():
-            item.product.stock += item.quantity
-            item.product.save()
+        OrderService._restock([order.pk])
         
-        # ステータスを更新
         order.status = 'cancelled'
-        order.save()
+        order.updated_at = now
         
         return order
     
+    @staticmethod
+    def _restock(order_ids):
+        """注文商品の数量を商品ごとに合計し、1回のUPDATE文で在庫に戻す（削除済みの商品は除く）"""
+        quantities = dict(
+            OrderItem.objects.filter(order_id__in=order_ids, product__isnull=False)
+            .values('product_id')
+            .annotate(quantity=Sum('quantity'))
+            .values_list('product_id', 'quantity')
+        )
+        StockService.release(quantities)
+    
+    @staticmethod
+    @transaction.atomic
+    def bulk_update_status(orders, new_status):
+        """
+        複数の注文のステータスを1回のUPDATE文で変更する
+        STATUS_TRANSITIONS で許可されていない遷移の注文はWHERE句で除外し、対象外の件数として返す
+        new_status に 'cancelled' を指定した場合は bulk_cancel で在庫も戻す
+        """
+        if new_status == 'cancelled':
+            return OrderService.bulk_cancel(orders)
+        if new_status not in OrderService.STATUS_TRANSITIONS:
+            raise ValueError(f'無効なステータス: {new_status}')
+        
+        selected = Order.objects.filter(pk__in=orders.values('pk'))
+        total = selected.count()
+        updated = selected.filter(
+            status__in=OrderService.STATUS_TRANSITIONS[new_status]
+        ).update(status=new_status, updated_at=timezone.now())
+        return BulkStatusResult(updated, total - updated)
+    
+    @staticmethod
+    @transaction.atomic
+    def bulk_cancel(orders):
+        """
+        複数の注文をまとめてキャンセルし、在庫を戻す
+        ステータスの変更は1回のUPDATE文、在庫の戻しは商品ごとに合計した1回のUPDATE文で行う
+        キャンセルできない注文（配達済み・キャンセル済み）は対象外の件数として返す
+        """
+        selected = Order.objects.filter(pk__in=orders.values('pk'))
+        total = selected.count()
+        # 対応しているバックエンドでは行ロックを取得し、同時にキャンセルされた場合の二重返品を防ぐ
+        order_ids = list(
+            selected.filter(status__in=OrderService.CANCELLABLE_STATUSES)
+            .select_for_update().order_by('pk').values_list('pk', flat=True)
+        )
+        if not order_ids:
+            return BulkStatusResult(0, total)
+        
+        updated = Order.objects.filter(
+            pk__in=order_ids, status__in=OrderService.CANCELLABLE_STATUSES
+        ).update(status='cancelled', updated_at=timezone.now())
+        if updated != len(order_ids):
+            # 行ロック非対応のバックエンドで他の処理と競合した場合（トランザクションごと取り消す）
+            raise ValueError('他の処理で注文が更新されたため、キャンセルできませんでした')
+        
+        OrderService._restock(order_ids)
+        return BulkStatusResult(updated, total - updated)
+    
     @staticmethod
     def update_order_status(order, new_status):
         """注文ステータスを更新"""
@@ -73,3 +186,101 @@ class OrderService:
         order.status = new_status
         order.save()
         return order
+    
+    @staticmethod
+    def get_order_history(user):
+        """
+        注文履歴一覧用のクエリセット
+        一覧に表示する列のみを取得し、注文ごとの商品点数をSQLで集計する
+        """
+        return (
+            Order.objects.filter(user=user)
+            .only('id', 'status', 'total_amount', 'created_at')
+            .annotate(item_count=Count('items'))
+            .order_by('-created_at', '-id')
+        )
+    
+    @staticmethod
+    def get_orders_with_items(user):
+        """
+        注文詳細用のクエリセット（注文商品をプリフェッチ）
+        注文商品は商品情報を記録しているため、商品テーブルは参照しない
+        """
+        return Order.objects.filter(user=user).prefetch_related('items')
+    
+    @staticmethod
+    def backfill_item_snapshots(batch_size=1000):
+        """
+        商品情報が未記録の注文商品に、現在の商品名・スラッグ・画像を記録する
+        主キー順に batch_size 件ずつ、1バッチ1回のUPDATE文で更新し、更新件数を返す
+        """
+        product = Product.objects.filter(pk=OuterRef('product_id'))
+        pending = OrderItem.objects.filter(product_name='', product__isnull=False).order_by('pk')
+        updated = 0
+        last_pk = 0
+        while True:
+            ids = list(pending.filter(pk__gt=last_pk).values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            updated += OrderItem.objects.filter(pk__in=ids).update(
+                product_name=Subquery(product.values('name')[:1]),
+                product_slug=Subquery(product.values('slug')[:1]),
+                product_image=Coalesce(Subquery(product.values('image')[:1]), Value('')),
+            )
+            last_pk = ids[-1]
+        return updated
+    
+    @staticmethod
+    def filter_orders_for_export(date_from=None, date_to=None, statuses=None, queryset=None):
+        """
+        エクスポート対象の注文を絞り込む
+        日付（両端を含む、現地時間）は created_at の範囲条件に変換し、インデックスを使えるようにする
+        """
+        if queryset is None:
+            queryset = Order.objects.all()
+        if date_from:
+            queryset = queryset.filter(created_at__gte=timezone.make_aware(datetime.combine(date_from, time.min)))
+        if date_to:
+            next_day = date_to + timedelta(days=1)
+            queryset = queryset.filter(created_at__lt=timezone.make_aware(datetime.combine(next_day, time.min)))
+        if statuses:
+            queryset = queryset.filter(status__in=statuses)
+        return queryset
+    
+    @staticmethod
+    def export_orders(orders, chunk_size=2000):
+        """
+        注文を1件ずつ辞書として返す
+        必要な列だけをタプルで chunk_size 件ずつ取得し、全件をメモリに載せない
+        """
+        rows = orders.order_by('id').values_list(
+            'id', 'created_at', 'status', 'user__username', 'total_amount',
+            'shipping_name', 'shipping_postal_code', 'shipping_address', 'shipping_phone',
+        )
+        for row in rows.iterator(chunk_size=chunk_size):
+            record = dict(zip(OrderService.ORDER_EXPORT_FIELDS, row))
+            record['created_at'] = timezone.localtime(record['created_at'])
+            yield record
+    
+    @staticmethod
+    def export_order_lines(orders, chunk_size=2000):
+        """
+        注文商品を1件ずつ辞書として返す（注文の情報を各行に含める）
+        必要な列だけをタプルで chunk_size 件ずつ取得し、全件をメモリに載せない
+        """
+        rows = OrderItem.objects.filter(order__in=orders).order_by('order_id', 'id').values_list(
+            'order_id', 'order__created_at', 'order__status', 'order__user__username',
+            'product_slug', 'product_name', 'quantity', 'price',
+        )
+        for row in rows.iterator(chunk_size=chunk_size):
+            record = dict(zip(OrderService.LINE_EXPORT_FIELDS, row))
+            record['created_at'] = timezone.localtime(record['created_at'])
+            record['subtotal'] = record['price'] * record['quantity']
+            yield record
+    
+    @staticmethod
+    def export_records(orders, lines=True, chunk_size=2000):
+        """エクスポートする辞書のイテラブルと列名を返す"""
+        if lines:
+            return OrderService.export_order_lines(orders, chunk_size), OrderService.LINE_EXPORT_FIELDS
+        return OrderService.export_orders(orders, chunk_size), OrderService.ORDER_EXPORT_FIELDS
@@ -0,0 +1,126 @@
+"""
+Product Service - 商品の一括インポート・エクスポート
+"""
+import time
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from shop.models import Category, Product
+from shop.search import get_search_backend
+from shop.utils.catalog_cache import bump_catalog_version
+from shop.utils.streaming import chunked
+
+
+class ProductService:
+    """商品管理サービス"""
+    
+    # インポート・エクスポートの列（category はカテゴリのスラッグ）
+    FIELDS = ['slug', 'name', 'category', 'description', 'price', 'stock', 'is_active']
+    
+    # スラッグが既存の商品と一致した場合に上書きする列
+    UPDATE_FIELDS = ['name', 'category', 'description', 'price', 'stock', 'is_active', 'updated_at']
+    
+    # レポートに含めるエラーの最大件数
+    MAX_REPORTED_ERRORS = 20
+    
+    @staticmethod
+    def _parse_bool(value, default=True):
+        if isinstance(value, bool):
+            return value
+        if value is None or str(value).strip() == '':
+            return default
+        return str(value).strip().lower() in ('1', 'true', 'yes', 'on', 't', 'y')
+    
+    @staticmethod
+    def _parse_record(record, category_ids):
+        """
+        入力の1件を保存前の Product に変換する
+        不正な値の場合は ValueError / ValidationError を送出する
+        """
+        category_slug = str(record.get('category') or '').strip()
+        if category_slug not in category_ids:
+            raise ValueError(f'カテゴリ「{category_slug}」が存在しません')
+        try:
+            price = Decimal(str(record.get('price', '')).strip())
+        except ArithmeticError:
+            raise ValueError(f"価格「{record.get('price')}」が不正です")
+        
+        product = Product(
+            slug=str(record.get('slug') or '').strip(),
+            name=str(record.get('name') or '').strip(),
+            category_id=category_ids[category_slug],
+            description=str(record.get('description') or ''),
+            price=price,
+            stock=int(record.get('stock') or 0),
+            is_active=ProductService._parse_bool(record.get('is_active')),
+        )
+        # 一意性のチェック（1件ごとのクエリ）は行わず、桁数・書式のみ検証する
+        product.clean_fields(exclude=['category', 'image'])
+        return product
+    
+    @staticmethod
+    def import_products(records, batch_size=1000, progress=None):
+        """
+        商品を一括で登録・更新（スラッグで照合）する
+        records は辞書のイテラブルで、batch_size 件ずつ1トランザクションで書き込む
+        不正な行はスキップし、件数・エラー内容・処理時間・スループットをまとめた辞書を返す
+        progress を指定すると、バッチごとに途中経過の辞書を渡して呼び出す
+        """
+        started = time.monotonic()
+        category_ids = dict(Category.objects.values_list('slug', 'id'))
+        search_backend = get_search_backend()
+        report = {'rows': 0, 'created': 0, 'updated': 0, 'skipped': 0, 'batches': 0, 'errors': []}
+        
+        for chunk in chunked(enumerate(records, start=1), batch_size):
+            products = {}
+            for row_number, record in chunk:
+                report['rows'] += 1
+                try:
+                    product = ProductService._parse_record(record, category_ids)
+                except (ValueError, TypeError, ValidationError) as e:
+                    report['skipped'] += 1
+                    if len(report['errors']) < ProductService.MAX_REPORTED_ERRORS:
+                        message = '; '.join(e.messages) if isinstance(e, ValidationError) else str(e)
+                        report['errors'].append(f'{row_number}件目: {message}')
+                    continue
+                # 同じスラッグが複数回現れた場合は後の行を採用する
+                products[product.slug] = product
+            
+            if products:
+                with transaction.atomic():
+                    existing = Product.objects.filter(slug__in=products).count()
+                    Product.objects.bulk_create(
+                        products.values(),
+                        update_conflicts=True,
+                        unique_fields=['slug'],
+                        update_fields=ProductService.UPDATE_FIELDS,
+                    )
+                    # bulk_create はシグナルを経由しないため、検索索引をここで更新する
+                    search_backend.index_products(
+                        Product.objects.filter(slug__in=products).only('id', 'name', 'description')
+                    )
+                report['created'] += len(products) - existing
+                report['updated'] += existing
+            report['batches'] += 1
+            if progress is not None:
+                progress(report)
+        
+        if report['created'] or report['updated']:
+            bump_catalog_version()
+        report['elapsed'] = time.monotonic() - started
+        report['rows_per_second'] = report['rows'] / report['elapsed'] if report['elapsed'] else 0
+        return report
+    
+    @staticmethod
+    def export_records(queryset=None, chunk_size=2000):
+        """
+        商品をインポートと同じ列の辞書として1件ずつ返す
+        サーバーサイドカーソルで chunk_size 件ずつ取得し、全件をメモリに載せない
+        """
+        if queryset is None:
+            queryset = Product.objects.all()
+        rows = queryset.order_by('id').values_list(
+            'slug', 'name', 'category__slug', 'description', 'price', 'stock', 'is_active'
+        )
+        for row in rows.iterator(chunk_size=chunk_size):
+            yield dict(zip(ProductService.FIELDS, row))
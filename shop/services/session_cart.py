@@ -0,0 +1,133 @@
+"""
+Session Cart - セッションに保存するゲストカート
+CART_GUEST_STORAGE = 'session' の場合に使用する
+"""
+from decimal import Decimal
+from shop.models import CartItem, Product
+from .stock_service import InsufficientStockError, StockShortage
+
+
+class SessionCartItems:
+    """テンプレート・ビューから Cart.items と同じように参照するためのラッパー"""
+    
+    def __init__(self, cart):
+        self.cart = cart
+    
+    def all(self):
+        return self.cart.load_items()
+    
+    def count(self):
+        return len(self.cart.load_items())
+    
+    def __iter__(self):
+        return iter(self.cart.load_items())
+
+
+class SessionCart:
+    """
+    セッションに保存するゲストカート
+    {商品ID: 数量} だけをセッションに保存し、カート・カート商品の行は作成しない
+    ログイン時に CartService.merge_guest_cart_to_user でユーザーのカートに取り込む
+    カート商品の id には商品IDを使う（数量変更・削除のURLで指定する）
+    """
+    
+    SESSION_KEY = 'shop_cart'
+    
+    id = pk = None
+    user_id = None
+    updated_at = None
+    
+    def __init__(self, session):
+        self.session = session
+        self.lines = {
+            int(product_id): quantity
+            for product_id, quantity in session.get(self.SESSION_KEY, {}).items()
+        }
+        self._items = None
+    
+    def __str__(self):
+        return f"SessionCart {self.session_key}"
+    
+    @classmethod
+    def exists(cls, session):
+        """セッションにカートが保存されているか"""
+        return cls.SESSION_KEY in session
+    
+    @property
+    def session_key(self):
+        return self.session.session_key
+    
+    @property
+    def items(self):
+        return SessionCartItems(self)
+    
+    @classmethod
+    def item_count(cls, session):
+        """セッションの数量の合計（ナビバーのバッジ用。データベースにアクセスしない）"""
+        return sum(session.get(cls.SESSION_KEY, {}).values())
+    
+    def load_items(self):
+        """
+        カート商品を1回のクエリで取得する（保存されていないCartItemのリスト）
+        削除された商品は含めない（セッションからは prune で取り除く）
+        """
+        if self._items is None:
+            products = Product.objects.in_bulk(self.lines) if self.lines else {}
+            self._items = [
+                CartItem(id=product_id, product=products[product_id], quantity=quantity)
+                for product_id, quantity in self.lines.items() if product_id in products
+            ]
+        return self._items
+    
+    def prune(self):
+        """削除された商品をセッションから取り除く（カートページで呼び出す）"""
+        items = self.load_items()
+        if len(items) != len(self.lines):
+            self.lines = {item.id: item.quantity for item in items}
+            self.save()
+            self._items = items
+        return self
+    
+    def prefetch_items(self):
+        self.load_items()
+        return self
+    
+    def invalidate_totals(self):
+        self._items = None
+    
+    @property
+    def total_price(self):
+        """カート内商品の合計金額"""
+        return sum((item.subtotal for item in self.load_items()), Decimal('0'))
+    
+    @property
+    def total_items(self):
+        """カート内商品の合計数量"""
+        return sum(item.quantity for item in self.load_items())
+    
+    def add(self, product, quantity):
+        """商品を追加する（加算後の数量が在庫数を超える場合はInsufficientStockError）"""
+        new_quantity = self.lines.get(product.pk, 0) + quantity
+        if new_quantity > product.stock:
+            raise InsufficientStockError([
+                StockShortage(product.pk, product.name, new_quantity, product.stock)
+            ])
+        self.lines[product.pk] = new_quantity
+        self.save()
+    
+    def clear(self):
+        self.lines = {}
+        self.save()
+    
+    def save(self):
+        """
+        セッションに書き戻す（セッションはレスポンス時にミドルウェアが保存する）
+        JSONでシリアライズするため商品IDは文字列にする
+        """
+        if self.lines:
+            self.session[self.SESSION_KEY] = {
+                str(product_id): quantity for product_id, quantity in self.lines.items()
+            }
+        else:
+            self.session.pop(self.SESSION_KEY, None)
+        self.invalidate_totals()
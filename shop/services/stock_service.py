@@ -0,0 +1,105 @@
+"""
+Stock Service - 在庫引当関連のビジネスロジック
+"""
+from collections import namedtuple
+from functools import reduce
+from operator import or_
+from django.db import transaction
+from django.db.models import Case, F, Q, When
+from django.utils import timezone
+from shop.models import Product
+
+
+# 在庫不足の内訳（商品ごと）
+StockShortage = namedtuple('StockShortage', ['product_id', 'product_name', 'requested', 'available'])
+
+
+class InsufficientStockError(ValueError):
+    """在庫不足で引当できなかった場合の例外"""
+    
+    def __init__(self, shortages):
+        self.shortages = list(shortages)
+        names = '、'.join(shortage.product_name for shortage in self.shortages)
+        super().__init__(f'在庫が不足しています: {names}')
+
+
+class StockService:
+    """在庫管理サービス"""
+    
+    @staticmethod
+    def _stock_case(quantities, sign):
+        """商品ごとに在庫を増減するCASE式"""
+        return Case(
+            *[When(id=product_id, then=F('stock') + sign * quantity)
+              for product_id, quantity in quantities.items()],
+            default=F('stock'),
+        )
+    
+    @staticmethod
+    def _load_stocks(product_ids, lock=False):
+        """{商品ID: (商品名, 在庫数)} を取得する"""
+        queryset = Product.objects.filter(id__in=product_ids).order_by('id')
+        if lock:
+            queryset = queryset.select_for_update()
+        return {
+            product_id: (name, stock)
+            for product_id, name, stock in queryset.values_list('id', 'name', 'stock')
+        }
+    
+    @staticmethod
+    def find_shortages(quantities, stocks):
+        """
+        在庫不足の商品を調べる
+        quantities: {商品ID: 必要数}, stocks: {商品ID: (商品名, 在庫数)}
+        """
+        shortages = []
+        for product_id, quantity in quantities.items():
+            name, stock = stocks.get(product_id, ('', 0))
+            if stock < quantity:
+                shortages.append(StockShortage(product_id, name, quantity, max(stock, 0)))
+        return shortages
+    
+    @staticmethod
+    @transaction.atomic
+    def reserve(quantities):
+        """
+        在庫を引き当てる
+        {商品ID: 数量} を受け取り、全商品の在庫が足りる場合のみまとめて減らす
+        1つでも不足があればInsufficientStockErrorを送出し、在庫は変更しない
+        """
+        quantities = {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}
+        if not quantities:
+            return
+        
+        # 対応しているバックエンドでは行ロックを取得する（デッドロック回避のためID順）
+        stocks = StockService._load_stocks(quantities, lock=True)
+        shortages = StockService.find_shortages(quantities, stocks)
+        if shortages:
+            raise InsufficientStockError(shortages)
+        
+        # 在庫数が足りる行だけを更新する条件付きUPDATE（UPDATE ... WHERE stock >= n）
+        condition = reduce(or_, [
+            Q(id=product_id, stock__gte=quantity) for product_id, quantity in quantities.items()
+        ])
+        updated = Product.objects.filter(condition).update(
+            stock=StockService._stock_case(quantities, -1),
+            updated_at=timezone.now(),
+        )
+        if updated != len(quantities):
+            # 行ロック非対応のバックエンドで他の注文と競合した場合
+            stocks = StockService._load_stocks(quantities)
+            raise InsufficientStockError(StockService.find_shortages(quantities, stocks))
+    
+    @staticmethod
+    def release(quantities):
+        """
+        引き当てた在庫を戻す
+        {商品ID: 数量} を受け取り、1回のUPDATE文でまとめて加算する
+        """
+        quantities = {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}
+        if not quantities:
+            return
+        Product.objects.filter(id__in=quantities).update(
+            stock=StockService._stock_case(quantities, 1),
+            updated_at=timezone.now(),
+        )
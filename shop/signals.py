@@ -0,0 +1,31 @@
+"""
+Signals - シグナルハンドラ
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from shop.models import Category, Product
+from shop.search import get_search_backend
+from shop.utils.catalog_cache import bump_catalog_version
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_catalog_cache(sender, **kwargs):
+    """商品・カテゴリの更新時にカタログのキャッシュを無効化"""
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, update_fields=None, **kwargs):
+    """商品の保存時に検索索引を更新（検索対象の列を更新しない保存では何もしない）"""
+    if update_fields is not None and not {'name', 'description'} & set(update_fields):
+        return
+    get_search_backend().index_products([instance])
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_from_index(sender, instance, **kwargs):
+    """商品の削除時に検索索引から削除"""
+    get_search_backend().remove_products([instance.pk])
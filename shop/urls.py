@@ -11,6 +11,7 @@ urlpatterns = [
     
     # カート
     path('cart/', views.cart_view, name='cart'),
+    path('cart/add/', views.add_to_cart, name='add_to_cart'),
     path('cart/add/<int:product_id>/', views.add_to_cart, name='add_to_cart'),
     path('cart/update/<int:item_id>/', views.update_cart_item, name='update_cart_item'),
     path('cart/remove/<int:item_id>/', views.remove_from_cart, name='remove_from_cart'),
@@ -20,4 +21,12 @@ urlpatterns = [
     path('order/complete/<int:order_id>/', views.order_complete, name='order_complete'),
     path('orders/', views.order_history, name='order_history'),
     path('order/<int:order_id>/', views.order_detail, name='order_detail'),
+    
+    # スタッフ向けエクスポート
+    path('orders/export/', views.order_export, name='order_export'),
+    
+    # カートAPI（JSON）
+    path('api/cart/', views.cart_api, name='cart_api'),
+    path('api/cart/items/', views.cart_items_api, name='cart_items_api'),
+    path('api/cart/items/<int:item_id>/', views.cart_item_api, name='cart_item_api'),
 ]
@@ -2,7 +2,11 @@
 Utilities Package
 """
 from .context_processors import cart_context
+from .paginator import CachedCountPaginator, EstimatedCountPaginator, KeysetPaginator
 
 __all__ = [
     'cart_context',
+    'CachedCountPaginator',
+    'EstimatedCountPaginator',
+    'KeysetPaginator',
 ]
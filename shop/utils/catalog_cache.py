@@ -0,0 +1,32 @@
+"""
+Catalog Cache - 商品カタログのキャッシュ管理
+商品・カテゴリが更新されるたびにバージョンを進め、古いキャッシュを参照しないようにする
+"""
+import time
+from django.core.cache import cache
+
+CATALOG_VERSION_KEY = 'shop:catalog_version'
+
+
+def get_catalog_version():
+    """現在のカタログバージョンを取得"""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # キャッシュから消えていた場合も過去のバージョンと衝突しないよう時刻を使う
+        version = int(time.time() * 1000)
+        cache.add(CATALOG_VERSION_KEY, version, None)
+        version = cache.get(CATALOG_VERSION_KEY, version)
+    return version
+
+
+def bump_catalog_version():
+    """カタログバージョンを進め、カタログ関連のキャッシュをすべて無効化する"""
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        get_catalog_version()
+
+
+def catalog_cache_key(*parts):
+    """カタログバージョンを含んだキャッシュキーを生成"""
+    return ':'.join(['shop:catalog', str(get_catalog_version())] + [str(part) for part in parts])
@@ -1,27 +1,18 @@
 """
 Context Processors - コンテキストプロセッサ
 """
-from shop.models import Cart
+from django.utils.functional import SimpleLazyObject
+from shop.services.cart_service import CartService
 
 
 def cart_context(request):
     """
     カート情報をコンテキストに追加
     全てのテンプレートでカート情報を利用可能にする
+    カートはテンプレートで参照されたときに初めて取得し、ビューと同じものを共有する
+    ナビバーの商品数はキャッシュされたカウンタから取得する
     """
-    cart = None
-    if request.user.is_authenticated:
-        try:
-            cart = Cart.objects.get(user=request.user)
-        except Cart.DoesNotExist:
-            pass
-    elif request.session.session_key:
-        try:
-            cart = Cart.objects.get(session_key=request.session.session_key)
-        except Cart.DoesNotExist:
-            pass
-    
     return {
-        'cart': cart,
-        'cart_total_items': cart.total_items if cart else 0,
+        'cart': SimpleLazyObject(lambda: CartService.get_cart(request)),
+        'cart_total_items': lambda: CartService.get_item_count(request),
     }
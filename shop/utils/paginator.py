@@ -0,0 +1,183 @@
+"""
+Paginator - ページネーション
+"""
+import base64
+import json
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.core.paginator import InvalidPage, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class CachedCountPaginator(Paginator):
+    """
+    件数をキャッシュするページネーター
+    cache_key を指定した場合、COUNT(*) の結果をキャッシュして再利用する
+    """
+    
+    def __init__(self, *args, cache_key=None, cache_timeout=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_key = cache_key
+        self.cache_timeout = cache_timeout
+    
+    @cached_property
+    def count(self):
+        """総件数（キャッシュがあればそれを使う）"""
+        if self.cache_key is None:
+            return super().count
+        count = cache.get(self.cache_key)
+        if count is None:
+            count = super().count
+            cache.set(self.cache_key, count, self.cache_timeout)
+        return count
+
+
+class EstimatedCountPaginator(CachedCountPaginator):
+    """
+    件数が多い場合に推定値を使うページネーター
+    threshold 件以下なら LIMIT 付きの COUNT で正確な件数を数え、超える場合は
+    キャッシュ済みの件数またはデータベースの実行計画による推定件数を使う
+    推定できないデータベース（SQLite等）では正確な件数を数え、cache_key があればキャッシュする
+    cache_exact が False の場合、threshold 件以下の件数はキャッシュしない（常に最新の件数を返す）
+    """
+    
+    def __init__(self, *args, threshold=None, cache_exact=True, **kwargs):
+        super().__init__(*args, **kwargs)
+        if threshold is None:
+            threshold = settings.PAGINATOR_ESTIMATE_THRESHOLD
+        self.threshold = threshold
+        self.cache_exact = cache_exact
+        self.estimated = False
+    
+    @cached_property
+    def count(self):
+        """総件数（threshold 件を超える場合は推定値）"""
+        if self.cache_key is not None:
+            count = cache.get(self.cache_key)
+            if count is not None:
+                self.estimated = count > self.threshold
+                return count
+        
+        count = self.capped_count()
+        if count > self.threshold:
+            estimate = self.estimate_count()
+            if estimate is None:
+                count = super(CachedCountPaginator, self).count
+            else:
+                count = max(estimate, count)
+                self.estimated = True
+        if self.cache_key is not None and (self.cache_exact or count > self.threshold):
+            cache.set(self.cache_key, count, self.cache_timeout)
+        return count
+    
+    def capped_count(self):
+        """最大 threshold + 1 件まで数える（SELECT COUNT(*) FROM (... LIMIT n)）"""
+        if not hasattr(self.object_list, 'query'):
+            return len(self.object_list)
+        # 件数に関係しない集計用の列（相関サブクエリ等）を評価しないよう主キーだけを選択する
+        return self.object_list.order_by().values('pk')[:self.threshold + 1].count()
+    
+    def estimate_count(self):
+        """実行計画から推定件数を求める（対応していないデータベースでは None）"""
+        queryset = self.object_list
+        if not hasattr(queryset, 'query'):
+            return None
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        try:
+            sql, params = queryset.order_by().values('pk').query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+
+class InvalidCursor(InvalidPage):
+    """不正なカーソルが指定された場合の例外"""
+    pass
+
+
+class KeysetPage:
+    """キーセット方式の1ページ分の結果"""
+    
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+    
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+    
+    def __iter__(self):
+        return iter(self.object_list)
+    
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    キーセット（カーソル）方式のページネーター
+    keys に指定したフィールドの降順で並べ、前ページ最後の行より後ろを WHERE 句で取得する
+    OFFSET を使わないため深いページでも速度が落ちず、COUNT(*) も発行しない
+    """
+    
+    def __init__(self, queryset, per_page, keys=('created_at', 'id')):
+        self.keys = keys
+        self.queryset = queryset.order_by(*[f'-{key}' for key in keys])
+        self.per_page = int(per_page)
+    
+    def encode_cursor(self, obj):
+        """行のキー値からカーソル文字列を生成"""
+        raw = '|'.join(self._key_value(obj, key) for key in self.keys)
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+    
+    def decode_cursor(self, cursor):
+        """カーソル文字列をキー値のリストに戻す"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+            parts = raw.split('|')
+            if len(parts) != len(self.keys):
+                raise ValueError(cursor)
+            model = self.queryset.model
+            return [
+                model._meta.get_field(key).to_python(part)
+                for key, part in zip(self.keys, parts)
+            ]
+        except (ValueError, UnicodeDecodeError, ValidationError):
+            raise InvalidCursor('不正なカーソルです')
+    
+    def page(self, cursor=None):
+        """カーソル以降の1ページ分を取得（per_page + 1件取得して次ページの有無を判定）"""
+        queryset = self.queryset
+        if cursor:
+            queryset = queryset.filter(self._after(self.decode_cursor(cursor)))
+        rows = list(queryset[:self.per_page + 1])
+        object_list = rows[:self.per_page]
+        next_cursor = None
+        if len(rows) > self.per_page:
+            next_cursor = self.encode_cursor(object_list[-1])
+        return KeysetPage(object_list, next_cursor)
+    
+    def _after(self, values):
+        """(k1, k2, ...) < (v1, v2, ...) を表す条件"""
+        condition = Q()
+        for i, key in enumerate(self.keys):
+            step = Q(**{f'{key}__lt': values[i]})
+            for prev_key, prev_value in zip(self.keys[:i], values[:i]):
+                step &= Q(**{prev_key: prev_value})
+            condition |= step
+        return condition
+    
+    @staticmethod
+    def _key_value(obj, key):
+        value = getattr(obj, key)
+        return value.isoformat() if hasattr(value, 'isoformat') else str(value)
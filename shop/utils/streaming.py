@@ -0,0 +1,86 @@
+"""
+Streaming - CSV/JSONL の逐次読み書き
+大きなファイルをメモリに載せずに、1件ずつ読み込み・書き出すためのヘルパー
+"""
+import csv
+import json
+from itertools import islice
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+FORMATS = ('csv', 'jsonl')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+def detect_format(filename, default='csv'):
+    """ファイル名の拡張子から形式（csv / jsonl）を判定"""
+    lowered = filename.lower()
+    if lowered.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    if lowered.endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def iter_records(stream, fmt):
+    """テキストストリームから1件ずつ辞書を読み出す"""
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+    elif fmt == 'jsonl':
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    else:
+        raise ValueError(f'未対応の形式です: {fmt}')
+
+
+def chunked(iterable, size):
+    """イテラブルを size 件ずつのリストに分割する"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class _Echo:
+    """csv.writer の出力をそのまま返す擬似ファイル"""
+    
+    def write(self, value):
+        return value
+
+
+def iter_lines(records, fmt, fieldnames):
+    """辞書を1件ずつCSV/JSONLの行に変換する"""
+    if fmt == 'csv':
+        writer = csv.DictWriter(_Echo(), fieldnames=fieldnames)
+        yield writer.writeheader()
+        for record in records:
+            yield writer.writerow(record)
+    elif fmt == 'jsonl':
+        for record in records:
+            yield json.dumps(record, ensure_ascii=False, cls=DjangoJSONEncoder) + '\n'
+    else:
+        raise ValueError(f'未対応の形式です: {fmt}')
+
+
+def streaming_response(records, fmt, fieldnames, filename):
+    """辞書のイテラブルを逐次ダウンロードさせるレスポンス"""
+    lines = iter_lines(records, fmt, fieldnames)
+    if fmt == 'csv':
+        # Excelで文字化けしないようBOMを付ける
+        lines = _prepend('\ufeff', lines)
+    response = StreamingHttpResponse(lines, content_type=CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def _prepend(first, iterable):
+    yield first
+    yield from iterable
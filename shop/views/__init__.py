@@ -5,6 +5,8 @@ MVCアーキテクチャのView層（Controller）
 from .product_views import ProductListView, ProductDetailView
 from .cart_views import cart_view, add_to_cart, update_cart_item, remove_from_cart
 from .order_views import checkout, order_complete, order_history, order_detail
+from .export_views import order_export
+from .api_views import cart_api, cart_items_api, cart_item_api
 
 __all__ = [
     'ProductListView',
@@ -17,4 +19,8 @@ __all__ = [
     'order_complete',
     'order_history',
     'order_detail',
+    'order_export',
+    'cart_api',
+    'cart_items_api',
+    'cart_item_api',
 ]
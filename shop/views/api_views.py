@@ -0,0 +1,141 @@
+"""
+API Views - カートAPI（JSON）
+ページ遷移なしでカートを更新するクライアント向け。認証はセッション（POST等はCSRFトークンが必要）
+"""
+import json
+from decimal import Decimal
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
+from shop.forms import CartOperationForm
+from shop.services.cart_service import CartService, CartOperationError
+
+# 1回のリクエストで受け付ける操作の上限
+MAX_OPERATIONS = 100
+
+
+def _error_response(status, error, message, details=None):
+    """エラーレスポンス（API仕様書のエラー形式）"""
+    payload = {'error': error, 'message': message}
+    if details:
+        payload['details'] = details
+    return JsonResponse(payload, status=status)
+
+
+def _cart_payload(cart):
+    """カートのJSON表現（商品と合計は1回のプリフェッチから計算する）"""
+    if cart is None:
+        return {'id': None, 'items': [], 'total_price': Decimal('0'), 'total_items': 0, 'updated_at': None}
+    cart.prefetch_items()
+    return {
+        'id': cart.id,
+        'items': [
+            {
+                'id': item.id,
+                'product': {
+                    'id': item.product.id,
+                    'name': item.product.name,
+                    'slug': item.product.slug,
+                    'price': item.product.price,
+                    'stock': item.product.stock,
+                    'image': item.product.image.url if item.product.image else None,
+                },
+                'quantity': item.quantity,
+                'subtotal': item.subtotal,
+            }
+            for item in cart.items.all()
+        ],
+        'total_price': cart.total_price,
+        'total_items': cart.total_items,
+        'updated_at': cart.updated_at,
+    }
+
+
+def _parse_operations(raw_operations):
+    """
+    操作のリストを検証する
+    (検証済みの操作のリスト, エラーの辞書) を返す
+    """
+    if not isinstance(raw_operations, list) or not raw_operations:
+        return None, {'operations': ['操作のリストを指定してください。']}
+    if len(raw_operations) > MAX_OPERATIONS:
+        return None, {'operations': [f'一度に指定できる操作は{MAX_OPERATIONS}件までです。']}
+    
+    operations = []
+    details = {}
+    for index, raw in enumerate(raw_operations):
+        form = CartOperationForm(raw if isinstance(raw, dict) else {})
+        if form.is_valid():
+            operations.append(form.cleaned_data)
+        else:
+            for field, errors in form.errors.items():
+                details[f'operations.{index}.{field}'] = errors
+    return operations, details
+
+
+def _apply(request, raw_operations):
+    """操作を検証・適用し、更新後のカートを返す"""
+    operations, details = _parse_operations(raw_operations)
+    if details:
+        return _error_response(400, 'validation_error', '入力内容に誤りがあります', details)
+    
+    cart = CartService.get_or_create_cart(request)
+    try:
+        CartService.apply_operations(cart, operations)
+    except CartOperationError as e:
+        status = 404 if e.code == 'not_found' else 400
+        return _error_response(status, e.code, str(e), {'operation': e.index})
+    
+    payload = _cart_payload(cart)
+    CartService.set_item_count(cart, payload['total_items'])
+    return JsonResponse(payload)
+
+
+def _load_json(request):
+    """リクエストボディのJSONを読み込む（不正な場合はNone）"""
+    try:
+        data = json.loads(request.body or b'{}')
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+@require_http_methods(['GET', 'POST'])
+def cart_api(request):
+    """
+    GET: カートを取得（カートがなければ作成せず空のカートを返す）
+    POST: 複数の操作をまとめて適用する
+          {"operations": [{"op": "add", "product_id": 1, "quantity": 2},
+                          {"op": "update", "item_id": 3, "quantity": 5},
+                          {"op": "remove", "item_id": 4}]}
+    """
+    if request.method == 'GET':
+        return JsonResponse(_cart_payload(CartService.get_cart(request)))
+    
+    data = _load_json(request)
+    if data is None:
+        return _error_response(400, 'validation_error', 'JSONの形式が正しくありません')
+    return _apply(request, data.get('operations'))
+
+
+@require_http_methods(['POST'])
+def cart_items_api(request):
+    """カートに商品を追加 {"product_id": 1, "quantity": 1}"""
+    data = _load_json(request)
+    if data is None:
+        return _error_response(400, 'validation_error', 'JSONの形式が正しくありません')
+    return _apply(request, [dict(data, op='add')])
+
+
+@require_http_methods(['PATCH', 'DELETE'])
+def cart_item_api(request, item_id):
+    """
+    PATCH: カート商品の数量を変更 {"quantity": 3}
+    DELETE: カート商品を削除
+    """
+    if request.method == 'DELETE':
+        return _apply(request, [{'op': 'remove', 'item_id': item_id}])
+    
+    data = _load_json(request)
+    if data is None:
+        return _error_response(400, 'validation_error', 'JSONの形式が正しくありません')
+    return _apply(request, [dict(data, op='update', item_id=item_id)])
@@ -1,48 +1,93 @@
 """
 Cart Views - カート関連
 """
+from django.http import Http404
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from shop.models import Product, CartItem
-from shop.services.cart_service import CartService
+from shop.services.cart_service import CartService, CartOperationError
+from shop.services.session_cart import SessionCart
+from shop.services.stock_service import InsufficientStockError
 
 
 def cart_view(request):
     """カート表示ビュー"""
-    cart = CartService.get_or_create_cart(request)
+    cart = CartService.get_or_create_cart(request).prefetch_items()
+    if isinstance(cart, SessionCart):
+        # 削除された商品をセッションのカートから取り除く
+        cart.prune()
+    # 表示のついでにナビバーの商品数カウンタを同期する
+    CartService.set_item_count(cart, cart.total_items)
     return render(request, 'shop/cart.html', {'cart': cart})
 
 
-def add_to_cart(request, product_id):
-    """カートに商品を追加"""
-    product = get_object_or_404(Product, id=product_id)
-    cart = CartService.get_or_create_cart(request)
+def add_to_cart(request, product_id=None):
+    """
+    カートに商品を追加
+    商品IDはURLまたはPOSTの product_id、数量は quantity（省略時は1）で指定する
+    """
+    params = request.POST if request.method == 'POST' else request.GET
+    if product_id is None:
+        try:
+            product_id = int(params.get('product_id', ''))
+        except ValueError:
+            raise Http404('商品が見つかりません')
+    product = get_object_or_404(Product.objects.only('id', 'name', 'stock'), id=product_id)
     
-    cart_item, created = CartItem.objects.get_or_create(
-        cart=cart,
-        product=product,
-        defaults={'quantity': 1}
-    )
+    try:
+        quantity = int(params.get('quantity', 1))
+    except ValueError:
+        quantity = 0
+    if quantity < 1:
+        messages.error(request, '数量は1以上を指定してください。')
+        return redirect('shop:cart')
     
-    if not created:
-        cart_item.quantity += 1
-        cart_item.save()
+    cart = CartService.get_or_create_cart(request)
+    try:
+        CartService.add_item(cart, product, quantity)
+    except InsufficientStockError:
+        messages.error(request, f'{product.name}は在庫が不足しているため、カートに追加できませんでした。')
+        return redirect('shop:cart')
     
     messages.success(request, f'{product.name}をカートに追加しました。')
     return redirect('shop:cart')
 
 
+def _apply_session_cart_operation(request, operation, success_message):
+    """セッションに保存したゲストカートへの数量変更・削除（item_id は商品ID）"""
+    try:
+        CartService.apply_operations(CartService.get_or_create_cart(request), [operation])
+    except CartOperationError as e:
+        if e.code == 'not_found':
+            raise Http404(str(e))
+        messages.error(request, f'{e}。')
+        return redirect('shop:cart')
+    messages.success(request, success_message)
+    return redirect('shop:cart')
+
+
 def update_cart_item(request, item_id):
     """カート商品の数量を更新"""
-    cart_item = get_object_or_404(CartItem, id=item_id)
+    if CartService.uses_session_storage(request):
+        quantity = int(request.POST.get('quantity', 1))
+        return _apply_session_cart_operation(
+            request,
+            {'op': 'update', 'item_id': item_id, 'quantity': max(quantity, 0)},
+            '数量を更新しました。' if quantity > 0 else '商品をカートから削除しました。',
+        )
+    
+    cart_item = get_object_or_404(CartItem.objects.select_related('cart'), id=item_id)
     quantity = int(request.POST.get('quantity', 1))
+    previous_quantity = cart_item.quantity
     
     if quantity > 0:
         cart_item.quantity = quantity
         cart_item.save()
+        CartService.adjust_item_count(cart_item.cart, quantity - previous_quantity)
         messages.success(request, '数量を更新しました。')
     else:
         cart_item.delete()
+        CartService.adjust_item_count(cart_item.cart, -previous_quantity)
         messages.success(request, '商品をカートから削除しました。')
     
     return redirect('shop:cart')
@@ -50,7 +95,13 @@ def update_cart_item(request, item_id):
 
 def remove_from_cart(request, item_id):
     """カートから商品を削除"""
-    cart_item = get_object_or_404(CartItem, id=item_id)
+    if CartService.uses_session_storage(request):
+        return _apply_session_cart_operation(
+            request, {'op': 'remove', 'item_id': item_id}, '商品をカートから削除しました。'
+        )
+    
+    cart_item = get_object_or_404(CartItem.objects.select_related('cart'), id=item_id)
     cart_item.delete()
+    CartService.adjust_item_count(cart_item.cart, -cart_item.quantity)
     messages.success(request, '商品をカートから削除しました。')
     return redirect('shop:cart')
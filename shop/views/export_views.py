@@ -0,0 +1,31 @@
+"""
+Export Views - スタッフ向けのエクスポート
+"""
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponseBadRequest
+from shop.forms import OrderExportForm
+from shop.services.order_service import OrderService
+from shop.utils.streaming import streaming_response
+
+
+@staff_member_required
+def order_export(request):
+    """
+    注文エクスポート（期間・ステータスで絞り込み、CSV/JSONLを逐次出力）
+    例: /orders/export/?date_from=2025-10-01&date_to=2025-10-31&status=delivered&lines=1
+    """
+    form = OrderExportForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    
+    data = form.cleaned_data
+    orders = OrderService.filter_orders_for_export(
+        date_from=data['date_from'],
+        date_to=data['date_to'],
+        statuses=data['status'],
+    )
+    records, fieldnames = OrderService.export_records(orders, lines=data['lines'])
+    
+    period = '-'.join(d.strftime('%Y%m%d') for d in (data['date_from'], data['date_to']) if d)
+    filename = '_'.join(part for part in ['order_lines' if data['lines'] else 'orders', period] if part)
+    return streaming_response(records, data['format'], fieldnames, f"{filename}.{data['format']}")
@@ -1,21 +1,23 @@
 """
 Order Views - 注文関連
 """
+from django.conf import settings
+from django.core.paginator import Paginator
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from shop.models import Order, OrderItem
 from shop.forms import OrderForm
 from shop.services.cart_service import CartService
 from shop.services.order_service import OrderService
+from shop.services.stock_service import InsufficientStockError
 
 
 @login_required
 def checkout(request):
     """チェックアウトビュー"""
-    cart = CartService.get_or_create_cart(request)
+    cart = CartService.get_or_create_cart(request).prefetch_items()
     
-    if not cart.items.exists():
+    if not cart.items.all():
         messages.warning(request, 'カートが空です。')
         return redirect('shop:cart')
     
@@ -23,11 +25,19 @@ def checkout(request):
         form = OrderForm(request.POST)
         if form.is_valid():
             # 注文を作成
-            order = OrderService.create_order_from_cart(
-                user=request.user,
-                cart=cart,
-                shipping_data=form.cleaned_data
-            )
+            try:
+                order = OrderService.create_order_from_cart(
+                    user=request.user,
+                    cart=cart,
+                    shipping_data=form.cleaned_data
+                )
+            except InsufficientStockError as e:
+                for shortage in e.shortages:
+                    messages.error(
+                        request,
+                        f'{shortage.product_name}の在庫が不足しています（残り{shortage.available}個）。'
+                    )
+                return redirect('shop:cart')
             
             messages.success(request, '注文が完了しました。')
             return redirect('shop:order_complete', order_id=order.id)
@@ -40,19 +50,24 @@ def checkout(request):
 @login_required
 def order_complete(request, order_id):
     """注文完了ビュー"""
-    order = get_object_or_404(Order, id=order_id, user=request.user)
+    order = get_object_or_404(OrderService.get_orders_with_items(request.user), id=order_id)
     return render(request, 'shop/order_complete.html', {'order': order})
 
 
 @login_required
 def order_history(request):
     """注文履歴ビュー"""
-    orders = Order.objects.filter(user=request.user)
-    return render(request, 'shop/order_history.html', {'orders': orders})
+    paginator = Paginator(OrderService.get_order_history(request.user), settings.ORDER_HISTORY_PAGE_SIZE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    return render(request, 'shop/order_history.html', {
+        'orders': page_obj,
+        'page_obj': page_obj,
+        'is_paginated': page_obj.has_other_pages(),
+    })
 
 
 @login_required
 def order_detail(request, order_id):
     """注文詳細ビュー"""
-    order = get_object_or_404(Order, id=order_id, user=request.user)
+    order = get_object_or_404(OrderService.get_orders_with_items(request.user), id=order_id)
     return render(request, 'shop/order_detail.html', {'order': order})
@@ -1,33 +1,106 @@
 """
 Product Views - 商品表示関連
 """
-from django.shortcuts import get_object_or_404
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import InvalidPage
+from django.http import Http404
 from django.views.generic import ListView, DetailView
 from shop.models import Product, Category
+from shop.search import get_search_backend
+from shop.utils.catalog_cache import catalog_cache_key, get_catalog_version
+from shop.utils.paginator import EstimatedCountPaginator, KeysetPaginator
 
 
 class ProductListView(ListView):
-    """商品一覧ビュー"""
+    """
+    商品一覧ビュー
+    通常はページ番号（?page=）で、?cursor= を指定するとキーセット方式でページングする
+    ?q= を指定すると商品を検索し、関連度順に表示する
+    """
     model = Product
     template_name = 'shop/product_list.html'
     context_object_name = 'products'
     paginate_by = 12
+    paginator_class = EstimatedCountPaginator
+    cursor_kwarg = 'cursor'
+    search_kwarg = 'q'
+    search_max_length = 100
+
+    def get_current_category(self):
+        """URLのスラッグに対応するカテゴリを取得（キャッシュ付き、存在しなければ404）"""
+        if not hasattr(self, '_current_category'):
+            category = None
+            category_slug = self.kwargs.get('category_slug')
+            if category_slug:
+                key = catalog_cache_key('category', category_slug)
+                category = cache.get(key)
+                if category is None:
+                    category = Category.objects.filter(slug=category_slug).first()
+                    if category is None:
+                        raise Http404('カテゴリが見つかりません')
+                    cache.set(key, category, settings.PRODUCT_LIST_CACHE_TIMEOUT)
+            self._current_category = category
+        return self._current_category
+
+    def get_search_query(self):
+        """検索語（前後の空白を除き、最大 search_max_length 文字）"""
+        return self.request.GET.get(self.search_kwarg, '').strip()[:self.search_max_length]
 
     def get_queryset(self):
-        """販売中の商品を取得、カテゴリでフィルター"""
-        queryset = Product.objects.filter(is_active=True)
-        category_slug = self.kwargs.get('category_slug')
-        if category_slug:
-            queryset = queryset.filter(category__slug=category_slug)
-        return queryset
+        """販売中の商品を取得、カテゴリでフィルター、検索語があれば検索"""
+        queryset = Product.objects.filter(is_active=True).select_related('category')
+        category = self.get_current_category()
+        if category:
+            queryset = queryset.filter(category=category)
+        query = self.get_search_query()
+        if query:
+            return get_search_backend().search(queryset, query)
+        return queryset.order_by('-created_at', '-id')
+
+    @property
+    def cursor_mode(self):
+        """キーセット方式でページングするかどうか（検索結果は関連度順のため対象外）"""
+        return self.cursor_kwarg in self.request.GET and not self.get_search_query()
+
+    def paginate_queryset(self, queryset, page_size):
+        """キーセット方式の場合は件数を数えずにカーソル以降を取得する"""
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, page_size)
+        try:
+            page = KeysetPaginator(queryset, page_size).page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidPage as e:
+            raise Http404(str(e))
+        self.next_cursor = page.next_cursor
+        return (None, None, page.object_list, False)
+
+    def get_paginator(self, queryset, per_page, orphans=0, allow_empty_first_page=True, **kwargs):
+        """件数をカテゴリ・検索語単位でキャッシュし、件数が多い場合は推定するページネーターを返す"""
+        key_parts = ['count', self.kwargs.get('category_slug') or '']
+        query = self.get_search_query()
+        if query:
+            key_parts.append(hashlib.md5(query.encode()).hexdigest())
+        return super().get_paginator(
+            queryset, per_page, orphans=orphans, allow_empty_first_page=allow_empty_first_page,
+            cache_key=catalog_cache_key(*key_parts),
+            cache_timeout=settings.PRODUCT_LIST_CACHE_TIMEOUT,
+            **kwargs
+        )
 
     def get_context_data(self, **kwargs):
         """コンテキストにカテゴリ情報を追加"""
         context = super().get_context_data(**kwargs)
         context['categories'] = Category.objects.all()
-        category_slug = self.kwargs.get('category_slug')
-        if category_slug:
-            context['current_category'] = get_object_or_404(Category, slug=category_slug)
+        context['current_category'] = self.get_current_category()
+        context['cursor_mode'] = self.cursor_mode
+        context['current_cursor'] = self.request.GET.get(self.cursor_kwarg, '')
+        context['next_cursor'] = getattr(self, 'next_cursor', None)
+        context['search_query'] = self.get_search_query()
+        # テンプレートのフラグメントキャッシュ用
+        context['catalog_version'] = get_catalog_version()
+        context['category_slug'] = self.kwargs.get('category_slug') or ''
+        context['product_list_cache_timeout'] = settings.PRODUCT_LIST_CACHE_TIMEOUT
         return context
 
 
@@ -2,9 +2,13 @@
 Test Auth Views
 認証ビューのテスト
 """
-from django.test import TestCase, Client
+from decimal import Decimal
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth.models import User
+from shop.models import Category, Product, Cart, CartItem, Order
 
 
 class LoginViewTest(TestCase):
@@ -53,6 +57,55 @@ class LoginViewTest(TestCase):
         # ログイン失敗時はログインページを再表示
         self.assertEqual(response.status_code, 200)
         self.assertFalse(response.wsgi_request.user.is_authenticated)
+    
+    def test_login_merges_guest_cart(self):
+        """ログインするとゲストカートがユーザーカートにマージされることを確認"""
+        category = Category.objects.create(name='電子機器', slug='electronics')
+        product = Product.objects.create(
+            name='ノートPC',
+            slug='notebook-pc',
+            category=category,
+            description='高性能ノートパソコン',
+            price=Decimal('89800'),
+            stock=10
+        )
+        session = self.client.session
+        session.save()
+        guest_cart = Cart.objects.create(session_key=session.session_key)
+        CartItem.objects.create(cart=guest_cart, product=product, quantity=2)
+        
+        self.client.post(reverse('accounts:login'), {
+            'username': 'testuser',
+            'password': 'testpass123'
+        })
+        
+        user_cart = Cart.objects.get(user=self.user)
+        self.assertEqual(user_cart.items.get().quantity, 2)
+        self.assertFalse(Cart.objects.filter(pk=guest_cart.pk).exists())
+    
+    @override_settings(CART_GUEST_STORAGE='session', SESSION_ENGINE='django.contrib.sessions.backends.cache')
+    def test_login_saves_session_guest_cart(self):
+        """セッションに保存したゲストカートがログイン時にユーザーカートとして保存されることを確認"""
+        category = Category.objects.create(name='電子機器', slug='electronics')
+        product = Product.objects.create(
+            name='ノートPC',
+            slug='notebook-pc',
+            category=category,
+            description='高性能ノートパソコン',
+            price=Decimal('89800'),
+            stock=10
+        )
+        self.client.post(reverse('shop:add_to_cart', kwargs={'product_id': product.id}), {'quantity': 2})
+        self.assertFalse(Cart.objects.exists())
+        
+        self.client.post(reverse('accounts:login'), {
+            'username': 'testuser',
+            'password': 'testpass123'
+        })
+        
+        user_cart = Cart.objects.get(user=self.user)
+        self.assertEqual(user_cart.items.get().quantity, 2)
+        self.assertNotIn('shop_cart', self.client.session)
 
 
 class LogoutViewTest(TestCase):
@@ -175,3 +228,26 @@ class ProfileViewTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'accounts/profile.html')
         self.assertEqual(response.context['user'], self.user)
+    
+    def test_profile_loads_only_recent_orders(self):
+        """注文の数によらず、最近の注文5件だけを1回のクエリで取得することを確認"""
+        Order.objects.bulk_create([
+            Order(
+                user=self.user,
+                status='pending',
+                total_amount=Decimal('1000'),
+                shipping_name='テスト',
+                shipping_postal_code='111-1111',
+                shipping_address='テスト住所',
+                shipping_phone='090-0000-0000'
+            )
+            for _ in range(8)
+        ])
+        self.client.force_login(self.user)
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('accounts:profile'))
+        
+        self.assertEqual(len(response.context['recent_orders']), 5)
+        order_queries = [query for query in queries if 'shop_order' in query['sql']]
+        self.assertEqual(len(order_queries), 1)
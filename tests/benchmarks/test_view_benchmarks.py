@@ -0,0 +1,439 @@
+"""
+Test View Benchmarks
+全ルートのクエリ数・レイテンシのベンチマーク
+
+実運用に近いデータ量（商品数千件・50行のカート・数百件の注文履歴）を投入し、
+shop / accounts の全ルートについてクエリ数とレイテンシ（中央値）を計測する。
+計測値は baselines.json と比較し、クエリ数がベースラインを超えた場合はテストを失敗させる。
+レイテンシは環境差が大きいため、許容倍率を超えた場合もレポートで警告するのみとする。
+
+ベースラインの更新:
+    BENCHMARK_UPDATE_BASELINES=1 python manage.py test tests.benchmarks
+"""
+import json
+import os
+import statistics
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from shop.models import Category, Product, Cart, CartItem, Order, OrderItem
+from shop.search import get_search_backend
+
+
+BASELINE_PATH = Path(__file__).with_name('baselines.json')
+UPDATE_BASELINES = os.environ.get('BENCHMARK_UPDATE_BASELINES') == '1'
+RUNS = int(os.environ.get('BENCHMARK_RUNS', '3'))
+LATENCY_TOLERANCE = float(os.environ.get('BENCHMARK_LATENCY_TOLERANCE', '1.5'))
+# 数ミリ秒の揺らぎを回帰として扱わないための許容幅
+LATENCY_SLACK_MS = 5.0
+
+# 投入するデータ量
+CATEGORY_COUNT = 20
+PRODUCT_COUNT = 2000
+CART_LINES = 50
+ORDER_COUNT = 300
+ITEMS_PER_ORDER = 5
+GUEST_CART_COUNT = 200
+
+SHIPPING_DATA = {
+    'shipping_name': '山田太郎',
+    'shipping_postal_code': '123-4567',
+    'shipping_address': '東京都渋谷区テスト1-2-3',
+    'shipping_phone': '090-1234-5678'
+}
+
+
+def load_baselines():
+    """ベースラインを読み込む"""
+    if not BASELINE_PATH.exists():
+        return {}
+    return json.loads(BASELINE_PATH.read_text(encoding='utf-8'))
+
+
+# パスワードハッシュの計算時間がログイン系のレイテンシを支配しないよう軽量なハッシャーを使う
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ViewBenchmarkTest(TestCase):
+    """全ルートのベンチマーク"""
+    
+    baselines = load_baselines()
+    results = {}
+    
+    @classmethod
+    def setUpTestData(cls):
+        """ベンチマーク用のデータを一括投入"""
+        categories = Category.objects.bulk_create([
+            Category(name=f'カテゴリ{i}', slug=f'category-{i}')
+            for i in range(CATEGORY_COUNT)
+        ])
+        cls.products = Product.objects.bulk_create([
+            Product(
+                name=f'商品{i}',
+                slug=f'product-{i}',
+                category=categories[i % CATEGORY_COUNT],
+                description='ベンチマーク用の商品です。',
+                price=Decimal(1000 + i),
+                stock=100000,
+            )
+            for i in range(PRODUCT_COUNT)
+        ])
+        # bulk_create はシグナルを経由しないため検索索引を作り直す
+        get_search_backend().rebuild()
+        cls.category = categories[0]
+        cls.product = cls.products[0]
+        
+        cls.user = User.objects.create_user(username='shopper', password='testpass123')
+        cls.cart = Cart.objects.create(user=cls.user)
+        cls.cart_items = CartItem.objects.bulk_create([
+            CartItem(cart=cls.cart, product=product, quantity=1)
+            for product in cls.products[:CART_LINES]
+        ])
+        
+        orders = Order.objects.bulk_create([
+            Order(
+                user=cls.user,
+                status='delivered',
+                total_amount=Decimal(10000),
+                **SHIPPING_DATA
+            )
+            for _ in range(ORDER_COUNT)
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order, product=product, quantity=1, price=product.price,
+                product_name=product.name, product_slug=product.slug
+            )
+            for i, order in enumerate(orders)
+            for product in cls.products[i:i + ITEMS_PER_ORDER]
+        ])
+        cls.order = orders[0]
+        
+        # 管理画面の一覧用（放置されたゲストカート）
+        guest_carts = Cart.objects.bulk_create([
+            Cart(session_key=f'guest-{i}') for i in range(GUEST_CART_COUNT)
+        ])
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, product=product, quantity=1)
+            for i, cart in enumerate(guest_carts)
+            for product in cls.products[i:i + 3]
+        ])
+        cls.staff = User.objects.create_superuser(username='staff', password='testpass123')
+    
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.print_report()
+        if UPDATE_BASELINES and cls.results:
+            baselines = dict(cls.baselines)
+            baselines.update(cls.results)
+            BASELINE_PATH.write_text(
+                json.dumps(baselines, ensure_ascii=False, indent=2, sort_keys=True) + '\n',
+                encoding='utf-8'
+            )
+    
+    @classmethod
+    def print_report(cls):
+        """計測結果とベースラインの比較を出力"""
+        lines = ['', 'ベンチマーク結果（クエリ数 / レイテンシ中央値）']
+        for name in sorted(cls.results):
+            result = cls.results[name]
+            baseline = cls.baselines.get(name)
+            if baseline is None:
+                status = 'NEW'
+                compared = '-'
+            else:
+                compared = f"{baseline['queries']} / {baseline['median_ms']:.1f}ms"
+                if result['queries'] > baseline['queries']:
+                    status = 'REGRESSION'
+                elif cls.is_slow(result, baseline):
+                    status = 'SLOW'
+                elif result['queries'] < baseline['queries']:
+                    status = 'IMPROVED'
+                else:
+                    status = 'OK'
+            lines.append(
+                f"  {name:<40} {result['queries']:>4} / {result['median_ms']:>8.1f}ms"
+                f"  (baseline {compared})  {status}"
+            )
+        print('\n'.join(lines), file=sys.stderr)
+    
+    @staticmethod
+    def is_slow(result, baseline):
+        """レイテンシが許容範囲を超えているか"""
+        limit = baseline['median_ms'] * LATENCY_TOLERANCE + LATENCY_SLACK_MS
+        return result['median_ms'] > limit
+    
+    def measure(self, name, method, url, data=None, setup=None, content_type=None):
+        """
+        リクエストを RUNS 回実行し、最大クエリ数とレイテンシの中央値を記録する
+        キャッシュは毎回クリアし、キャッシュミス時の経路を計測する
+        setup(run) は計測の対象外で、各実行の前に呼び出される
+        クエリ数はベースラインと QUERY_BUDGETS（上限を強制している場合）の両方を超えてはならない
+        content_type を指定した場合、data はそのままリクエストボディとして送信する
+        逐次出力のレスポンスは本文を読み切るまでを計測する
+        """
+        extra = {'content_type': content_type} if content_type else {}
+        query_counts = []
+        timings = []
+        for run in range(RUNS):
+            cache.clear()
+            if setup is not None:
+                setup(run)
+            payload = data(run) if callable(data) else data
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = getattr(self.client, method)(url, payload, **extra)
+                if response.streaming:
+                    # 逐次出力のレスポンスは本文を読み切るまでクエリが発行される
+                    b''.join(response.streaming_content)
+                timings.append((time.perf_counter() - started) * 1000)
+            self.assertLess(response.status_code, 400, f'{name}: status {response.status_code}')
+            query_counts.append(len(queries))
+        
+        result = {
+            'queries': max(query_counts),
+            'median_ms': round(statistics.median(timings), 1),
+        }
+        self.results[name] = result
+        
+        baseline = self.baselines.get(name)
+        if baseline is not None and not UPDATE_BASELINES:
+            self.assertLessEqual(
+                result['queries'], baseline['queries'],
+                f"{name} のクエリ数がベースラインを超えました: {result['queries']} > {baseline['queries']}"
+            )
+        
+        # ベースラインの更新時も、QUERY_BUDGETS を超える値は記録しない
+        view_name = response.resolver_match.view_name if response.resolver_match else None
+        budget = settings.QUERY_BUDGETS.get(view_name)
+        if budget is not None and settings.QUERY_BUDGET_ENFORCE:
+            self.assertLessEqual(
+                result['queries'], budget,
+                f"{name} のクエリ数が QUERY_BUDGETS['{view_name}'] を超えました: {result['queries']} > {budget}"
+            )
+        return result
+    
+    def login(self, run=None):
+        self.client.force_login(self.user)
+    
+    def guest_cart(self):
+        """50行のゲストカートを作成"""
+        session = self.client.session
+        session.save()
+        cart = Cart.objects.create(session_key=session.session_key)
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, product=product, quantity=1)
+            for product in self.products[:CART_LINES]
+        ])
+        return cart
+    
+    def test_product_list(self):
+        self.measure('shop:product_list', 'get', reverse('shop:product_list'))
+    
+    def test_product_list_deep_page(self):
+        self.measure('shop:product_list?page=50', 'get', reverse('shop:product_list'), {'page': 50})
+    
+    def test_product_search(self):
+        self.measure('shop:product_list?q=', 'get', reverse('shop:product_list'), {'q': '商品19'})
+    
+    def test_product_search_in_description(self):
+        self.measure('shop:product_list?q=[description]', 'get', reverse('shop:product_list'), {'q': 'ベンチマーク用'})
+    
+    def test_product_list_by_category(self):
+        url = reverse('shop:product_list_by_category', kwargs={'category_slug': self.category.slug})
+        self.measure('shop:product_list_by_category', 'get', url)
+    
+    def test_product_detail(self):
+        url = reverse('shop:product_detail', kwargs={'slug': self.product.slug})
+        self.measure('shop:product_detail', 'get', url)
+    
+    def test_cart_guest(self):
+        self.guest_cart()
+        self.measure('shop:cart[guest]', 'get', reverse('shop:cart'))
+    
+    def test_cart_user(self):
+        self.login()
+        self.measure('shop:cart[user]', 'get', reverse('shop:cart'))
+    
+    def test_add_to_cart(self):
+        self.login()
+        url = reverse('shop:add_to_cart', kwargs={'product_id': self.product.id})
+        self.measure('shop:add_to_cart', 'post', url)
+    
+    @override_settings(CART_GUEST_STORAGE='session', SESSION_ENGINE='django.contrib.sessions.backends.cache')
+    def test_add_to_cart_session_guest(self):
+        """本番で組み合わせるデータベースに保存しないセッションで計測する（shop.E001）"""
+        url = reverse('shop:add_to_cart', kwargs={'product_id': self.product.id})
+        self.measure('shop:add_to_cart[session guest]', 'post', url)
+    
+    def test_update_cart_item(self):
+        self.login()
+        url = reverse('shop:update_cart_item', kwargs={'item_id': self.cart_items[0].id})
+        self.measure('shop:update_cart_item', 'post', url, {'quantity': 3})
+    
+    def test_remove_from_cart(self):
+        self.login()
+        items = self.cart_items
+        self.measure(
+            'shop:remove_from_cart', 'post',
+            reverse('shop:remove_from_cart', kwargs={'item_id': items[0].id}),
+            setup=lambda run: CartItem.objects.get_or_create(
+                id=items[0].id, defaults={'cart': self.cart, 'product': items[0].product, 'quantity': 1}
+            ),
+        )
+    
+    def test_cart_api_get(self):
+        self.login()
+        self.measure('shop:cart_api[get]', 'get', reverse('shop:cart_api'))
+    
+    def test_cart_api_batch(self):
+        self.login()
+        items = self.cart_items
+        payload = json.dumps({'operations': [
+            {'op': 'update', 'item_id': item.id, 'quantity': 2} for item in items[:5]
+        ] + [
+            {'op': 'add', 'product_id': self.products[-1].id, 'quantity': 1},
+        ]})
+        self.measure(
+            'shop:cart_api[batch]', 'post', reverse('shop:cart_api'), payload,
+            setup=lambda run: CartItem.objects.filter(cart=self.cart, product=self.products[-1]).delete(),
+            content_type='application/json',
+        )
+    
+    def test_cart_items_api_post(self):
+        self.login()
+        product = self.products[-2]
+        self.measure(
+            'shop:cart_items_api[post]', 'post', reverse('shop:cart_items_api'),
+            json.dumps({'product_id': product.id, 'quantity': 1}),
+            setup=lambda run: CartItem.objects.filter(cart=self.cart, product=product).delete(),
+            content_type='application/json',
+        )
+    
+    def test_cart_item_api_patch(self):
+        self.login()
+        url = reverse('shop:cart_item_api', kwargs={'item_id': self.cart_items[1].id})
+        self.measure(
+            'shop:cart_item_api[patch]', 'patch', url, json.dumps({'quantity': 2}),
+            content_type='application/json',
+        )
+    
+    def test_cart_item_api_delete(self):
+        self.login()
+        item = self.cart_items[2]
+        self.measure(
+            'shop:cart_item_api[delete]', 'delete', reverse('shop:cart_item_api', kwargs={'item_id': item.id}),
+            setup=lambda run: CartItem.objects.get_or_create(
+                id=item.id, defaults={'cart': self.cart, 'product': item.product, 'quantity': 1}
+            ),
+        )
+    
+    def test_checkout_get(self):
+        self.login()
+        self.measure('shop:checkout[get]', 'get', reverse('shop:checkout'))
+    
+    def test_checkout_post(self):
+        self.login()
+        
+        def refill_cart(run):
+            CartItem.objects.filter(cart=self.cart).delete()
+            CartItem.objects.bulk_create([
+                CartItem(cart=self.cart, product=product, quantity=1)
+                for product in self.products[:CART_LINES]
+            ])
+        
+        self.measure('shop:checkout[post]', 'post', reverse('shop:checkout'), SHIPPING_DATA, setup=refill_cart)
+    
+    def test_order_complete(self):
+        self.login()
+        url = reverse('shop:order_complete', kwargs={'order_id': self.order.id})
+        self.measure('shop:order_complete', 'get', url)
+    
+    def test_order_history(self):
+        self.login()
+        self.measure('shop:order_history', 'get', reverse('shop:order_history'))
+    
+    def test_order_detail(self):
+        self.login()
+        url = reverse('shop:order_detail', kwargs={'order_id': self.order.id})
+        self.measure('shop:order_detail', 'get', url)
+    
+    def test_login_get(self):
+        self.measure('accounts:login[get]', 'get', reverse('accounts:login'))
+    
+    def test_login_post(self):
+        def guest_with_cart(run):
+            # 50行のゲストカートを持った状態でログインし、ユーザーカートへのマージを含めて計測する
+            self.client.logout()
+            self.guest_cart()
+        
+        self.measure(
+            'accounts:login[post]', 'post', reverse('accounts:login'),
+            {'username': 'shopper', 'password': 'testpass123'},
+            setup=guest_with_cart,
+        )
+    
+    def test_logout(self):
+        self.measure('accounts:logout', 'post', reverse('accounts:logout'), setup=self.login)
+    
+    def test_signup_get(self):
+        self.measure('accounts:signup[get]', 'get', reverse('accounts:signup'))
+    
+    def test_signup_post(self):
+        def signup_data(run):
+            return {
+                'username': f'newuser{run}',
+                'email': f'newuser{run}@example.com',
+                'password1': 'complexpass123!',
+                'password2': 'complexpass123!'
+            }
+        
+        self.measure(
+            'accounts:signup[post]', 'post', reverse('accounts:signup'), signup_data,
+            setup=lambda run: self.client.logout(),
+        )
+    
+    def test_profile(self):
+        self.login()
+        self.measure('accounts:profile', 'get', reverse('accounts:profile'))
+    
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db', QUERY_BUDGET_ENFORCE=False)
+    def test_session_db(self):
+        """
+        セッションの読み込みにかかるコスト（比較用: データベースのセッション）
+        QUERY_BUDGETS は設定中のセッションでの値のため、この比較では上限を適用しない
+        """
+        self.login()
+        self.measure('session[db] accounts:profile', 'get', reverse('accounts:profile'))
+    
+    def test_session_cached_db(self):
+        """セッションの読み込みにかかるコスト（設定中の config.session_store）"""
+        self.login()
+        self.measure('session[cached_db] accounts:profile', 'get', reverse('accounts:profile'))
+    
+    def test_order_export(self):
+        self.client.force_login(self.staff)
+        self.measure('shop:order_export', 'get', reverse('shop:order_export'))
+    
+    def test_order_export_lines(self):
+        self.client.force_login(self.staff)
+        self.measure('shop:order_export?lines=1', 'get', reverse('shop:order_export'), {'lines': 1})
+    
+    def test_admin_order_changelist(self):
+        self.client.force_login(self.staff)
+        self.measure('admin:shop_order_changelist', 'get', reverse('admin:shop_order_changelist'))
+    
+    def test_admin_cart_changelist(self):
+        self.client.force_login(self.staff)
+        self.measure('admin:shop_cart_changelist', 'get', reverse('admin:shop_cart_changelist'))
+    
+    def test_admin_product_changelist(self):
+        self.client.force_login(self.staff)
+        self.measure('admin:shop_product_changelist', 'get', reverse('admin:shop_product_changelist'))
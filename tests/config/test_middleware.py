@@ -0,0 +1,277 @@
+"""
+Test Middleware
+ミドルウェアのテスト
+"""
+import io
+import json
+import logging
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.contrib.auth.models import User
+from config.log_handlers import BackgroundStreamHandler, JsonFormatter
+from config.middleware import QueryBudgetExceeded, performance_stats
+from shop.models import Category, Product, Cart, CartItem, Order, OrderItem
+
+
+class StructuredRequestLoggingMiddlewareTest(TestCase):
+    """リクエストログミドルウェアのテストケース"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+    
+    def test_one_record_per_request(self):
+        """1リクエストにつき1件のログが出力されることを確認"""
+        with self.assertLogs('config.middleware', level='INFO') as logs:
+            self.client.get(reverse('shop:product_list'))
+        
+        self.assertEqual(len(logs.records), 1)
+        record = logs.records[0]
+        self.assertEqual(record.method, 'GET')
+        self.assertEqual(record.path, reverse('shop:product_list'))
+        self.assertEqual(record.status, 200)
+        self.assertGreaterEqual(record.query_count, 1)
+        self.assertIsNone(record.user_id)
+    
+    def test_records_user_id(self):
+        """ログイン済みユーザーのIDが記録されることを確認"""
+        self.client.login(username='testuser', password='testpass123')
+        with self.assertLogs('config.middleware', level='INFO') as logs:
+            self.client.get(reverse('accounts:profile'))
+        
+        self.assertEqual(logs.records[0].user_id, self.user.id)
+    
+    def test_does_not_log_post_data(self):
+        """POSTデータ（パスワード等）がログに含まれないことを確認"""
+        with self.assertLogs('config.middleware', level='INFO') as logs:
+            self.client.post(reverse('accounts:login'), {
+                'username': 'testuser',
+                'password': 'testpass123'
+            })
+        
+        self.assertNotIn('testpass123', logs.output[0])
+    
+    def test_shares_performance_query_count(self):
+        """計測ミドルウェアの直後に置かれ、同じクエリ数（セッションの保存を含む）を記録することを確認"""
+        middleware = settings.MIDDLEWARE
+        self.assertEqual(
+            middleware.index('config.middleware.StructuredRequestLoggingMiddleware'),
+            middleware.index('config.middleware.PerformanceInstrumentationMiddleware') + 1
+        )
+        
+        self.client.login(username='testuser', password='testpass123')
+        with self.assertLogs('config.middleware', level='INFO') as logs:
+            response = self.client.get(reverse('accounts:profile'))
+        
+        self.assertIn(f'desc="{logs.records[0].query_count} queries"', response['Server-Timing'])
+    
+    @override_settings(MIDDLEWARE=[
+        'django.contrib.sessions.middleware.SessionMiddleware',
+        'django.contrib.auth.middleware.AuthenticationMiddleware',
+        'django.contrib.messages.middleware.MessageMiddleware',
+        'config.middleware.StructuredRequestLoggingMiddleware',
+    ])
+    def test_counts_queries_without_performance_middleware(self):
+        """計測ミドルウェアがない場合は自身でクエリ数を数えることを確認"""
+        with self.assertLogs('config.middleware', level='INFO') as logs:
+            self.client.get(reverse('shop:product_list'))
+        
+        self.assertGreaterEqual(logs.records[0].query_count, 1)
+    
+    @override_settings(REQUEST_LOG_SAMPLE_RATE=0)
+    def test_sampling(self):
+        """サンプリング対象外のリクエストはログに出力されないことを確認"""
+        with self.assertNoLogs('config.middleware', level='INFO'):
+            self.client.get(reverse('shop:product_list'))
+
+
+class BackgroundStreamHandlerTest(TestCase):
+    """バックグラウンド書き込みハンドラのテストケース"""
+    
+    def test_writes_json_in_background(self):
+        """キュー経由でJSON形式のログが書き込まれることを確認"""
+        stream = io.StringIO()
+        handler = BackgroundStreamHandler(stream)
+        handler.setFormatter(JsonFormatter())
+        logger = logging.getLogger('tests.background_handler')
+        logger.addHandler(handler)
+        logger.propagate = False
+        try:
+            logger.warning('%s %s', 'GET', '/', extra={'status': 200, 'query_count': 3})
+        finally:
+            logger.removeHandler(handler)
+            handler.close()  # キューに残ったログを書き出して停止
+        
+        data = json.loads(stream.getvalue())
+        self.assertEqual(data['message'], 'GET /')
+        self.assertEqual(data['status'], 200)
+        self.assertEqual(data['query_count'], 3)
+
+
+class PerformanceInstrumentationMiddlewareTest(TestCase):
+    """パフォーマンス計測ミドルウェアのテストケース"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        cache.clear()
+        performance_stats.reset()
+        self.client = Client()
+        self.staff = User.objects.create_user(
+            username='staff',
+            password='testpass123',
+            is_staff=True
+        )
+    
+    @override_settings(PERFORMANCE_SERVER_TIMING=True)
+    def test_server_timing_header(self):
+        """Server-Timingヘッダーにクエリ数と処理時間が含まれることを確認"""
+        response = self.client.get(reverse('shop:product_list'))
+        
+        header = response['Server-Timing']
+        self.assertIn('db;dur=', header)
+        self.assertIn('queries"', header)
+        self.assertIn('tpl;dur=', header)
+        self.assertIn('total;dur=', header)
+    
+    @override_settings(PERFORMANCE_SERVER_TIMING=False)
+    def test_server_timing_header_disabled(self):
+        """無効化した場合はServer-Timingヘッダーを返さないことを確認"""
+        response = self.client.get(reverse('shop:product_list'))
+        self.assertFalse(response.has_header('Server-Timing'))
+    
+    def test_stats_aggregated_per_url_name(self):
+        """URL名ごとに計測値が集計されることを確認"""
+        self.client.get(reverse('shop:product_list'))
+        self.client.get(reverse('shop:product_list'))
+        
+        stats = performance_stats.snapshot()['shop:product_list']
+        self.assertEqual(stats['requests'], 2)
+        self.assertGreaterEqual(stats['max_queries'], 1)
+        self.assertGreater(stats['avg_template_ms'], 0)
+    
+    def test_stats_endpoint_requires_staff(self):
+        """集計エンドポイントはスタッフのみ参照できることを確認"""
+        response = self.client.get(reverse('performance_stats'))
+        self.assertEqual(response.status_code, 302)
+        
+        self.client.login(username='staff', password='testpass123')
+        self.client.get(reverse('shop:product_list'))
+        response = self.client.get(reverse('performance_stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('shop:product_list', response.json())
+    
+    @override_settings(QUERY_BUDGETS={'shop:product_list': 0}, QUERY_BUDGET_ENFORCE=True)
+    def test_query_budget_enforced(self):
+        """クエリ数の上限を超えると例外が送出されることを確認"""
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('shop:product_list'))
+    
+    @override_settings(QUERY_BUDGETS={'shop:product_list': 0}, QUERY_BUDGET_ENFORCE=False)
+    def test_query_budget_warning(self):
+        """強制しない場合は警告ログのみ出力されることを確認"""
+        with self.assertLogs('config.middleware', level='WARNING') as logs:
+            response = self.client.get(reverse('shop:product_list'))
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(any('shop:product_list' in line for line in logs.output if 'WARNING' in line))
+
+
+@override_settings(QUERY_BUDGET_ENFORCE=True)
+class QueryBudgetTest(TestCase):
+    """QUERY_BUDGETS を設定した全てのURLが上限内に収まることのテストケース"""
+    
+    SHIPPING_DATA = {
+        'shipping_name': '山田太郎',
+        'shipping_postal_code': '123-4567',
+        'shipping_address': '東京都渋谷区テスト1-2-3',
+        'shipping_phone': '090-1234-5678',
+    }
+    
+    def setUp(self):
+        """テスト前の準備"""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.category = Category.objects.create(
+            name='電子機器',
+            slug='electronics'
+        )
+        self.products = [
+            Product.objects.create(
+                name=f'商品{i}',
+                slug=f'product-{i}',
+                category=self.category,
+                description='説明',
+                price=Decimal('1000'),
+                stock=10
+            )
+            for i in range(5)
+        ]
+        self.order = Order.objects.create(user=self.user, total_amount=Decimal('1000'), **self.SHIPPING_DATA)
+        OrderItem.objects.create(order=self.order, product=self.products[0], quantity=1, price=Decimal('1000'))
+    
+    def fill_cart(self):
+        """ログインユーザーのカートに商品を入れる"""
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.bulk_create([CartItem(cart=cart, product=product, quantity=1) for product in self.products])
+    
+    def test_test_runner_enforces_budgets(self):
+        """テストランナーがクエリ数の上限の超過を例外にすることを確認"""
+        self.assertTrue(settings.QUERY_BUDGET_ENFORCE)
+    
+    def test_guest_routes(self):
+        """ゲストのページ（初めてのカート追加を含む）が上限内に収まることを確認"""
+        requests = [
+            ('shop:product_list', 'get', {}),
+            ('shop:product_list_by_category', 'get', {'category_slug': self.category.slug}),
+            ('shop:product_detail', 'get', {'slug': self.products[0].slug}),
+            ('shop:cart', 'get', {}),
+            ('shop:add_to_cart', 'post', {'product_id': self.products[0].id}),
+            ('shop:add_to_cart', 'post', {'product_id': self.products[1].id}),
+            ('shop:cart', 'get', {}),
+        ]
+        for name, method, kwargs in requests:
+            response = getattr(self.client, method)(reverse(name, kwargs=kwargs))
+            self.assertLess(response.status_code, 400, name)
+    
+    def test_user_routes(self):
+        """ログインユーザーのページと注文確定が上限内に収まることを確認"""
+        self.fill_cart()
+        self.client.force_login(self.user)
+        
+        for name, kwargs in [
+            ('shop:cart', {}),
+            ('shop:checkout', {}),
+            ('shop:order_history', {}),
+            ('shop:order_detail', {'order_id': self.order.id}),
+            ('shop:order_complete', {'order_id': self.order.id}),
+            ('accounts:profile', {}),
+        ]:
+            response = self.client.get(reverse(name, kwargs=kwargs))
+            self.assertEqual(response.status_code, 200, name)
+        
+        response = self.client.post(reverse('shop:add_to_cart', kwargs={'product_id': self.products[0].id}))
+        self.assertEqual(response.status_code, 302)
+        response = self.client.post(reverse('shop:checkout'), self.SHIPPING_DATA)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Order.objects.filter(user=self.user).count(), 2)
+    
+    def test_all_budgeted_routes_are_covered(self):
+        """上限を設定したURL名がこのテストケースで全てリクエストされることを確認"""
+        covered = {
+            'shop:product_list', 'shop:product_list_by_category', 'shop:product_detail', 'shop:cart',
+            'shop:add_to_cart', 'shop:checkout', 'shop:order_history', 'shop:order_detail',
+            'shop:order_complete', 'accounts:profile',
+        }
+        self.assertEqual(set(settings.QUERY_BUDGETS), covered)
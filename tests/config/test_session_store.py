@@ -0,0 +1,72 @@
+"""
+Test Session Store
+セッションストアのテスト
+"""
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from config.session_store import SessionStore
+
+
+class SessionStoreTest(TestCase):
+    """書き込みをまとめる cached_db セッションのテストケース"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        caches['sessions'].clear()
+        session = SessionStore()
+        session['cart'] = {'1': 2}
+        session.save()
+        self.session_key = session.session_key
+    
+    def test_load_from_cache(self):
+        """保存したセッションはデータベースにアクセスせずに読み込めることを確認"""
+        with self.assertNumQueries(0):
+            session = SessionStore(self.session_key)
+            self.assertEqual(session['cart'], {'1': 2})
+    
+    def test_load_falls_back_to_database(self):
+        """キャッシュにない場合はデータベースから読み込むことを確認"""
+        caches['sessions'].clear()
+        
+        with self.assertNumQueries(1):
+            session = SessionStore(self.session_key)
+            self.assertEqual(session['cart'], {'1': 2})
+    
+    def test_unchanged_session_is_not_saved(self):
+        """内容が変わっていない場合は保存しないことを確認"""
+        session = SessionStore(self.session_key)
+        session['cart'] = {'1': 2}
+        session['flag'] = True
+        del session['flag']
+        self.assertTrue(session.modified)
+        
+        with self.assertNumQueries(0):
+            session.save()
+    
+    def test_changed_session_is_saved(self):
+        """内容が変わった場合はデータベースとキャッシュに保存することを確認"""
+        session = SessionStore(self.session_key)
+        session['cart'] = {'1': 3}
+        session.save()
+        
+        stored = Session.objects.get(session_key=self.session_key).get_decoded()
+        self.assertEqual(stored['cart'], {'1': 3})
+        with self.assertNumQueries(0):
+            self.assertEqual(SessionStore(self.session_key)['cart'], {'1': 3})
+        
+        # 保存した内容から変わっていなければ、続けて保存しても書き込まない
+        with self.assertNumQueries(0):
+            session.save()
+    
+    @override_settings(SESSION_SAVE_EVERY_REQUEST=True)
+    def test_save_every_request_always_saves(self):
+        """SESSION_SAVE_EVERY_REQUEST の場合は有効期限の延長のため毎回保存することを確認"""
+        session = SessionStore(self.session_key)
+        session['cart'] = {'1': 2}
+        
+        with CaptureQueriesContext(connection) as queries:
+            session.save()
+        self.assertTrue(any(query['sql'].startswith('UPDATE') for query in queries))
@@ -0,0 +1,3 @@
+"""
+Admin Tests Package
+"""
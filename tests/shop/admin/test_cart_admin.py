@@ -0,0 +1,85 @@
+"""
+Test Cart Admin
+カート管理画面のテスト
+"""
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from shop.models import Category, Product, Cart, CartItem
+
+
+class CartAdminChangelistTest(TestCase):
+    """カート一覧画面のテストケース"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        self.client = Client()
+        self.admin = User.objects.create_superuser(
+            username='admin',
+            password='adminpass123'
+        )
+        self.category = Category.objects.create(
+            name='電子機器',
+            slug='electronics'
+        )
+        self.product = Product.objects.create(
+            name='ノートPC',
+            slug='notebook-pc',
+            category=self.category,
+            description='高性能ノートパソコン',
+            price=Decimal('89800'),
+            stock=10
+        )
+        self.mouse = Product.objects.create(
+            name='マウス',
+            slug='mouse',
+            category=self.category,
+            description='ワイヤレスマウス',
+            price=Decimal('2980'),
+            stock=50
+        )
+        self.client.login(username='admin', password='adminpass123')
+    
+    def create_carts(self, count):
+        for i in range(count):
+            user = User.objects.create_user(username=f'user{Cart.objects.count()}', password='testpass123')
+            cart = Cart.objects.create(user=user)
+            CartItem.objects.create(cart=cart, product=self.product, quantity=2)
+            CartItem.objects.create(cart=cart, product=self.mouse, quantity=1)
+    
+    def test_changelist_shows_annotated_totals(self):
+        """商品数と合計金額が集計されて表示されることを確認"""
+        self.create_carts(1)
+        Cart.objects.create(session_key='guest-session')
+        
+        response = self.client.get(reverse('admin:shop_cart_changelist'))
+        
+        carts = {cart.session_key or cart.user.username: cart for cart in response.context['cl'].result_list}
+        self.assertEqual(carts['user0'].item_quantity, 3)
+        self.assertEqual(carts['user0'].item_total, Decimal('182580'))
+        self.assertEqual(carts['guest-session'].item_quantity, 0)
+        self.assertContains(response, '¥182,580')
+    
+    def test_changelist_query_count_does_not_grow_with_carts(self):
+        """カート数が増えても一覧画面のクエリ数が増えないことを確認"""
+        self.create_carts(2)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(reverse('admin:shop_cart_changelist'))
+        
+        self.create_carts(10)
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(reverse('admin:shop_cart_changelist'))
+        
+        self.assertEqual(len(many), len(few))
+    
+    def test_search_by_exact_session_key(self):
+        """セッションキーの完全一致で検索できることを確認"""
+        Cart.objects.create(session_key='guest-session')
+        Cart.objects.create(session_key='guest-session-2')
+        
+        response = self.client.get(reverse('admin:shop_cart_changelist'), {'q': 'guest-session'})
+        
+        self.assertEqual([cart.session_key for cart in response.context['cl'].result_list], ['guest-session'])
@@ -0,0 +1,193 @@
+"""
+Test Order Admin
+注文管理画面のテスト
+"""
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from shop.models import Category, Product, Order, OrderItem
+
+
+class OrderAdminExportTest(TestCase):
+    """注文エクスポートアクションのテストケース"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        self.client = Client()
+        self.admin = User.objects.create_superuser(
+            username='admin',
+            password='adminpass123'
+        )
+        self.category = Category.objects.create(
+            name='電子機器',
+            slug='electronics'
+        )
+        self.product = Product.objects.create(
+            name='ノートPC',
+            slug='notebook-pc',
+            category=self.category,
+            description='高性能ノートパソコン',
+            price=Decimal('89800'),
+            stock=10
+        )
+        self.order = Order.objects.create(
+            user=self.admin,
+            total_amount=Decimal('179600'),
+            shipping_name='山田太郎',
+            shipping_postal_code='123-4567',
+            shipping_address='東京都渋谷区テスト1-2-3',
+            shipping_phone='090-1234-5678'
+        )
+        OrderItem.objects.create(order=self.order, product=self.product, quantity=2, price=self.product.price)
+        self.client.login(username='admin', password='adminpass123')
+    
+    def test_export_lines_as_csv(self):
+        """選択した注文の注文商品がCSVでストリーミングされることを確認"""
+        response = self.client.post(reverse('admin:shop_order_changelist'), {
+            'action': 'export_lines_as_csv',
+            '_selected_action': [self.order.id],
+        })
+        
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        self.assertIn('notebook-pc,ノートPC,2,89800,179600', content)
+
+
+class OrderAdminChangelistTest(TestCase):
+    """注文一覧画面のテストケース"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        self.client = Client()
+        self.admin = User.objects.create_superuser(
+            username='admin',
+            password='adminpass123'
+        )
+        self.category = Category.objects.create(
+            name='電子機器',
+            slug='electronics'
+        )
+        self.product = Product.objects.create(
+            name='ノートPC',
+            slug='notebook-pc',
+            category=self.category,
+            description='高性能ノートパソコン',
+            price=Decimal('89800'),
+            stock=10
+        )
+        self.client.login(username='admin', password='adminpass123')
+    
+    def create_order(self, quantity=1):
+        user = User.objects.create_user(username=f'user{Order.objects.count()}', password='testpass123')
+        order = Order.objects.create(
+            user=user,
+            total_amount=self.product.price * quantity,
+            shipping_name='山田太郎',
+            shipping_postal_code='123-4567',
+            shipping_address='東京都渋谷区テスト1-2-3',
+            shipping_phone='090-1234-5678'
+        )
+        for _ in range(quantity):
+            OrderItem.objects.create(order=order, product=self.product, quantity=1, price=self.product.price)
+        return order
+    
+    def test_changelist_query_count_does_not_grow_with_orders(self):
+        """注文数が増えても一覧画面のクエリ数が増えないことを確認"""
+        self.create_order()
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(reverse('admin:shop_order_changelist'))
+        
+        for _ in range(10):
+            self.create_order(quantity=2)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(reverse('admin:shop_order_changelist'))
+        
+        self.assertEqual(len(many), len(few))
+        self.assertEqual(response.context['cl'].result_list[0].item_count, 2)
+    
+    def test_search_by_order_number(self):
+        """数字の検索語で注文番号を検索できることを確認"""
+        order = self.create_order()
+        other = self.create_order()
+        
+        response = self.client.get(reverse('admin:shop_order_changelist'), {'q': f'#{order.id}'})
+        self.assertEqual(list(response.context['cl'].result_list), [order])
+        
+        response = self.client.get(reverse('admin:shop_order_changelist'), {'q': other.user.username})
+        self.assertEqual(list(response.context['cl'].result_list), [other])
+    
+    def test_status_is_not_editable_outside_actions(self):
+        """一覧・変更画面ではステータスを変更できず、変更した列だけを更新することを確認"""
+        order = self.create_order()
+        response = self.client.get(reverse('admin:shop_order_changelist'))
+        self.assertFalse(response.context['cl'].list_editable)
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('admin:shop_order_change', args=[order.id]), {
+                'user': order.user_id,
+                'status': 'cancelled',
+                'shipping_name': order.shipping_name,
+                'shipping_postal_code': order.shipping_postal_code,
+                'shipping_address': '東京都新宿区テスト4-5-6',
+                'shipping_phone': order.shipping_phone,
+                'items-TOTAL_FORMS': '1',
+                'items-INITIAL_FORMS': '1',
+                'items-0-id': order.items.get().id,
+                'items-0-order': order.id,
+                '_save': '保存',
+            })
+        
+        self.assertEqual(response.status_code, 302)
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'pending')
+        self.assertEqual(order.shipping_address, '東京都新宿区テスト4-5-6')
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "shop_order"')]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('"status"', updates[0])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 10)
+    
+    @override_settings(PAGINATOR_ESTIMATE_THRESHOLD=3)
+    def test_changelist_uses_cached_count_above_threshold(self):
+        """threshold 件を超える一覧は件数をキャッシュし、COUNT(*) を繰り返さないことを確認"""
+        cache.clear()
+        for _ in range(5):
+            self.create_order()
+        
+        response = self.client.get(reverse('admin:shop_order_changelist'))
+        self.assertEqual(response.context['cl'].result_count, 5)
+        
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('admin:shop_order_changelist'))
+        self.assertFalse([query for query in queries if query['sql'].startswith('SELECT COUNT(')])
+    
+    def test_mark_shipped_action(self):
+        """選択した注文を一括で発送済みにできることを確認"""
+        orders = [self.create_order() for _ in range(3)]
+        Order.objects.filter(pk=orders[0].pk).update(status='delivered')
+        
+        response = self.client.post(reverse('admin:shop_order_changelist'), {
+            'action': 'mark_shipped',
+            '_selected_action': [order.id for order in orders],
+        }, follow=True)
+        
+        self.assertEqual(Order.objects.filter(status='shipped').count(), 2)
+        self.assertContains(response, '2件の注文を「発送済み」に変更しました。')
+        self.assertContains(response, '1件の注文は現在のステータスから「発送済み」に変更できないため')
+    
+    def test_cancel_orders_action_restocks(self):
+        """選択した注文をキャンセルすると在庫が戻ることを確認"""
+        orders = [self.create_order(quantity=2) for _ in range(2)]
+        
+        self.client.post(reverse('admin:shop_order_changelist'), {
+            'action': 'cancel_orders',
+            '_selected_action': [order.id for order in orders],
+        })
+        
+        self.assertEqual(Order.objects.filter(status='cancelled').count(), 2)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 14)
@@ -0,0 +1,90 @@
+"""
+Test Product Admin
+商品管理画面のテスト
+"""
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from shop.models import Category, Product
+
+
+class ProductAdminExportTest(TestCase):
+    """商品エクスポートアクションのテストケース"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        self.client = Client()
+        self.admin = User.objects.create_superuser(
+            username='admin',
+            password='adminpass123'
+        )
+        self.category = Category.objects.create(
+            name='電子機器',
+            slug='electronics'
+        )
+        self.product = Product.objects.create(
+            name='ノートPC',
+            slug='notebook-pc',
+            category=self.category,
+            description='高性能ノートパソコン',
+            price=Decimal('89800'),
+            stock=10
+        )
+        self.client.login(username='admin', password='adminpass123')
+    
+    def test_export_as_csv(self):
+        """選択した商品がCSVでストリーミングされることを確認"""
+        response = self.client.post(reverse('admin:shop_product_changelist'), {
+            'action': 'export_as_csv',
+            '_selected_action': [self.product.id],
+        })
+        
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        self.assertIn('notebook-pc,ノートPC,electronics', content)
+    
+    def test_export_as_jsonl(self):
+        """選択した商品がJSONLでストリーミングされることを確認"""
+        response = self.client.post(reverse('admin:shop_product_changelist'), {
+            'action': 'export_as_jsonl',
+            '_selected_action': [self.product.id],
+        })
+        
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertIn('"slug": "notebook-pc"', content)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+    
+    def test_search_uses_search_backend(self):
+        """一覧画面の検索が商品検索と同じ結果になることを確認"""
+        Product.objects.create(
+            name='マウス',
+            slug='mouse',
+            category=self.category,
+            description='ワイヤレスマウス',
+            price=Decimal('2980'),
+            stock=50
+        )
+        
+        response = self.client.get(reverse('admin:shop_product_changelist'), {'q': 'ノートパソコン'})
+        
+        self.assertEqual(list(response.context['cl'].result_list), [self.product])
+    
+    def test_list_editable_does_not_reindex(self):
+        """価格・在庫だけの変更では検索索引を更新しないことを確認"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('admin:shop_product_changelist'), {
+                'form-TOTAL_FORMS': '1',
+                'form-INITIAL_FORMS': '1',
+                'form-0-id': self.product.id,
+                'form-0-price': '79800',
+                'form-0-stock': '5',
+                'form-0-is_active': 'on',
+                '_save': '保存',
+            })
+        
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 5)
+        self.assertFalse([query for query in queries if 'shop_product_fts' in query['sql']])
@@ -0,0 +1,65 @@
+"""
+Test Backfill Order Item Snapshots
+注文商品の商品情報記録コマンドのテスト
+"""
+from decimal import Decimal
+from io import StringIO
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from shop.models import Category, Product, Order, OrderItem
+
+
+class BackfillOrderItemSnapshotsTest(TestCase):
+    """注文商品の商品情報記録コマンドのテストケース"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.category = Category.objects.create(
+            name='電子機器',
+            slug='electronics'
+        )
+        self.product = Product.objects.create(
+            name='ノートPC',
+            slug='notebook-pc',
+            category=self.category,
+            description='高性能ノートパソコン',
+            price=Decimal('89800'),
+            stock=10
+        )
+        self.order = Order.objects.create(
+            user=self.user,
+            total_amount=Decimal('89800'),
+            shipping_name='山田太郎',
+            shipping_postal_code='123-4567',
+            shipping_address='東京都渋谷区テスト1-2-3',
+            shipping_phone='090-1234-5678'
+        )
+        # 商品情報の記録機能より前に作成された注文商品を再現
+        OrderItem.objects.bulk_create([
+            OrderItem(order=self.order, product=self.product, quantity=1, price=Decimal('89800'))
+            for _ in range(3)
+        ])
+    
+    def test_backfill(self):
+        """未記録の注文商品に商品情報が記録されることを確認"""
+        out = StringIO()
+        call_command('backfill_order_item_snapshots', '--batch-size', '2', stdout=out)
+        
+        self.assertIn('3件', out.getvalue())
+        for item in OrderItem.objects.all():
+            self.assertEqual(item.product_name, 'ノートPC')
+            self.assertEqual(item.product_slug, 'notebook-pc')
+            self.assertEqual(item.product_image.name, '')
+    
+    def test_backfill_is_idempotent(self):
+        """記録済みの注文商品は更新されないことを確認"""
+        call_command('backfill_order_item_snapshots', stdout=StringIO())
+        out = StringIO()
+        call_command('backfill_order_item_snapshots', stdout=out)
+        
+        self.assertIn('0件', out.getvalue())
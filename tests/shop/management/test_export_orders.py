@@ -0,0 +1,74 @@
+"""
+Test Export Orders
+注文エクスポートコマンドのテスト
+"""
+import csv
+import json
+from decimal import Decimal
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from shop.models import Category, Product, Order, OrderItem
+
+
+class ExportOrdersTest(TestCase):
+    """注文エクスポートコマンドのテストケース"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.category = Category.objects.create(
+            name='電子機器',
+            slug='electronics'
+        )
+        self.product = Product.objects.create(
+            name='ノートPC',
+            slug='notebook-pc',
+            category=self.category,
+            description='高性能ノートパソコン',
+            price=Decimal('89800'),
+            stock=10
+        )
+        self.order = Order.objects.create(
+            user=self.user,
+            status='delivered',
+            total_amount=Decimal('89800'),
+            shipping_name='山田太郎',
+            shipping_postal_code='123-4567',
+            shipping_address='東京都渋谷区テスト1-2-3',
+            shipping_phone='090-1234-5678'
+        )
+        OrderItem.objects.create(order=self.order, product=self.product, quantity=1, price=self.product.price)
+    
+    def test_export_orders_csv(self):
+        """注文単位のCSVが出力されることを確認"""
+        out = StringIO()
+        call_command('export_orders', stdout=out)
+        
+        rows = list(csv.DictReader(StringIO(out.getvalue())))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['order_id'], str(self.order.id))
+        self.assertEqual(rows[0]['shipping_name'], '山田太郎')
+    
+    def test_export_lines_jsonl_with_filters(self):
+        """注文商品単位のJSONLが条件で絞り込まれることを確認"""
+        out = StringIO()
+        call_command('export_orders', '--lines', '--format', 'jsonl', '--status', 'delivered', stdout=out)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(records[0]['product_slug'], 'notebook-pc')
+        
+        out = StringIO()
+        call_command('export_orders', '--lines', '--format', 'jsonl', '--status', 'pending', stdout=out)
+        self.assertEqual(out.getvalue(), '')
+    
+    def test_invalid_date(self):
+        """不正な日付はエラーになることを確認"""
+        with self.assertRaises(CommandError):
+            call_command('export_orders', '--from', '2025/10/01')
+        with self.assertRaises(CommandError):
+            call_command('export_orders', '--from', '2025-10-31', '--to', '2025-10-01')
@@ -0,0 +1,102 @@
+"""
+Test Import/Export Products
+商品のインポート・エクスポートコマンドのテスト
+"""
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from shop.models import Category, Product
+
+
+class ImportExportProductsTest(TestCase):
+    """商品のインポート・エクスポートコマンドのテストケース"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        self.category = Category.objects.create(
+            name='電子機器',
+            slug='electronics'
+        )
+        self.tmpdir = tempfile.TemporaryDirectory()
+    
+    def tearDown(self):
+        self.tmpdir.cleanup()
+    
+    def write_file(self, name, content, encoding='utf-8'):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w', encoding=encoding, newline='') as f:
+            f.write(content)
+        return path
+    
+    def test_import_csv_with_bom(self):
+        """BOM付きのCSVをインポートできることを確認"""
+        path = self.write_file(
+            'products.csv',
+            'slug,name,category,description,price,stock,is_active\n'
+            'notebook-pc,ノートPC,electronics,"説明, カンマ入り",89800,10,1\n',
+            encoding='utf-8-sig'
+        )
+        out = StringIO()
+        call_command('import_products', path, stdout=out, stderr=StringIO())
+        
+        product = Product.objects.get(slug='notebook-pc')
+        self.assertEqual(product.description, '説明, カンマ入り')
+        self.assertIn('新規 1件', out.getvalue())
+        self.assertIn('行/秒', out.getvalue())
+    
+    def test_import_jsonl(self):
+        """JSONLをインポートできることを確認"""
+        lines = [
+            {'slug': f'item-{i}', 'name': f'商品{i}', 'category': 'electronics',
+             'description': '説明', 'price': 1000, 'stock': i}
+            for i in range(5)
+        ]
+        path = self.write_file('feed.jsonl', '\n'.join(json.dumps(line, ensure_ascii=False) for line in lines))
+        call_command('import_products', path, '--batch-size', '2', stdout=StringIO(), stderr=StringIO())
+        
+        self.assertEqual(Product.objects.count(), 5)
+        self.assertEqual(Product.objects.get(slug='item-4').stock, 4)
+    
+    def test_import_reports_invalid_rows(self):
+        """不正な行がエラー出力に報告されることを確認"""
+        path = self.write_file(
+            'products.csv',
+            'slug,name,category,description,price\n'
+            'ok,正常,electronics,説明,100\n'
+            'ng,異常,unknown,説明,100\n'
+        )
+        err = StringIO()
+        call_command('import_products', path, stdout=StringIO(), stderr=err)
+        
+        self.assertIn('2件目', err.getvalue())
+        self.assertTrue(Product.objects.filter(slug='ok').exists())
+    
+    def test_import_missing_file(self):
+        """存在しないファイルはエラーになることを確認"""
+        with self.assertRaises(CommandError):
+            call_command('import_products', os.path.join(self.tmpdir.name, 'none.csv'))
+    
+    def test_export_then_import(self):
+        """エクスポートしたファイルを再インポートできることを確認"""
+        Product.objects.create(
+            name='ノートPC',
+            slug='notebook-pc',
+            category=self.category,
+            description='高性能ノートパソコン',
+            price=Decimal('89800'),
+            stock=10
+        )
+        path = os.path.join(self.tmpdir.name, 'export.csv')
+        call_command('export_products', '--output', path)
+        
+        with open(path, encoding='utf-8-sig') as f:
+            self.assertTrue(f.readline().startswith('slug,name,category'))
+        
+        out = StringIO()
+        call_command('import_products', path, stdout=out, stderr=StringIO())
+        self.assertIn('更新 1件', out.getvalue())
@@ -0,0 +1,79 @@
+"""
+Test Purge Guest Carts
+放置ゲストカート削除のテスト
+"""
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.utils import timezone
+from shop.models import Category, Product, Cart, CartItem
+from shop.services import CartService
+
+
+class PurgeGuestCartsTest(TestCase):
+    """放置ゲストカート削除のテストケース"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        self.category = Category.objects.create(
+            name='電子機器',
+            slug='electronics'
+        )
+        self.product = Product.objects.create(
+            name='ノートPC',
+            slug='notebook-pc',
+            category=self.category,
+            description='高性能ノートパソコン',
+            price=Decimal('89800'),
+            stock=10
+        )
+        old = timezone.now() - timedelta(days=60)
+        
+        # 放置されたゲストカート
+        self.stale_carts = []
+        for i in range(5):
+            cart = Cart.objects.create(session_key=f'stale_{i}')
+            CartItem.objects.create(cart=cart, product=self.product, quantity=1)
+            self.stale_carts.append(cart)
+        Cart.objects.filter(session_key__startswith='stale_').update(updated_at=old)
+        CartItem.objects.filter(cart__in=self.stale_carts).update(updated_at=old)
+        
+        # カート本体は古いが最近商品が追加されたゲストカート
+        self.active_cart = Cart.objects.create(session_key='active')
+        Cart.objects.filter(pk=self.active_cart.pk).update(updated_at=old)
+        CartItem.objects.create(cart=self.active_cart, product=self.product, quantity=1)
+        
+        # 古いユーザーカート
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.user_cart = Cart.objects.create(user=self.user)
+        Cart.objects.filter(pk=self.user_cart.pk).update(updated_at=old)
+    
+    def test_purge_deletes_only_stale_guest_carts(self):
+        """放置されたゲストカートのみ削除されることを確認"""
+        report = CartService.purge_stale_guest_carts(timedelta(days=30), batch_size=2)
+        
+        self.assertEqual(report['carts'], 5)
+        self.assertEqual(report['items'], 5)
+        self.assertEqual(report['batches'], 3)
+        self.assertFalse(Cart.objects.filter(session_key__startswith='stale_').exists())
+        self.assertTrue(Cart.objects.filter(pk=self.active_cart.pk).exists())
+        self.assertTrue(Cart.objects.filter(pk=self.user_cart.pk).exists())
+    
+    def test_dry_run_does_not_delete(self):
+        """dry-runでは削除されないことを確認"""
+        report = CartService.purge_stale_guest_carts(timedelta(days=30), dry_run=True)
+        
+        self.assertEqual(report['carts'], 5)
+        self.assertEqual(report['items'], 5)
+        self.assertEqual(Cart.objects.filter(session_key__startswith='stale_').count(), 5)
+    
+    def test_command_outputs_report(self):
+        """コマンドが削除結果を出力することを確認"""
+        out = StringIO()
+        call_command('purge_guest_carts', '--days', '30', stdout=out)
+        
+        self.assertIn('カート 5件', out.getvalue())
+        self.assertEqual(Cart.objects.count(), 2)
@@ -50,6 +50,24 @@ class CartModelTest(TestCase):
         self.assertIsNone(cart.user)
         self.assertEqual(cart.session_key, 'test_session_123')
     
+    def test_one_cart_per_user(self):
+        """同じユーザーのカートは1つしか作成できないことを確認"""
+        Cart.objects.create(user=self.user)
+        
+        from django.db import IntegrityError
+        with self.assertRaises(IntegrityError):
+            Cart.objects.create(user=self.user)
+    
+    def test_one_cart_per_session(self):
+        """同じセッションのカートは1つしか作成できないことを確認"""
+        Cart.objects.create(session_key='test_session_123')
+        Cart.objects.create()  # セッションキーなしのカートは制約の対象外
+        Cart.objects.create()
+        
+        from django.db import IntegrityError
+        with self.assertRaises(IntegrityError):
+            Cart.objects.create(session_key='test_session_123')
+    
     def test_cart_str(self):
         """__str__メソッドが正しく動作することを確認"""
         cart = Cart.objects.create(user=self.user)
@@ -80,6 +98,42 @@ class CartModelTest(TestCase):
         cart = Cart.objects.create(user=self.user)
         self.assertEqual(cart.total_price, 0)
         self.assertEqual(cart.total_items, 0)
+    
+    def test_totals_use_single_query(self):
+        """合計金額と合計数量が1回の集計クエリで計算されることを確認"""
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.product1, quantity=2)
+        CartItem.objects.create(cart=cart, product=self.product2, quantity=3)
+        
+        cart = Cart.objects.get(pk=cart.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(cart.total_items, 5)
+            self.assertEqual(cart.total_price, (self.product1.price * 2) + (self.product2.price * 3))
+    
+    def test_totals_use_prefetched_items(self):
+        """プリフェッチ済みの場合は追加のクエリを発行しないことを確認"""
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.product1, quantity=2)
+        
+        cart = Cart.objects.get(pk=cart.pk).prefetch_items()
+        with self.assertNumQueries(0):
+            self.assertEqual(cart.total_items, 2)
+            self.assertEqual(cart.total_price, self.product1.price * 2)
+            for item in cart.items.all():
+                self.assertEqual(item.subtotal, self.product1.price * 2)
+    
+    def test_totals_invalidated_on_item_change(self):
+        """カート商品の追加・削除で合計値のキャッシュが破棄されることを確認"""
+        cart = Cart.objects.create(user=self.user)
+        item = CartItem.objects.create(cart=cart, product=self.product1, quantity=2)
+        self.assertEqual(cart.total_items, 2)
+        
+        CartItem.objects.create(cart=cart, product=self.product2, quantity=3)
+        self.assertEqual(cart.total_items, 5)
+        
+        item.delete()
+        self.assertEqual(cart.total_items, 3)
+        self.assertEqual(cart.total_price, self.product2.price * 3)
 
 
 class CartItemModelTest(TestCase):
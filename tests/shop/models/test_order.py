@@ -159,3 +159,34 @@ class OrderItemModelTest(TestCase):
         # 注文商品の価格は変わらない
         order_item.refresh_from_db()
         self.assertEqual(order_item.price, original_price)
+    
+    def test_product_snapshot(self):
+        """注文時の商品名・スラッグが記録されることを確認"""
+        order_item = OrderItem.objects.create(
+            order=self.order,
+            product=self.product,
+            quantity=1,
+            price=self.product.price
+        )
+        
+        self.product.name = '新しい商品名'
+        self.product.save()
+        
+        order_item.refresh_from_db()
+        self.assertEqual(order_item.product_name, 'ノートPC')
+        self.assertEqual(order_item.product_slug, 'notebook-pc')
+    
+    def test_order_item_survives_product_deletion(self):
+        """商品が削除されても注文商品は残ることを確認"""
+        order_item = OrderItem.objects.create(
+            order=self.order,
+            product=self.product,
+            quantity=1,
+            price=self.product.price
+        )
+        
+        self.product.delete()
+        
+        order_item.refresh_from_db()
+        self.assertIsNone(order_item.product)
+        self.assertEqual(str(order_item), 'ノートPC x 1')
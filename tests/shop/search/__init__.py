@@ -0,0 +1,3 @@
+"""
+Search Tests Package
+"""
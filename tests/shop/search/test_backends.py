@@ -0,0 +1,125 @@
+"""
+Test Search Backends
+商品検索バックエンドのテスト
+"""
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.core.paginator import Paginator
+from django.test import TestCase
+from shop.models import Category, Product
+from shop.search import SimpleSearchBackend, SQLiteFTSBackend, get_search_backend
+
+
+class SearchBackendTestMixin:
+    """各バックエンド共通のテスト"""
+    
+    backend_class = None
+    
+    def setUp(self):
+        """テスト前の準備"""
+        self.backend = self.backend_class()
+        self.category = Category.objects.create(
+            name='電子機器',
+            slug='electronics'
+        )
+        self.notebook = self.create_product('ノートパソコン', 'notebook', '高性能なノートパソコンです')
+        self.tablet = self.create_product('タブレット端末', 'tablet', 'ノートパソコンより軽い端末です')
+        self.camera = self.create_product('デジタルカメラ', 'camera', '高画質なカメラです')
+    
+    def create_product(self, name, slug, description):
+        return Product.objects.create(
+            name=name,
+            slug=slug,
+            category=self.category,
+            description=description,
+            price=Decimal('10000'),
+            stock=10
+        )
+    
+    def search(self, query):
+        return list(self.backend.search(Product.objects.all(), query))
+    
+    def test_search_name_and_description(self):
+        """商品名・説明のどちらにも一致することを確認"""
+        results = self.search('ノートパソコン')
+        self.assertEqual(set(results), {self.notebook, self.tablet})
+    
+    def test_name_match_ranked_first(self):
+        """商品名に一致する商品が先に表示されることを確認"""
+        results = self.search('ノートパソコン')
+        self.assertEqual(results[0], self.notebook)
+    
+    def test_all_terms_must_match(self):
+        """複数の検索語はAND検索になることを確認"""
+        self.assertEqual(self.search('ノートパソコン　軽い端末'), [self.tablet])
+    
+    def test_no_match(self):
+        """一致しない場合は空になることを確認"""
+        self.assertEqual(self.search('冷蔵庫です'), [])
+    
+    def test_respects_queryset_filter(self):
+        """渡したクエリセットの絞り込み（販売中など）が維持されることを確認"""
+        self.tablet.is_active = False
+        self.tablet.save()
+        results = list(self.backend.search(Product.objects.filter(is_active=True), 'ノートパソコン'))
+        self.assertEqual(results, [self.notebook])
+    
+    def test_equal_rank_pagination_is_stable(self):
+        """関連度が同じ商品は新しい順に並び、ページをまたいで重複・欠落しないことを確認"""
+        products = [
+            self.create_product('ワイヤレスマウス', f'mouse-{i}', '静音タイプのワイヤレスマウス')
+            for i in range(5)
+        ]
+        paginator = Paginator(self.backend.search(Product.objects.all(), 'ワイヤレスマウス'), 2)
+        results = [product for number in paginator.page_range for product in paginator.page(number)]
+        
+        expected = sorted(products, key=lambda product: (product.created_at, product.id), reverse=True)
+        self.assertEqual(results, expected)
+
+
+class SimpleSearchBackendTest(SearchBackendTestMixin, TestCase):
+    """LIKE検索バックエンドのテストケース"""
+    
+    backend_class = SimpleSearchBackend
+
+
+class SQLiteFTSBackendTest(SearchBackendTestMixin, TestCase):
+    """FTS5バックエンドのテストケース"""
+    
+    backend_class = SQLiteFTSBackend
+    
+    def test_selected_by_default_on_sqlite(self):
+        """SQLiteではFTS5バックエンドが選択されることを確認"""
+        self.assertIsInstance(get_search_backend(), SQLiteFTSBackend)
+    
+    def test_index_follows_product_changes(self):
+        """商品の更新・削除が索引に反映されることを確認"""
+        self.camera.name = 'ミラーレスカメラ'
+        self.camera.save()
+        self.assertEqual(self.search('ミラーレス'), [self.camera])
+        
+        self.camera.delete()
+        self.assertEqual(self.search('ミラーレス'), [])
+    
+    def test_short_terms_fall_back_to_like(self):
+        """3文字未満の検索語でも検索できることを確認"""
+        self.assertEqual(self.search('カメ'), [self.camera])
+    
+    def test_quotes_are_escaped(self):
+        """FTS5の構文文字を含む検索語でエラーにならないことを確認"""
+        self.assertEqual(self.search('"カメラ" NEAR('), [])
+    
+    def test_rebuild_command(self):
+        """索引の再構築コマンドで一括登録した商品も検索できることを確認"""
+        Product.objects.bulk_create([
+            Product(name='ワイヤレスイヤホン', slug='earphone', category=self.category,
+                    description='説明', price=Decimal('5000'))
+        ])
+        self.assertEqual(self.search('イヤホン'), [])
+        
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        
+        self.assertIn('4件', out.getvalue())
+        self.assertEqual([product.slug for product in self.search('イヤホン')], ['earphone'])
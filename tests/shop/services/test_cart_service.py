@@ -3,11 +3,13 @@ Test Cart Service
 カートサービスのテスト
 """
 from decimal import Decimal
-from django.test import TestCase, RequestFactory
-from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import AnonymousUser, User
 from django.contrib.sessions.middleware import SessionMiddleware
 from shop.models import Category, Product, Cart, CartItem
-from shop.services import CartService
+from shop.services import CartService, CartOperationError, InsufficientStockError
 
 
 class CartServiceTest(TestCase):
@@ -68,6 +70,30 @@ class CartServiceTest(TestCase):
         self.assertIsNotNone(cart.session_key)
         self.assertEqual(cart.session_key, request.session.session_key)
     
+    def test_get_cart_is_cached_per_request(self):
+        """同一リクエスト内ではカートを再取得しないことを確認"""
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=2)
+        
+        request = self.factory.get('/')
+        request.user = self.user
+        self._add_session_to_request(request)
+        
+        with self.assertNumQueries(2):  # カート + 商品情報付きカート商品
+            loaded = CartService.get_cart(request)
+        with self.assertNumQueries(0):
+            self.assertIs(CartService.get_or_create_cart(request), loaded)
+            self.assertEqual(loaded.total_items, 2)
+    
+    def test_get_cart_does_not_create_cart(self):
+        """get_cartはカートを作成しないことを確認"""
+        request = self.factory.get('/')
+        request.user = self.user
+        self._add_session_to_request(request)
+        
+        self.assertIsNone(CartService.get_cart(request))
+        self.assertFalse(Cart.objects.filter(user=self.user).exists())
+    
     def test_clear_cart(self):
         """カートクリア機能をテスト"""
         cart = Cart.objects.create(user=self.user)
@@ -125,3 +151,357 @@ class CartServiceTest(TestCase):
         user_cart.refresh_from_db()
         cart_item = user_cart.items.get(product=self.product)
         self.assertEqual(cart_item.quantity, 4)  # 1 + 3
+
+
+class CartMergeTest(TestCase):
+    """ゲストカートのマージのテストケース"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.category = Category.objects.create(
+            name='電子機器',
+            slug='electronics'
+        )
+        self.products = [
+            Product.objects.create(
+                name=f'商品{i}',
+                slug=f'product-{i}',
+                category=self.category,
+                description='説明',
+                price=Decimal('1000'),
+                stock=100
+            )
+            for i in range(10)
+        ]
+        self.request = self.factory.get('/')
+        self.request.user = self.user
+        SessionMiddleware(lambda x: None).process_request(self.request)
+        self.request.session.save()
+        self.guest_cart = Cart.objects.create(session_key=self.request.session.session_key)
+    
+    def test_merge_adds_and_moves_items(self):
+        """同じ商品は数量を加算し、それ以外の商品はユーザーカートに移ることを確認"""
+        user_cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=user_cart, product=self.products[0], quantity=1)
+        CartItem.objects.create(cart=self.guest_cart, product=self.products[0], quantity=3)
+        CartItem.objects.create(cart=self.guest_cart, product=self.products[1], quantity=2)
+        
+        merged = CartService.merge_guest_cart_to_user(self.request, self.user)
+        
+        self.assertEqual(merged.pk, user_cart.pk)
+        quantities = dict(user_cart.items.values_list('product_id', 'quantity'))
+        self.assertEqual(quantities, {self.products[0].pk: 4, self.products[1].pk: 2})
+        self.assertFalse(Cart.objects.filter(pk=self.guest_cart.pk).exists())
+        self.assertEqual(merged.total_items, 6)
+    
+    def test_merge_creates_user_cart(self):
+        """ユーザーカートがない場合は作成してマージすることを確認"""
+        CartItem.objects.create(cart=self.guest_cart, product=self.products[0], quantity=2)
+        
+        merged = CartService.merge_guest_cart_to_user(self.request, self.user)
+        
+        self.assertEqual(merged.user, self.user)
+        self.assertEqual(merged.items.get().quantity, 2)
+    
+    def test_merge_without_guest_cart(self):
+        """ゲストカートがない場合は何もしないことを確認"""
+        self.guest_cart.delete()
+        self.assertIsNone(CartService.merge_guest_cart_to_user(self.request, self.user))
+        self.assertFalse(Cart.objects.filter(user=self.user).exists())
+    
+    def test_merge_query_count_does_not_grow_with_items(self):
+        """カートの商品数が増えてもマージのクエリ数が増えないことを確認"""
+        def merge(line_count):
+            Cart.objects.filter(user=self.user).delete()
+            guest_cart = Cart.objects.create(session_key=self.request.session.session_key)
+            user_cart = Cart.objects.create(user=self.user)
+            for product in self.products[:line_count]:
+                CartItem.objects.create(cart=guest_cart, product=product, quantity=1)
+            for product in self.products[:line_count:2]:
+                CartItem.objects.create(cart=user_cart, product=product, quantity=1)
+            with CaptureQueriesContext(connection) as queries:
+                CartService.merge_guest_cart_to_user(self.request, self.user)
+            return len(queries)
+        
+        self.guest_cart.delete()
+        self.assertEqual(merge(10), merge(2))
+
+
+class CartAddItemTest(TestCase):
+    """カートへの商品追加のテストケース"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        self.category = Category.objects.create(
+            name='電子機器',
+            slug='electronics'
+        )
+        self.product = Product.objects.create(
+            name='ノートPC',
+            slug='notebook-pc',
+            category=self.category,
+            description='高性能ノートパソコン',
+            price=Decimal('89800'),
+            stock=5
+        )
+        self.cart = Cart.objects.create(session_key='guest-session')
+    
+    def test_add_item_creates_and_increments(self):
+        """新しい商品は作成し、既にある商品は数量を加算することを確認"""
+        CartService.add_item(self.cart, self.product, 2)
+        CartService.add_item(self.cart, self.product, 3)
+        
+        self.assertEqual(self.cart.items.get().quantity, 5)
+        self.assertEqual(self.cart.total_items, 5)
+    
+    def test_increment_is_single_update(self):
+        """既にある商品の追加は1回のUPDATE文で行うことを確認"""
+        CartService.add_item(self.cart, self.product)
+        
+        with self.assertNumQueries(1):
+            CartService.add_item(self.cart, self.product)
+        self.assertEqual(self.cart.items.get().quantity, 2)
+    
+    def test_add_item_over_stock_raises(self):
+        """在庫数を超える場合はInsufficientStockErrorになり数量が変わらないことを確認"""
+        CartService.add_item(self.cart, self.product, 4)
+        
+        with self.assertRaises(InsufficientStockError) as context:
+            CartService.add_item(self.cart, self.product, 2)
+        
+        self.assertEqual(context.exception.shortages[0].requested, 6)
+        self.assertEqual(self.cart.items.get().quantity, 4)
+        
+        with self.assertRaises(InsufficientStockError):
+            CartService.add_item(Cart.objects.create(session_key='other'), self.product, 6)
+    
+    def test_create_checks_current_stock(self):
+        """カートにない商品の作成でも、取得済みの商品ではなく現在の在庫数で判定することを確認"""
+        Product.objects.filter(pk=self.product.pk).update(stock=1)
+        
+        with self.assertRaises(InsufficientStockError) as context:
+            CartService.add_item(self.cart, self.product, 2)
+        
+        self.assertEqual(context.exception.shortages[0].available, 1)
+        self.assertFalse(self.cart.items.exists())
+        
+        CartService.add_item(self.cart, self.product, 1)
+        self.assertEqual(self.cart.items.get().quantity, 1)
+    
+    def test_add_item_invalid_quantity(self):
+        """数量が1未満の場合はエラーになることを確認"""
+        with self.assertRaises(ValueError):
+            CartService.add_item(self.cart, self.product, 0)
+
+
+class CartApplyOperationsTest(TestCase):
+    """カートへの複数操作の一括適用のテストケース"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        self.category = Category.objects.create(
+            name='電子機器',
+            slug='electronics'
+        )
+        self.products = [
+            Product.objects.create(
+                name=f'商品{i}',
+                slug=f'product-{i}',
+                category=self.category,
+                description='説明',
+                price=Decimal('1000'),
+                stock=5
+            )
+            for i in range(3)
+        ]
+        self.cart = Cart.objects.create(session_key='guest-session')
+        self.item = CartItem.objects.create(cart=self.cart, product=self.products[0], quantity=1)
+        self.removed = CartItem.objects.create(cart=self.cart, product=self.products[1], quantity=1)
+    
+    def test_apply_operations(self):
+        """追加・数量変更・削除をまとめて適用できることを確認"""
+        CartService.apply_operations(self.cart, [
+            {'op': 'add', 'product_id': self.products[2].id, 'quantity': 2},
+            {'op': 'update', 'item_id': self.item.id, 'quantity': 4},
+            {'op': 'remove', 'item_id': self.removed.id},
+        ])
+        
+        quantities = dict(self.cart.items.values_list('product_id', 'quantity'))
+        self.assertEqual(quantities, {self.products[0].id: 4, self.products[2].id: 2})
+        self.assertEqual(self.cart.total_items, 6)
+    
+    def test_update_to_zero_removes_item(self):
+        """数量0への変更は削除として扱うことを確認"""
+        CartService.apply_operations(self.cart, [
+            {'op': 'update', 'item_id': self.item.id, 'quantity': 0},
+        ])
+        self.assertFalse(CartItem.objects.filter(pk=self.item.pk).exists())
+    
+    def test_failed_operation_rolls_back_all(self):
+        """1件でも失敗した場合はすべての操作が取り消されることを確認"""
+        with self.assertRaises(CartOperationError) as context:
+            CartService.apply_operations(self.cart, [
+                {'op': 'remove', 'item_id': self.removed.id},
+                {'op': 'update', 'item_id': self.item.id, 'quantity': 6},
+            ])
+        
+        self.assertEqual(context.exception.index, 1)
+        self.assertEqual(context.exception.code, 'insufficient_stock')
+        self.assertTrue(CartItem.objects.filter(pk=self.removed.pk).exists())
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantity, 1)
+    
+    def test_other_cart_item_is_not_found(self):
+        """他のカートの商品は操作できないことを確認"""
+        other_cart = Cart.objects.create(session_key='other-session')
+        other_item = CartItem.objects.create(cart=other_cart, product=self.products[0], quantity=1)
+        
+        for operation in ({'op': 'update', 'item_id': other_item.id, 'quantity': 2},
+                          {'op': 'remove', 'item_id': other_item.id}):
+            with self.assertRaises(CartOperationError) as context:
+                CartService.apply_operations(self.cart, [operation])
+            self.assertEqual(context.exception.code, 'not_found')
+        
+        other_item.refresh_from_db()
+        self.assertEqual(other_item.quantity, 1)
+    
+    def test_inactive_product_is_not_found(self):
+        """販売中でない商品は追加・数量変更できず、削除はできることを確認"""
+        Product.objects.filter(pk__in=[self.products[0].pk, self.products[2].pk]).update(is_active=False)
+        
+        for operation in ({'op': 'add', 'product_id': self.products[2].id, 'quantity': 1},
+                          {'op': 'update', 'item_id': self.item.id, 'quantity': 2}):
+            with self.assertRaises(CartOperationError) as context:
+                CartService.apply_operations(self.cart, [operation])
+            self.assertEqual(context.exception.code, 'not_found')
+        
+        CartService.apply_operations(self.cart, [{'op': 'remove', 'item_id': self.item.id}])
+        self.assertFalse(CartItem.objects.filter(pk=self.item.pk).exists())
+
+
+@override_settings(CART_GUEST_STORAGE='session', SESSION_ENGINE='django.contrib.sessions.backends.cache')
+class SessionCartStorageTest(TestCase):
+    """セッションに保存するゲストカートのテストケース"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.category = Category.objects.create(
+            name='電子機器',
+            slug='electronics'
+        )
+        self.products = [
+            Product.objects.create(
+                name=f'商品{i}',
+                slug=f'product-{i}',
+                category=self.category,
+                description='説明',
+                price=Decimal('1000'),
+                stock=5
+            )
+            for i in range(10)
+        ]
+        self.request = RequestFactory().get('/')
+        self.request.user = AnonymousUser()
+        SessionMiddleware(lambda x: None).process_request(self.request)
+        self.request.session.save()
+    
+    def test_guest_cart_does_not_write_database(self):
+        """ゲストカートの作成・追加でカートの行が作成されないことを確認"""
+        cart = CartService.get_or_create_cart(self.request)
+        CartService.add_item(cart, self.products[0], 2)
+        CartService.add_item(cart, self.products[0], 1)
+        CartService.add_item(cart, self.products[1])
+        
+        self.assertFalse(Cart.objects.exists())
+        self.assertEqual(self.request.session['shop_cart'], {
+            str(self.products[0].pk): 3, str(self.products[1].pk): 1
+        })
+        self.assertEqual(cart.total_items, 4)
+        self.assertEqual(cart.total_price, Decimal('4000'))
+        self.assertEqual(CartService.get_item_count(self.request), 4)
+    
+    def test_add_over_stock_raises(self):
+        """在庫数を超える場合はInsufficientStockErrorになることを確認"""
+        cart = CartService.get_or_create_cart(self.request)
+        CartService.add_item(cart, self.products[0], 5)
+        
+        with self.assertRaises(InsufficientStockError):
+            CartService.add_item(cart, self.products[0], 1)
+        self.assertEqual(cart.lines, {self.products[0].pk: 5})
+    
+    def test_apply_operations(self):
+        """商品IDをカート商品のIDとして操作でき、失敗時は何も変更しないことを確認"""
+        cart = CartService.get_or_create_cart(self.request)
+        CartService.add_item(cart, self.products[0])
+        CartService.add_item(cart, self.products[1])
+        
+        with self.assertRaises(CartOperationError) as context:
+            CartService.apply_operations(cart, [
+                {'op': 'remove', 'item_id': self.products[0].pk},
+                {'op': 'update', 'item_id': self.products[1].pk, 'quantity': 6},
+            ])
+        self.assertEqual(context.exception.code, 'insufficient_stock')
+        self.assertEqual(cart.lines, {self.products[0].pk: 1, self.products[1].pk: 1})
+        
+        CartService.apply_operations(cart, [
+            {'op': 'remove', 'item_id': self.products[0].pk},
+            {'op': 'update', 'item_id': self.products[1].pk, 'quantity': 3},
+            {'op': 'add', 'product_id': self.products[2].pk, 'quantity': 2},
+        ])
+        self.assertEqual(cart.lines, {self.products[1].pk: 3, self.products[2].pk: 2})
+        self.assertEqual([item.id for item in cart.items.all()], [self.products[1].pk, self.products[2].pk])
+    
+    def test_apply_operations_inactive_product_is_not_found(self):
+        """販売中でない商品は追加・数量変更できず、削除はできることを確認"""
+        cart = CartService.get_or_create_cart(self.request)
+        CartService.add_item(cart, self.products[0])
+        Product.objects.filter(pk__in=[self.products[0].pk, self.products[1].pk]).update(is_active=False)
+        
+        for operation in ({'op': 'add', 'product_id': self.products[1].pk, 'quantity': 1},
+                          {'op': 'update', 'item_id': self.products[0].pk, 'quantity': 2}):
+            with self.assertRaises(CartOperationError) as context:
+                CartService.apply_operations(cart, [operation])
+            self.assertEqual(context.exception.code, 'not_found')
+        self.assertEqual(cart.lines, {self.products[0].pk: 1})
+        
+        CartService.apply_operations(cart, [{'op': 'remove', 'item_id': self.products[0].pk}])
+        self.assertEqual(cart.lines, {})
+    
+    def test_merge_saves_session_cart(self):
+        """ログイン時にセッションのカートがユーザーのカートに保存されることを確認"""
+        user_cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=user_cart, product=self.products[0], quantity=1)
+        cart = CartService.get_or_create_cart(self.request)
+        CartService.add_item(cart, self.products[0], 2)
+        CartService.add_item(cart, self.products[1], 3)
+        
+        merged = CartService.merge_guest_cart_to_user(self.request, self.user)
+        
+        self.assertEqual(merged.pk, user_cart.pk)
+        quantities = dict(user_cart.items.values_list('product_id', 'quantity'))
+        self.assertEqual(quantities, {self.products[0].pk: 3, self.products[1].pk: 3})
+        self.assertNotIn('shop_cart', self.request.session)
+        self.assertEqual(Cart.objects.count(), 1)
+    
+    def test_merge_query_count_does_not_grow_with_items(self):
+        """カートの商品数が増えてもマージのクエリ数が増えないことを確認"""
+        def merge(line_count):
+            Cart.objects.filter(user=self.user).delete()
+            user_cart = Cart.objects.create(user=self.user)
+            for product in self.products[:line_count:2]:
+                CartItem.objects.create(cart=user_cart, product=product, quantity=1)
+            self.request.session['shop_cart'] = {str(product.pk): 1 for product in self.products[:line_count]}
+            with CaptureQueriesContext(connection) as queries:
+                CartService.merge_guest_cart_to_user(self.request, self.user)
+            return len(queries)
+        
+        self.assertEqual(merge(10), merge(2))
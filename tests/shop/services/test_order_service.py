@@ -2,8 +2,12 @@
 Test Order Service
 注文サービスのテスト
 """
+from datetime import date, datetime
 from decimal import Decimal
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
 from shop.models import Category, Product, Cart, CartItem, Order, OrderItem
 from shop.services import OrderService
@@ -114,6 +118,46 @@ class OrderServiceTest(TestCase):
         
         self.assertEqual(order.total_amount, expected_total)
     
+    def test_create_order_query_count_does_not_grow_with_items(self):
+        """カート商品数が増えても注文作成のクエリ数が増えないことを確認"""
+        shipping_data = {
+            'shipping_name': 'テスト',
+            'shipping_postal_code': '111-1111',
+            'shipping_address': 'テスト住所',
+            'shipping_phone': '090-0000-0000'
+        }
+        
+        def count_queries(products):
+            cart = Cart.objects.create(user=self.user)
+            for product in products:
+                CartItem.objects.create(cart=cart, product=product, quantity=1)
+            cart = Cart.objects.get(pk=cart.pk)
+            with CaptureQueriesContext(connection) as queries:
+                OrderService.create_order_from_cart(
+                    user=self.user,
+                    cart=cart,
+                    shipping_data=shipping_data
+                )
+            cart.delete()
+            return len(queries)
+        
+        extra_products = [
+            Product.objects.create(
+                name=f'商品{i}',
+                slug=f'product-{i}',
+                category=self.category,
+                description='説明',
+                price=Decimal('1000'),
+                stock=10
+            )
+            for i in range(5)
+        ]
+        
+        self.assertEqual(
+            count_queries([self.product1]),
+            count_queries([self.product1, self.product2] + extra_products)
+        )
+    
     def test_cancel_order(self):
         """注文キャンセル機能をテスト"""
         # 注文を作成
@@ -210,3 +254,183 @@ class OrderServiceTest(TestCase):
         
         with self.assertRaises(ValueError):
             OrderService.update_order_status(order, 'invalid_status')
+
+
+class OrderExportTest(TestCase):
+    """注文エクスポートのテストケース"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.category = Category.objects.create(
+            name='電子機器',
+            slug='electronics'
+        )
+        self.product = Product.objects.create(
+            name='ノートPC',
+            slug='notebook-pc',
+            category=self.category,
+            description='高性能ノートパソコン',
+            price=Decimal('89800'),
+            stock=10
+        )
+        self.october = self.create_order('delivered', datetime(2025, 10, 31, 23, 30))
+        self.november = self.create_order('pending', datetime(2025, 11, 1, 0, 30))
+    
+    def create_order(self, status, created_at):
+        order = Order.objects.create(
+            user=self.user,
+            status=status,
+            total_amount=Decimal('179600'),
+            shipping_name='山田太郎',
+            shipping_postal_code='123-4567',
+            shipping_address='東京都渋谷区テスト1-2-3',
+            shipping_phone='090-1234-5678'
+        )
+        # created_at は auto_now_add のため update() で設定する（現地時間）
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.make_aware(created_at))
+        OrderItem.objects.create(order=order, product=self.product, quantity=2, price=self.product.price)
+        return order
+    
+    def test_filter_by_local_date_range(self):
+        """期間指定は現地時間の日付で両端を含むことを確認"""
+        orders = OrderService.filter_orders_for_export(date_from=date(2025, 10, 1), date_to=date(2025, 10, 31))
+        self.assertEqual(list(orders), [self.october])
+        
+        orders = OrderService.filter_orders_for_export(date_from=date(2025, 11, 1))
+        self.assertEqual(list(orders), [self.november])
+    
+    def test_filter_by_status(self):
+        """ステータスで絞り込めることを確認"""
+        orders = OrderService.filter_orders_for_export(statuses=['pending', 'shipped'])
+        self.assertEqual(list(orders), [self.november])
+    
+    def test_export_order_lines(self):
+        """注文商品単位のエクスポートに注文情報と小計が含まれることを確認"""
+        orders = OrderService.filter_orders_for_export(statuses=['delivered'])
+        records = list(OrderService.export_order_lines(orders))
+        
+        self.assertEqual(len(records), 1)
+        record = records[0]
+        self.assertEqual(record['order_id'], self.october.id)
+        self.assertEqual(record['username'], 'testuser')
+        self.assertEqual(record['product_name'], 'ノートPC')
+        self.assertEqual(record['subtotal'], Decimal('179600'))
+        self.assertEqual(record['created_at'].date(), date(2025, 10, 31))
+    
+    def test_export_query_count_does_not_grow_with_orders(self):
+        """エクスポートのクエリ数が注文数に比例しないことを確認"""
+        for day in range(1, 11):
+            self.create_order('delivered', datetime(2025, 9, day, 12, 0))
+        
+        with self.assertNumQueries(1):
+            records = list(OrderService.export_order_lines(Order.objects.all()))
+        self.assertEqual(len(records), 12)
+        
+        with self.assertNumQueries(1):
+            records = list(OrderService.export_orders(Order.objects.all()))
+        self.assertEqual(len(records), 12)
+
+
+class OrderBulkStatusTest(TestCase):
+    """注文ステータスの一括変更のテストケース"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.category = Category.objects.create(
+            name='電子機器',
+            slug='electronics'
+        )
+        self.product1 = Product.objects.create(
+            name='ノートPC',
+            slug='notebook-pc',
+            category=self.category,
+            description='高性能ノートパソコン',
+            price=Decimal('89800'),
+            stock=10
+        )
+        self.product2 = Product.objects.create(
+            name='マウス',
+            slug='mouse',
+            category=self.category,
+            description='ワイヤレスマウス',
+            price=Decimal('2980'),
+            stock=50
+        )
+    
+    def create_order(self, status='pending'):
+        order = Order.objects.create(
+            user=self.user,
+            status=status,
+            total_amount=Decimal('95760'),
+            shipping_name='山田太郎',
+            shipping_postal_code='123-4567',
+            shipping_address='東京都渋谷区テスト1-2-3',
+            shipping_phone='090-1234-5678'
+        )
+        OrderItem.objects.create(order=order, product=self.product1, quantity=1, price=self.product1.price)
+        OrderItem.objects.create(order=order, product=self.product2, quantity=2, price=self.product2.price)
+        return order
+    
+    def test_bulk_update_status(self):
+        """許可された遷移の注文だけが変更されることを確認"""
+        pending = self.create_order('pending')
+        processing = self.create_order('processing')
+        delivered = self.create_order('delivered')
+        
+        with CaptureQueriesContext(connection) as queries:
+            result = OrderService.bulk_update_status(Order.objects.all(), 'shipped')
+        
+        self.assertEqual(result, (2, 1))
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('UPDATE')]), 1)
+        statuses = dict(Order.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[pending.pk], 'shipped')
+        self.assertEqual(statuses[processing.pk], 'shipped')
+        self.assertEqual(statuses[delivered.pk], 'delivered')
+    
+    def test_bulk_update_status_with_invalid_status(self):
+        """一括変更できないステータスはエラーになることを確認"""
+        self.create_order()
+        with self.assertRaises(ValueError):
+            OrderService.bulk_update_status(Order.objects.all(), 'pending')
+    
+    def test_bulk_cancel_restocks_grouped_by_product(self):
+        """まとめてキャンセルし、商品ごとに合計した数量を在庫に戻すことを確認"""
+        orders = [self.create_order('pending') for _ in range(3)]
+        self.create_order('delivered')
+        
+        with CaptureQueriesContext(connection) as queries:
+            result = OrderService.bulk_cancel(Order.objects.all())
+        
+        self.assertEqual(result, (3, 1))
+        self.assertEqual(Order.objects.filter(status='cancelled').count(), 3)
+        self.product1.refresh_from_db()
+        self.product2.refresh_from_db()
+        self.assertEqual(self.product1.stock, 13)
+        self.assertEqual(self.product2.stock, 56)
+        product_updates = [query for query in queries if query['sql'].startswith('UPDATE "shop_product"')]
+        self.assertEqual(len(product_updates), 1)
+        
+        # 既にキャンセル済みの注文は二重に在庫を戻さない
+        result = OrderService.bulk_cancel(Order.objects.filter(pk__in=[order.pk for order in orders]))
+        self.assertEqual(result, (0, 3))
+        self.product1.refresh_from_db()
+        self.assertEqual(self.product1.stock, 13)
+    
+    def test_bulk_cancel_skips_deleted_products(self):
+        """削除済みの商品を含む注文もキャンセルできることを確認"""
+        order = self.create_order()
+        self.product2.delete()
+        
+        result = OrderService.bulk_update_status(Order.objects.filter(pk=order.pk), 'cancelled')
+        
+        self.assertEqual(result.updated, 1)
+        self.product1.refresh_from_db()
+        self.assertEqual(self.product1.stock, 11)
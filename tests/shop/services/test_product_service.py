@@ -0,0 +1,105 @@
+"""
+Test Product Service
+商品サービス（一括インポート・エクスポート）のテスト
+"""
+from decimal import Decimal
+from django.test import TestCase
+from shop.models import Category, Product
+from shop.search import get_search_backend
+from shop.services import ProductService
+
+
+class ProductServiceImportTest(TestCase):
+    """商品の一括インポートのテストケース"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        self.category = Category.objects.create(
+            name='電子機器',
+            slug='electronics'
+        )
+        self.existing = Product.objects.create(
+            name='ノートPC',
+            slug='notebook-pc',
+            category=self.category,
+            description='高性能ノートパソコン',
+            price=Decimal('89800'),
+            stock=10
+        )
+    
+    def record(self, slug, **overrides):
+        record = {
+            'slug': slug,
+            'name': f'商品 {slug}',
+            'category': 'electronics',
+            'description': '説明',
+            'price': '1000',
+            'stock': '5',
+            'is_active': 'true',
+        }
+        record.update(overrides)
+        return record
+    
+    def test_creates_and_updates_by_slug(self):
+        """新しいスラッグは作成、既存のスラッグは更新されることを確認"""
+        created_at = self.existing.created_at
+        report = ProductService.import_products([
+            self.record('notebook-pc', name='ノートPC 改', price='79800'),
+            self.record('tablet'),
+        ])
+        
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(report['updated'], 1)
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, 'ノートPC 改')
+        self.assertEqual(self.existing.price, Decimal('79800'))
+        self.assertEqual(self.existing.created_at, created_at)
+        self.assertTrue(Product.objects.filter(slug='tablet', stock=5, is_active=True).exists())
+    
+    def test_batches_and_query_count(self):
+        """バッチ単位で書き込み、クエリ数が行数に比例しないことを確認"""
+        records = [self.record(f'item-{i}') for i in range(50)]
+        with self.assertNumQueries(1 + 5 * 7):
+            # カテゴリ1回 + バッチごとに（SAVEPOINT/件数/UPSERT/索引取得/索引削除/索引登録/RELEASE）
+            report = ProductService.import_products(records, batch_size=10)
+        
+        self.assertEqual(report['batches'], 5)
+        self.assertEqual(Product.objects.count(), 51)
+    
+    def test_invalid_rows_are_skipped(self):
+        """不正な行はスキップされ、エラーが報告されることを確認"""
+        report = ProductService.import_products([
+            self.record('ok'),
+            self.record('unknown-category', category='nothing'),
+            self.record('bad-price', price='abc'),
+            self.record('bad slug!'),
+        ])
+        
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(report['skipped'], 3)
+        self.assertEqual(len(report['errors']), 3)
+        self.assertTrue(report['errors'][0].startswith('2件目'))
+    
+    def test_duplicate_slug_in_batch_uses_last_row(self):
+        """同じバッチ内で重複したスラッグは後の行が採用されることを確認"""
+        ProductService.import_products([
+            self.record('tablet', stock='1'),
+            self.record('tablet', stock='2'),
+        ])
+        self.assertEqual(Product.objects.get(slug='tablet').stock, 2)
+    
+    def test_imported_products_are_searchable(self):
+        """インポートした商品が検索索引に登録されることを確認"""
+        ProductService.import_products([self.record('earphone', name='ワイヤレスイヤホン')])
+        results = get_search_backend().search(Product.objects.all(), 'イヤホン')
+        self.assertEqual([product.slug for product in results], ['earphone'])
+    
+    def test_export_round_trip(self):
+        """エクスポートした内容をそのままインポートできることを確認"""
+        records = list(ProductService.export_records())
+        self.assertEqual(records[0]['slug'], 'notebook-pc')
+        self.assertEqual(records[0]['category'], 'electronics')
+        
+        report = ProductService.import_products(records)
+        self.assertEqual(report['updated'], 1)
+        self.assertEqual(report['skipped'], 0)
@@ -0,0 +1,115 @@
+"""
+Test Stock Service
+在庫サービスのテスト
+"""
+from decimal import Decimal
+from django.test import TestCase
+from django.contrib.auth.models import User
+from shop.models import Category, Product, Cart, CartItem, Order
+from shop.services import StockService, OrderService, InsufficientStockError
+
+
+class StockServiceTest(TestCase):
+    """在庫サービスのテストケース"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        self.category = Category.objects.create(
+            name='電子機器',
+            slug='electronics'
+        )
+        self.product1 = Product.objects.create(
+            name='ノートPC',
+            slug='notebook-pc',
+            category=self.category,
+            description='高性能ノートパソコン',
+            price=Decimal('89800'),
+            stock=5
+        )
+        self.product2 = Product.objects.create(
+            name='マウス',
+            slug='mouse',
+            category=self.category,
+            description='ワイヤレスマウス',
+            price=Decimal('2980'),
+            stock=1
+        )
+    
+    def test_reserve_decrements_stock(self):
+        """在庫が足りる場合はまとめて減算されることを確認"""
+        StockService.reserve({self.product1.id: 5, self.product2.id: 1})
+        
+        self.product1.refresh_from_db()
+        self.product2.refresh_from_db()
+        self.assertEqual(self.product1.stock, 0)
+        self.assertEqual(self.product2.stock, 0)
+    
+    def test_reserve_with_insufficient_stock(self):
+        """在庫不足の場合は例外が発生し、どの在庫も変更されないことを確認"""
+        with self.assertRaises(InsufficientStockError) as cm:
+            StockService.reserve({self.product1.id: 2, self.product2.id: 3})
+        
+        shortages = cm.exception.shortages
+        self.assertEqual(len(shortages), 1)
+        self.assertEqual(shortages[0].product_id, self.product2.id)
+        self.assertEqual(shortages[0].product_name, 'マウス')
+        self.assertEqual(shortages[0].requested, 3)
+        self.assertEqual(shortages[0].available, 1)
+        
+        self.product1.refresh_from_db()
+        self.product2.refresh_from_db()
+        self.assertEqual(self.product1.stock, 5)
+        self.assertEqual(self.product2.stock, 1)
+    
+    def test_reserve_uses_conditional_update(self):
+        """在庫チェック後に在庫が減った場合でもマイナスにならないことを確認"""
+        original_load = StockService._load_stocks
+        
+        def stale_load(product_ids, lock=False):
+            # 読み取り後に他の注文が在庫を確保した状況を再現
+            stocks = original_load(product_ids, lock)
+            Product.objects.filter(id=self.product2.id).update(stock=0)
+            return stocks
+        
+        StockService._load_stocks = staticmethod(stale_load)
+        try:
+            with self.assertRaises(InsufficientStockError):
+                StockService.reserve({self.product1.id: 1, self.product2.id: 1})
+        finally:
+            StockService._load_stocks = staticmethod(original_load)
+        
+        self.product1.refresh_from_db()
+        self.assertEqual(self.product1.stock, 5)
+    
+    def test_release_increments_stock(self):
+        """在庫がまとめて戻されることを確認"""
+        StockService.release({self.product1.id: 2, self.product2.id: 3})
+        
+        self.product1.refresh_from_db()
+        self.product2.refresh_from_db()
+        self.assertEqual(self.product1.stock, 7)
+        self.assertEqual(self.product2.stock, 4)
+    
+    def test_create_order_with_insufficient_stock(self):
+        """在庫不足の場合は注文が作成されないことを確認"""
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.create(cart=cart, product=self.product1, quantity=1)
+        CartItem.objects.create(cart=cart, product=self.product2, quantity=2)
+        
+        with self.assertRaises(InsufficientStockError):
+            OrderService.create_order_from_cart(
+                user=user,
+                cart=cart,
+                shipping_data={
+                    'shipping_name': 'テスト',
+                    'shipping_postal_code': '111-1111',
+                    'shipping_address': 'テスト住所',
+                    'shipping_phone': '090-0000-0000'
+                }
+            )
+        
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(cart.items.count(), 2)
+        self.product1.refresh_from_db()
+        self.assertEqual(self.product1.stock, 5)
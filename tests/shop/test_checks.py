@@ -0,0 +1,26 @@
+"""
+Test Checks
+ショップのシステムチェックのテスト
+"""
+from django.test import SimpleTestCase, override_settings
+from shop.checks import check_cart_guest_storage
+
+
+class CartGuestStorageCheckTest(SimpleTestCase):
+    """CART_GUEST_STORAGE のシステムチェックのテストケース"""
+    
+    @override_settings(CART_GUEST_STORAGE='session', SESSION_ENGINE='config.session_store')
+    def test_session_storage_with_database_sessions(self):
+        """データベースのセッションとの組み合わせはエラーになることを確認"""
+        errors = check_cart_guest_storage(None)
+        self.assertEqual([error.id for error in errors], ['shop.E001'])
+    
+    @override_settings(CART_GUEST_STORAGE='session', SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_session_storage_with_cookie_sessions(self):
+        """クッキーのセッションとの組み合わせはエラーにならないことを確認"""
+        self.assertEqual(check_cart_guest_storage(None), [])
+    
+    @override_settings(CART_GUEST_STORAGE='db')
+    def test_db_storage(self):
+        """'db' の場合はセッションの種類を問わないことを確認"""
+        self.assertEqual(check_cart_guest_storage(None), [])
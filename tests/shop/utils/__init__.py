@@ -0,0 +1,3 @@
+"""
+Utils Tests Package
+"""
@@ -0,0 +1,78 @@
+"""
+Test Paginator
+ページネーターのテスト
+"""
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from shop.models import Category, Product
+from shop.utils.paginator import EstimatedCountPaginator
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    """推定件数ページネーターのテストケース"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        cache.clear()
+        self.category = Category.objects.create(
+            name='電子機器',
+            slug='electronics'
+        )
+        Product.objects.bulk_create([
+            Product(
+                name=f'商品{i}',
+                slug=f'product-{i}',
+                category=self.category,
+                description='説明',
+                price=Decimal('1000'),
+                stock=10
+            )
+            for i in range(8)
+        ])
+        self.queryset = Product.objects.order_by('id')
+    
+    def test_exact_count_below_threshold(self):
+        """threshold 件以下なら正確な件数を返しキャッシュしないことを確認"""
+        paginator = EstimatedCountPaginator(self.queryset, 3, threshold=10, cache_key='count', cache_exact=False)
+        
+        self.assertEqual(paginator.count, 8)
+        self.assertFalse(paginator.estimated)
+        self.assertIsNone(cache.get('count'))
+    
+    def test_count_is_capped(self):
+        """件数は LIMIT 付きで数えることを確認"""
+        paginator = EstimatedCountPaginator(self.queryset, 3, threshold=10)
+        with CaptureQueriesContext(connection) as queries:
+            paginator.count
+        self.assertIn('LIMIT 11', queries[0]['sql'])
+    
+    def test_uses_estimate_above_threshold(self):
+        """threshold 件を超える場合は推定件数を使いキャッシュすることを確認"""
+        paginator = EstimatedCountPaginator(self.queryset, 3, threshold=5, cache_key='count', cache_exact=False)
+        with mock.patch.object(EstimatedCountPaginator, 'estimate_count', return_value=1000):
+            self.assertEqual(paginator.count, 1000)
+        
+        self.assertTrue(paginator.estimated)
+        self.assertEqual(paginator.num_pages, 334)
+        self.assertEqual(cache.get('count'), 1000)
+        
+        with self.assertNumQueries(0):
+            self.assertEqual(EstimatedCountPaginator(self.queryset, 3, threshold=5, cache_key='count').count, 1000)
+    
+    def test_falls_back_to_exact_count_without_estimate(self):
+        """推定できないデータベースでは正確な件数を数えることを確認"""
+        paginator = EstimatedCountPaginator(self.queryset, 3, threshold=5)
+        
+        self.assertIsNone(paginator.estimate_count())
+        self.assertEqual(paginator.count, 8)
+        self.assertEqual(len(paginator.page(3).object_list), 2)
+    
+    def test_estimate_is_not_below_counted_rows(self):
+        """推定件数が数えた件数より少ない場合は数えた件数を使うことを確認"""
+        paginator = EstimatedCountPaginator(self.queryset, 3, threshold=5)
+        with mock.patch.object(EstimatedCountPaginator, 'estimate_count', return_value=2):
+            self.assertEqual(paginator.count, 6)
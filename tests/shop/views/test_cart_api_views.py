@@ -0,0 +1,157 @@
+"""
+Test Cart API Views
+カートAPIのテスト
+"""
+import json
+from decimal import Decimal
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from shop.models import Category, Product, Cart, CartItem
+
+
+class CartApiViewTest(TestCase):
+    """カートAPIのテストケース"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        self.client = Client()
+        self.category = Category.objects.create(
+            name='電子機器',
+            slug='electronics'
+        )
+        self.products = [
+            Product.objects.create(
+                name=f'商品{i}',
+                slug=f'product-{i}',
+                category=self.category,
+                description='説明',
+                price=Decimal('1000'),
+                stock=5
+            )
+            for i in range(3)
+        ]
+        session = self.client.session
+        session.save()
+        self.cart = Cart.objects.create(session_key=session.session_key)
+        self.item = CartItem.objects.create(cart=self.cart, product=self.products[0], quantity=1)
+        self.url = reverse('shop:cart_api')
+    
+    def post_json(self, url, data, method='post'):
+        """JSONボディでリクエストを送信"""
+        return getattr(self.client, method)(url, json.dumps(data), content_type='application/json')
+    
+    def test_get_cart(self):
+        """カートの内容と合計が返ることを確認"""
+        response = self.client.get(self.url)
+        
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['id'], self.cart.id)
+        self.assertEqual(data['items'][0]['product']['name'], '商品0')
+        self.assertEqual(data['total_items'], 1)
+        self.assertEqual(Decimal(data['total_price']), Decimal('1000'))
+    
+    def test_get_without_cart_does_not_create_cart(self):
+        """カートがない場合は作成せず空のカートを返すことを確認"""
+        response = Client().get(self.url)
+        
+        self.assertEqual(response.json(), {
+            'id': None, 'items': [], 'total_price': '0', 'total_items': 0, 'updated_at': None
+        })
+        self.assertEqual(Cart.objects.count(), 1)
+    
+    def test_batch_operations(self):
+        """追加・数量変更・削除を1回のリクエストで適用できることを確認"""
+        removed = CartItem.objects.create(cart=self.cart, product=self.products[1], quantity=1)
+        
+        response = self.post_json(self.url, {'operations': [
+            {'op': 'add', 'product_id': self.products[2].id, 'quantity': 2},
+            {'op': 'update', 'item_id': self.item.id, 'quantity': 3},
+            {'op': 'remove', 'item_id': removed.id},
+        ]})
+        
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['total_items'], 5)
+        self.assertEqual(Decimal(data['total_price']), Decimal('5000'))
+        self.assertEqual(
+            {item['product']['id']: item['quantity'] for item in data['items']},
+            {self.products[0].id: 3, self.products[2].id: 2}
+        )
+    
+    def test_insufficient_stock_rolls_back(self):
+        """在庫不足の操作があれば400になり、他の操作も取り消されることを確認"""
+        response = self.post_json(self.url, {'operations': [
+            {'op': 'add', 'product_id': self.products[1].id, 'quantity': 1},
+            {'op': 'update', 'item_id': self.item.id, 'quantity': 6},
+        ]})
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'insufficient_stock')
+        self.assertEqual(response.json()['details'], {'operation': 1})
+        self.assertEqual(list(self.cart.items.values_list('product_id', 'quantity')), [(self.products[0].id, 1)])
+    
+    def test_other_cart_item_returns_404(self):
+        """他のカートの商品を操作すると404になることを確認"""
+        other_item = CartItem.objects.create(
+            cart=Cart.objects.create(session_key='other-session'), product=self.products[0], quantity=1
+        )
+        
+        response = self.client.delete(reverse('shop:cart_item_api', kwargs={'item_id': other_item.id}))
+        
+        self.assertEqual(response.status_code, 404)
+        self.assertTrue(CartItem.objects.filter(pk=other_item.pk).exists())
+    
+    def test_inactive_product_returns_404(self):
+        """販売中でない商品の追加は404になることを確認"""
+        self.products[1].is_active = False
+        self.products[1].save()
+        
+        response = self.post_json(self.url, {'operations': [
+            {'op': 'add', 'product_id': self.products[1].id, 'quantity': 1},
+        ]})
+        
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()['error'], 'not_found')
+        self.assertFalse(self.cart.items.filter(product=self.products[1]).exists())
+    
+    def test_invalid_payload_returns_400(self):
+        """不正な入力は項目ごとのエラーと共に400になることを確認"""
+        response = self.post_json(self.url, {'operations': [
+            {'op': 'add', 'product_id': self.products[1].id},
+            {'op': 'update', 'quantity': 2},
+        ]})
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'validation_error')
+        self.assertIn('operations.1.item_id', response.json()['details'])
+        
+        response = self.client.post(self.url, 'not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+    
+    def test_single_item_endpoints(self):
+        """1件の追加・数量変更のエンドポイントを確認"""
+        response = self.post_json(reverse('shop:cart_items_api'), {'product_id': self.products[1].id})
+        self.assertEqual(response.json()['total_items'], 2)
+        
+        response = self.post_json(
+            reverse('shop:cart_item_api', kwargs={'item_id': self.item.id}), {'quantity': 4}, method='patch'
+        )
+        self.assertEqual(response.json()['total_items'], 5)
+    
+    def test_query_count_does_not_grow_with_items(self):
+        """カート商品数が増えても取得のクエリ数が増えないことを確認"""
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(self.url)
+        
+        CartItem.objects.bulk_create([
+            CartItem(cart=self.cart, product=product, quantity=1) for product in self.products[1:]
+        ])
+        
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(self.url)
+        
+        self.assertEqual(len(response.json()['items']), 3)
+        self.assertEqual(len(many), len(few))
@@ -3,9 +3,12 @@ Test Cart Views
 カートビューのテスト
 """
 from decimal import Decimal
-from django.test import TestCase, Client
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from shop.models import Category, Product, Cart, CartItem
 
 
@@ -50,6 +53,33 @@ class CartViewTest(TestCase):
         response = self.client.get(reverse('shop:cart'))
         self.assertEqual(response.context['cart'].id, cart.id)
         self.assertEqual(response.context['cart'].items.count(), 1)
+    
+    def test_cart_view_query_count_does_not_grow_with_items(self):
+        """カート商品数が増えてもクエリ数が増えないことを確認"""
+        session = self.client.session
+        session.save()
+        cart = Cart.objects.create(session_key=session.session_key)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=1)
+        
+        with CaptureQueriesContext(connection) as single:
+            self.client.get(reverse('shop:cart'))
+        
+        for i in range(5):
+            product = Product.objects.create(
+                name=f'追加商品{i}',
+                slug=f'extra-{i}',
+                category=self.category,
+                description='説明',
+                price=Decimal('1000'),
+                stock=10
+            )
+            CartItem.objects.create(cart=cart, product=product, quantity=1)
+        
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(reverse('shop:cart'))
+        
+        self.assertEqual(response.context['cart'].total_items, 6)
+        self.assertEqual(len(many), len(single))
 
 
 class AddToCartTest(TestCase):
@@ -116,6 +146,29 @@ class AddToCartTest(TestCase):
             {'product_id': 9999, 'quantity': 1}
         )
         self.assertEqual(response.status_code, 404)
+    
+    def test_add_to_cart_non_integer_product_id(self):
+        """整数でない商品IDは404になることを確認"""
+        response = self.client.post(reverse('shop:add_to_cart'), {'product_id': 'abc', 'quantity': 1})
+        self.assertEqual(response.status_code, 404)
+        
+        response = self.client.post(reverse('shop:add_to_cart'), {'quantity': 1})
+        self.assertEqual(response.status_code, 404)
+    
+    def test_add_to_cart_over_stock(self):
+        """在庫数を超える数量は追加されないことを確認"""
+        response = self.client.post(
+            reverse('shop:add_to_cart'),
+            {'product_id': self.product.id, 'quantity': 11}
+        )
+        
+        self.assertRedirects(response, reverse('shop:cart'))
+        self.assertFalse(CartItem.objects.exists())
+    
+    def test_add_to_cart_with_product_in_url(self):
+        """URLで商品を指定した場合は数量1で追加されることを確認"""
+        self.client.get(reverse('shop:add_to_cart', kwargs={'product_id': self.product.id}))
+        self.assertEqual(CartItem.objects.get().quantity, 1)
 
 
 class UpdateCartItemTest(TestCase):
@@ -212,3 +265,150 @@ class RemoveFromCartTest(TestCase):
         
         # カートアイテムが削除されていることを確認
         self.assertFalse(CartItem.objects.filter(id=self.cart_item.id).exists())
+
+
+class CartBadgeTest(TestCase):
+    """ナビバーのカート商品数バッジのテストケース"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        cache.clear()
+        self.client = Client()
+        self.category = Category.objects.create(
+            name='電子機器',
+            slug='electronics'
+        )
+        self.product = Product.objects.create(
+            name='ノートPC',
+            slug='notebook-pc',
+            category=self.category,
+            description='高性能ノートパソコン',
+            price=Decimal('89800'),
+            stock=10
+        )
+        
+        session = self.client.session
+        session.save()
+        self.cart = Cart.objects.create(session_key=session.session_key)
+        self.cart_item = CartItem.objects.create(
+            cart=self.cart,
+            product=self.product,
+            quantity=2
+        )
+    
+    def _cart_queries(self):
+        """商品一覧ページを表示し、カート関連のクエリを返す"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('shop:product_list'))
+        self.assertContains(response, '<span class="badge bg-danger">')
+        return [q['sql'] for q in queries if 'shop_cart' in q['sql']]
+    
+    def test_badge_does_not_query_cart_on_cache_hit(self):
+        """キャッシュヒット時はカートを参照しないことを確認"""
+        self.assertTrue(self._cart_queries())  # 初回はカウンタを作成
+        self.assertEqual(self._cart_queries(), [])
+    
+    def test_badge_counter_follows_cart_mutations(self):
+        """カート操作に合わせてカウンタが更新されることを確認"""
+        self._cart_queries()
+        
+        self.client.get(reverse('shop:add_to_cart', kwargs={'product_id': self.product.id}))
+        response = self.client.get(reverse('shop:product_list'))
+        self.assertEqual(response.context['cart_total_items'](), 3)
+        
+        self.client.post(
+            reverse('shop:update_cart_item', kwargs={'item_id': self.cart_item.id}),
+            {'quantity': 5}
+        )
+        response = self.client.get(reverse('shop:product_list'))
+        self.assertEqual(response.context['cart_total_items'](), 5)
+        
+        self.client.get(reverse('shop:remove_from_cart', kwargs={'item_id': self.cart_item.id}))
+        response = self.client.get(reverse('shop:product_list'))
+        self.assertEqual(response.context['cart_total_items'](), 0)
+
+
+@override_settings(CART_GUEST_STORAGE='session', SESSION_ENGINE='django.contrib.sessions.backends.cache')
+class SessionCartViewTest(TestCase):
+    """セッションに保存するゲストカートのビューのテストケース"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        self.client = Client()
+        self.category = Category.objects.create(
+            name='電子機器',
+            slug='electronics'
+        )
+        self.product = Product.objects.create(
+            name='ノートPC',
+            slug='notebook-pc',
+            category=self.category,
+            description='高性能ノートパソコン',
+            price=Decimal('89800'),
+            stock=10
+        )
+    
+    def test_guest_cart_flow_without_cart_rows(self):
+        """ゲストの追加・表示・数量変更・削除でカートの行が作成されないことを確認"""
+        self.client.post(reverse('shop:add_to_cart', kwargs={'product_id': self.product.id}), {'quantity': 2})
+        
+        response = self.client.get(reverse('shop:cart'))
+        self.assertContains(response, 'ノートPC')
+        self.assertEqual(response.context['cart'].total_items, 2)
+        
+        self.client.post(reverse('shop:update_cart_item', kwargs={'item_id': self.product.id}), {'quantity': 4})
+        self.assertEqual(self.client.session['shop_cart'], {str(self.product.id): 4})
+        
+        self.client.post(reverse('shop:remove_from_cart', kwargs={'item_id': self.product.id}))
+        self.assertNotIn('shop_cart', self.client.session)
+        self.assertFalse(Cart.objects.exists())
+        self.assertFalse(CartItem.objects.exists())
+    
+    def test_guest_cart_does_not_write_database(self):
+        """ゲストの商品追加・数量変更でデータベースに書き込まないことを確認"""
+        url = reverse('shop:add_to_cart', kwargs={'product_id': self.product.id})
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(url, {'quantity': 1})
+            self.client.post(url, {'quantity': 1})
+            self.client.post(reverse('shop:update_cart_item', kwargs={'item_id': self.product.id}), {'quantity': 3})
+        
+        writes = [query['sql'] for query in queries if not query['sql'].startswith('SELECT')]
+        self.assertEqual(writes, [])
+        self.assertEqual(self.client.session['shop_cart'], {str(self.product.id): 3})
+    
+    def test_badge_does_not_query(self):
+        """ナビバーの商品数はデータベースにアクセスせずにセッションから数えることを確認"""
+        self.client.post(reverse('shop:add_to_cart', kwargs={'product_id': self.product.id}), {'quantity': 2})
+        response = self.client.get(reverse('shop:product_list'))
+        
+        with CaptureQueriesContext(connection) as queries:
+            count = response.context['cart_total_items']()
+        self.assertEqual(count, 2)
+        self.assertEqual(len(queries), 0)
+    
+    def test_cart_page_prunes_deleted_products(self):
+        """削除された商品はカートページの表示時に取り除かれ、その後の商品数に含まれないことを確認"""
+        self.client.post(reverse('shop:add_to_cart', kwargs={'product_id': self.product.id}), {'quantity': 2})
+        self.product.delete()
+        
+        response = self.client.get(reverse('shop:product_list'))
+        self.assertIn('shop_cart', self.client.session)
+        
+        response = self.client.get(reverse('shop:cart'))
+        self.assertEqual(response.context['cart'].total_items, 0)
+        self.assertNotIn('shop_cart', self.client.session)
+        
+        response = self.client.get(reverse('shop:product_list'))
+        self.assertEqual(response.context['cart_total_items'](), 0)
+    
+    def test_update_missing_item_returns_404(self):
+        """カートにない商品の数量変更は404になることを確認"""
+        response = self.client.post(
+            reverse('shop:update_cart_item', kwargs={'item_id': self.product.id}), {'quantity': 1}
+        )
+        self.assertEqual(response.status_code, 404)
+    
+    def test_cart_page_does_not_create_session(self):
+        """カートページの表示だけではセッションが保存されないことを確認"""
+        self.client.get(reverse('shop:cart'))
+        self.assertNotIn('sessionid', self.client.cookies)
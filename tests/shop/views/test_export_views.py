@@ -0,0 +1,78 @@
+"""
+Test Export Views
+エクスポートビューのテスト
+"""
+from decimal import Decimal
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.contrib.auth.models import User
+from shop.models import Category, Product, Order, OrderItem
+
+
+class OrderExportViewTest(TestCase):
+    """注文エクスポートビューのテストケース"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.staff = User.objects.create_user(
+            username='staff',
+            password='testpass123',
+            is_staff=True
+        )
+        self.category = Category.objects.create(
+            name='電子機器',
+            slug='electronics'
+        )
+        self.product = Product.objects.create(
+            name='ノートPC',
+            slug='notebook-pc',
+            category=self.category,
+            description='高性能ノートパソコン',
+            price=Decimal('89800'),
+            stock=10
+        )
+        self.order = Order.objects.create(
+            user=self.user,
+            status='pending',
+            total_amount=Decimal('89800'),
+            shipping_name='山田太郎',
+            shipping_postal_code='123-4567',
+            shipping_address='東京都渋谷区テスト1-2-3',
+            shipping_phone='090-1234-5678'
+        )
+        OrderItem.objects.create(order=self.order, product=self.product, quantity=1, price=self.product.price)
+    
+    def test_requires_staff(self):
+        """スタッフ以外はエクスポートできないことを確認"""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(reverse('shop:order_export'))
+        self.assertEqual(response.status_code, 302)
+    
+    def test_streams_csv(self):
+        """条件に一致する注文商品がCSVで逐次出力されることを確認"""
+        self.client.login(username='staff', password='testpass123')
+        response = self.client.get(reverse('shop:order_export'), {
+            'status': 'pending',
+            'lines': '1',
+            'date_from': '2000-01-01',
+            'date_to': '2100-12-31',
+        })
+        
+        self.assertTrue(response.streaming)
+        self.assertIn('order_lines_20000101-21001231.csv', response['Content-Disposition'])
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        self.assertIn('notebook-pc,ノートPC,1,89800,89800', content)
+    
+    def test_invalid_parameters(self):
+        """不正な条件は400になることを確認"""
+        self.client.login(username='staff', password='testpass123')
+        response = self.client.get(reverse('shop:order_export'), {'date_from': '2025-10-31', 'date_to': '2025-10-01'})
+        self.assertEqual(response.status_code, 400)
+        
+        response = self.client.get(reverse('shop:order_export'), {'status': 'unknown'})
+        self.assertEqual(response.status_code, 400)
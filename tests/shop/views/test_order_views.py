@@ -3,7 +3,9 @@ Test Order Views
 注文ビューのテスト
 """
 from decimal import Decimal
-from django.test import TestCase, Client
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth.models import User
 from shop.models import Category, Product, Cart, CartItem, Order, OrderItem
@@ -85,6 +87,25 @@ class CheckoutViewTest(TestCase):
         
         # カートが空になっていることを確認
         self.assertEqual(cart.items.count(), 0)
+    
+    def test_checkout_with_insufficient_stock_redirects_to_cart(self):
+        """在庫不足の場合はカートにリダイレクトされ注文は作成されない"""
+        self.client.login(username='testuser', password='testpass123')
+        
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=11)
+        
+        response = self.client.post(reverse('shop:checkout'), {
+            'shipping_name': '山田太郎',
+            'shipping_postal_code': '123-4567',
+            'shipping_address': '東京都渋谷区テスト1-2-3',
+            'shipping_phone': '090-1234-5678'
+        })
+        
+        self.assertRedirects(response, reverse('shop:cart'))
+        self.assertFalse(Order.objects.exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 10)
 
 
 class OrderHistoryViewTest(TestCase):
@@ -247,3 +268,85 @@ class OrderDetailViewTest(TestCase):
             reverse('shop:order_detail', kwargs={'order_id': self.order.id})
         )
         self.assertEqual(response.status_code, 404)
+
+
+class OrderHistoryPerformanceTest(TestCase):
+    """注文履歴・注文詳細のクエリ数とページネーションのテストケース"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.category = Category.objects.create(
+            name='電子機器',
+            slug='electronics'
+        )
+        self.products = [
+            Product.objects.create(
+                name=f'商品{i}',
+                slug=f'product-{i}',
+                category=self.category,
+                description='説明',
+                price=Decimal('1000'),
+                stock=10
+            )
+            for i in range(3)
+        ]
+        self.orders = []
+        for i in range(25):
+            order = Order.objects.create(
+                user=self.user,
+                status='pending',
+                total_amount=Decimal('3000'),
+                shipping_name='テスト',
+                shipping_postal_code='111-1111',
+                shipping_address='テスト住所',
+                shipping_phone='090-0000-0000'
+            )
+            for product in self.products:
+                OrderItem.objects.create(order=order, product=product, quantity=1, price=product.price)
+            self.orders.append(order)
+        self.client.login(username='testuser', password='testpass123')
+    
+    @override_settings(ORDER_HISTORY_PAGE_SIZE=10)
+    def test_order_history_is_paginated(self):
+        """注文履歴がページ分割されることを確認"""
+        response = self.client.get(reverse('shop:order_history'))
+        self.assertEqual(len(response.context['orders']), 10)
+        self.assertTrue(response.context['is_paginated'])
+        
+        response = self.client.get(reverse('shop:order_history'), {'page': 3})
+        self.assertEqual(len(response.context['orders']), 5)
+    
+    def test_order_history_annotates_item_count(self):
+        """注文ごとの商品点数が集計されることを確認"""
+        response = self.client.get(reverse('shop:order_history'))
+        self.assertEqual(response.context['orders'][0].item_count, 3)
+        self.assertContains(response, '3点')
+    
+    def test_order_detail_query_count_does_not_grow_with_items(self):
+        """注文商品数が増えても注文詳細のクエリ数が増えないことを確認"""
+        order = self.orders[0]
+        url = reverse('shop:order_detail', kwargs={'order_id': order.id})
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        
+        for i in range(5):
+            product = Product.objects.create(
+                name=f'追加商品{i}',
+                slug=f'extra-{i}',
+                category=self.category,
+                description='説明',
+                price=Decimal('1000'),
+                stock=10
+            )
+            OrderItem.objects.create(order=order, product=product, quantity=1, price=product.price)
+        
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+        
+        self.assertContains(response, '追加商品4')
+        self.assertEqual(len(many), len(few))
@@ -3,7 +3,10 @@ Test Product Views
 商品ビューのテスト
 """
 from decimal import Decimal
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from shop.models import Category, Product
 
@@ -68,6 +71,169 @@ class ProductListViewTest(TestCase):
         self.assertEqual(response.context['categories'].count(), 2)
 
 
+class ProductListKeysetPaginationTest(TestCase):
+    """商品一覧のキーセットページングのテストケース"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        self.client = Client()
+        self.category = Category.objects.create(
+            name='電子機器',
+            slug='electronics'
+        )
+        for i in range(15):
+            Product.objects.create(
+                name=f'商品{i+1}',
+                slug=f'product-{i+1}',
+                category=self.category,
+                description=f'商品{i+1}の説明',
+                price=Decimal('1000'),
+                stock=10
+            )
+    
+    def test_walks_all_products_without_duplicates(self):
+        """カーソルをたどると全商品を重複なく取得できることを確認"""
+        url = reverse('shop:product_list')
+        response = self.client.get(url, {'cursor': ''})
+        first_page = [p.id for p in response.context['products']]
+        self.assertEqual(len(first_page), 12)
+        self.assertIsNotNone(response.context['next_cursor'])
+        
+        response = self.client.get(url, {'cursor': response.context['next_cursor']})
+        second_page = [p.id for p in response.context['products']]
+        self.assertEqual(len(second_page), 3)
+        self.assertIsNone(response.context['next_cursor'])
+        
+        expected = list(
+            Product.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(first_page + second_page, expected)
+    
+    def test_cursor_mode_does_not_count(self):
+        """キーセット方式ではCOUNTクエリを発行しないことを確認"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('shop:product_list'), {'cursor': ''})
+        self.assertFalse([q for q in queries if 'COUNT(' in q['sql'].upper()])
+    
+    def test_invalid_cursor_returns_404(self):
+        """不正なカーソルは404になることを確認"""
+        response = self.client.get(reverse('shop:product_list'), {'cursor': 'invalid'})
+        self.assertEqual(response.status_code, 404)
+
+
+class ProductListCacheTest(TestCase):
+    """商品一覧キャッシュのテストケース"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        cache.clear()
+        self.client = Client()
+        self.category = Category.objects.create(
+            name='電子機器',
+            slug='electronics'
+        )
+        self.product = Product.objects.create(
+            name='ノートPC',
+            slug='notebook-pc',
+            category=self.category,
+            description='高性能ノートパソコン',
+            price=Decimal('89800'),
+            stock=10
+        )
+    
+    def _catalog_queries(self, url):
+        """ページを表示し、商品・カテゴリテーブルへのクエリを返す"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [
+            q['sql'] for q in queries
+            if 'shop_product' in q['sql'] or 'shop_category' in q['sql']
+        ]
+    
+    def test_second_request_is_served_from_cache(self):
+        """2回目以降は商品・カテゴリを参照しないことを確認"""
+        url = reverse('shop:product_list_by_category', kwargs={'category_slug': 'electronics'})
+        self.assertTrue(self._catalog_queries(url))
+        self.assertEqual(self._catalog_queries(url), [])
+    
+    def test_cache_invalidated_on_product_save(self):
+        """商品の保存でキャッシュが無効化されることを確認"""
+        url = reverse('shop:product_list')
+        self.client.get(url)
+        
+        self.product.name = '新型ノートPC'
+        self.product.save()
+        
+        response = self.client.get(url)
+        self.assertContains(response, '新型ノートPC')
+    
+    def test_unknown_category_returns_404(self):
+        """存在しないカテゴリは404になることを確認"""
+        response = self.client.get(
+            reverse('shop:product_list_by_category', kwargs={'category_slug': 'unknown'})
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class ProductSearchViewTest(TestCase):
+    """商品一覧の検索のテストケース"""
+    
+    def setUp(self):
+        """テスト前の準備"""
+        cache.clear()
+        self.client = Client()
+        self.category1 = Category.objects.create(
+            name='電子機器',
+            slug='electronics'
+        )
+        self.category2 = Category.objects.create(
+            name='書籍',
+            slug='books'
+        )
+        for i in range(15):
+            Product.objects.create(
+                name=f'ワイヤレスイヤホン{i+1}',
+                slug=f'earphone-{i+1}',
+                category=self.category1,
+                description='ノイズキャンセリング対応',
+                price=Decimal('5000'),
+                stock=10
+            )
+        Product.objects.create(
+            name='イヤホンの選び方',
+            slug='earphone-book',
+            category=self.category2,
+            description='イヤホンの解説書',
+            price=Decimal('1500'),
+            stock=10
+        )
+    
+    def test_search_results_are_paginated(self):
+        """検索結果がページ分割されることを確認"""
+        response = self.client.get(reverse('shop:product_list'), {'q': 'イヤホン'})
+        self.assertEqual(response.context['paginator'].count, 16)
+        self.assertEqual(len(response.context['products']), 12)
+        self.assertContains(response, 'q=%E3%82%A4%E3%83%A4%E3%83%9B%E3%83%B3')
+        
+        response = self.client.get(reverse('shop:product_list'), {'q': 'イヤホン', 'page': 2})
+        self.assertEqual(len(response.context['products']), 4)
+    
+    def test_search_within_category(self):
+        """カテゴリ内で検索できることを確認"""
+        url = reverse('shop:product_list_by_category', kwargs={'category_slug': 'books'})
+        response = self.client.get(url, {'q': 'イヤホン'})
+        self.assertEqual([product.slug for product in response.context['products']], ['earphone-book'])
+    
+    def test_search_result_is_not_served_from_list_cache(self):
+        """検索結果が通常の一覧のキャッシュと混ざらないことを確認"""
+        self.client.get(reverse('shop:product_list'))
+        response = self.client.get(reverse('shop:product_list'), {'q': '解説書'})
+        self.assertContains(response, 'イヤホンの選び方')
+        self.assertNotContains(response, 'ワイヤレスイヤホン1<')
+        self.assertEqual(response.context['paginator'].count, 1)
+
+
 class ProductDetailViewTest(TestCase):
     """商品詳細ビューのテストケース"""
     